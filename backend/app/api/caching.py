@@ -0,0 +1,73 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.services.versioning import VersionedValue
+
+
+class ResponseCache:
+    """Rendered response bodies keyed by endpoint, reused until the epoch or version changes."""
+
+    def __init__(self):
+        self._bodies: Dict[str, Tuple[str, int, bytes]] = {}
+
+    def get(self, name: str, epoch: str, version: int) -> Optional[bytes]:
+        cached = self._bodies.get(name)
+        if cached is not None and cached[:2] == (epoch, version):
+            return cached[2]
+        return None
+
+    def put(self, name: str, epoch: str, version: int, body: bytes):
+        self._bodies[name] = (epoch, version, body)
+
+
+response_cache = ResponseCache()
+
+
+async def versioned_response(
+    request: Request,
+    name: str,
+    source: VersionedValue,
+    render: Callable[[Any], bytes],
+    wait_for_version: Optional[int] = None,
+    epoch: Optional[str] = None,
+    extra_headers: Optional[Callable[[], Dict[str, str]]] = None,
+    render_in_thread: bool = False,
+) -> Response:
+    """
+    Serve the current version of ``source`` as JSON with an ETag.
+
+    The body is rendered once per version and cached; clients sending a
+    matching If-None-Match get 304. With ``wait_for_version`` the request
+    long-polls until that version is published or LONG_POLL_TIMEOUT_SEC passes;
+    a client passing the ``epoch`` (X-Snapshot-Epoch) its version came from is
+    answered at once if the versions have restarted since, as with a new boot.
+    ``extra_headers`` is asked for per-request headers once the value is read.
+    ``render_in_thread`` is for renders that may block, such as calls forwarded
+    to the worker owning the engine.
+    """
+    stale_epoch = epoch is not None and epoch != source.epoch
+    if wait_for_version is not None and source.version < wait_for_version and not stale_epoch:
+        version, value = await source.wait_for_async(wait_for_version, settings.LONG_POLL_TIMEOUT_SEC)
+    else:
+        version, value = source.get()
+    # Read after the wait: the epoch may have changed while waiting
+    current_epoch = source.epoch
+
+    etag = f'"{name}-{current_epoch}-{version}"'
+    headers = {
+        "ETag": etag,
+        "X-Snapshot-Version": str(version),
+        "X-Snapshot-Epoch": current_epoch,
+        "Cache-Control": "no-cache",
+    }
+    if extra_headers is not None:
+        headers.update(extra_headers())
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(name, current_epoch, version)
+    if body is None:
+        body = await run_in_threadpool(render, value) if render_in_thread else render(value)
+        response_cache.put(name, current_epoch, version, body)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,14 +1,21 @@
 from fastapi import APIRouter, Depends
-from app.api.routes.video import video_stream_service
+from fastapi.concurrency import run_in_threadpool
+from app.api.routes.video import get_video_service
+from app.services.video_stream import VideoStreamService
 
 router = APIRouter()
 
 @router.get("/status")
-async def get_alert_status():
+async def get_alert_status(service: VideoStreamService = Depends(get_video_service)):
     """Get current alert status and reset alerts after polling."""
-    return video_stream_service.get_and_reset_alerts()
+    return await run_in_threadpool(service.get_and_reset_alerts)
 
 @router.get("/check")
-async def check_alerts():
+async def check_alerts(service: VideoStreamService = Depends(get_video_service)):
     """Check if any alerts are currently active."""
-    return video_stream_service.alert_service.get_alerts()
+    return await run_in_threadpool(service.get_alerts)
+
+@router.get("/notifications")
+async def get_notification_stats(service: VideoStreamService = Depends(get_video_service)):
+    """Outbound alert delivery: queue depths, deliveries, failures and latency per sink."""
+    return await run_in_threadpool(service.get_notification_stats)
@@ -1,4 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
+from app.api.routes.video import get_video_service
+from app.services.video_stream import VideoStreamService
+from app.utils.lock_stats import lock_stats
+from app.utils.process_stats import process_stats
 
 router = APIRouter()
 
@@ -10,4 +15,17 @@ async def health_check():
 @router.get("/ping")
 async def ping():
     """Simple ping endpoint."""
-    return {"message": "pong"}
\ No newline at end of file
+    return {"message": "pong"}
+
+@router.get("/locks")
+async def get_lock_stats():
+    """Wait and hold times of the instrumented locks, for spotting contention."""
+    return lock_stats()
+
+@router.get("/stats")
+async def get_stats(service: VideoStreamService = Depends(get_video_service)):
+    """Process CPU/memory and frame loop counters; sample twice and diff for rates.
+
+    Process figures are this worker's; the rest come from the worker running the engine.
+    """
+    return {**process_stats(), **await run_in_threadpool(service.get_engine_stats)}
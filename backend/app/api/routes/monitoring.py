@@ -1,38 +1,154 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from app.api.caching import versioned_response
 from app.services.video_stream import VideoStreamService
-from app.models.schemas import MonitoringResponse, SessionReport
-from app.core.exceptions import MonitoringNotActiveException
-from app.api.routes.video import video_stream_service
+from app.models.records import json_bytes
+from app.models.schemas import MonitoringResponse, RecordingStatus, SessionReport
+from app.core.exceptions import InvalidSketchException, MonitoringNotActiveException
+from app.services.monitoring import merge_exported_sketches, summarize_distributions
+from app.api.routes.video import get_video_service
 
 router = APIRouter()
 
-def get_video_service() -> VideoStreamService:
-    return video_stream_service
+MAX_HISTORY_BUCKETS = 10000  # per /history response
+
+def report_range(start: Optional[datetime], end: Optional[datetime]) -> Tuple[Optional[float], Optional[float]]:
+    """?from= and ?to= as unix times; times without a zone are the server's local time."""
+    start_ts = start.timestamp() if start else None
+    end_ts = end.timestamp() if end else None
+    if start_ts is not None and end_ts is not None and start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    return start_ts, end_ts
+
+def render_report(report: Dict[str, Any]) -> bytes:
+    if "error" in report:
+        raise HTTPException(status_code=400, detail=report["error"])
+    return json_bytes(report)
 
 @router.post("/start", response_model=MonitoringResponse)
 async def start_monitoring(service: VideoStreamService = Depends(get_video_service)):
     """Start a monitoring session."""
-    result = service.start_monitoring()
+    # May open the camera, which blocks
+    result = await run_in_threadpool(service.start_monitoring)
     return MonitoringResponse(**result)
 
 @router.post("/stop", response_model=MonitoringResponse)
 async def stop_monitoring(service: VideoStreamService = Depends(get_video_service)):
     """Stop the current monitoring session."""
-    result = service.stop_monitoring()
+    # Blocks until a running recording has finalized its last segment
+    result = await run_in_threadpool(service.stop_monitoring)
     return MonitoringResponse(**result)
 
 @router.get("/report", response_model=SessionReport)
-async def get_report(service: VideoStreamService = Depends(get_video_service)):
-    """Generate comprehensive monitoring report."""
-    report = service.get_report()
-    if "error" in report:
-        raise HTTPException(status_code=400, detail=report["error"])
-    return SessionReport(**report)
+async def get_report(
+    request: Request,
+    wait_for_version: Optional[int] = Query(None, ge=0),
+    epoch: Optional[str] = Query(None, description="X-Snapshot-Epoch the version is from"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    service: VideoStreamService = Depends(get_video_service)
+):
+    """Generate comprehensive monitoring report.
+
+    The report is only rebuilt when session data has changed since the last request.
+    With ``from`` and/or ``to`` (ISO 8601) it covers only that part of the session,
+    to the timeline's resolution and without distributions.
+    """
+    if start is not None or end is not None:
+        start_ts, end_ts = report_range(start, end)
+        report = await run_in_threadpool(service.get_report, start_ts, end_ts)
+        return Response(render_report(report), media_type="application/json")
+
+    return await versioned_response(
+        request, "report", service.report_state,
+        lambda _: render_report(service.get_report()), wait_for_version,
+        epoch=epoch,
+        render_in_thread=True,
+    )
+
+@router.get("/history")
+async def get_history(
+    start: datetime = Query(..., alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    resolution: Optional[float] = Query(None, gt=0, description="seconds per bucket; omit for one report"),
+    service: VideoStreamService = Depends(get_video_service)
+):
+    """Report of any time range of the stored history, across sessions and restarts.
+
+    Answered from the coarsest rollup tier that fits the range and resolution.
+    """
+    start_ts, end_ts = report_range(start, end or datetime.now())
+    if resolution is not None and (end_ts - start_ts) / resolution > MAX_HISTORY_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"More than {MAX_HISTORY_BUCKETS} buckets; raise 'resolution'")
+    # sqlite reads block
+    history = await run_in_threadpool(service.get_history, start_ts, end_ts, resolution)
+    return Response(render_report(history), media_type="application/json")
+
+@router.get("/faces/{face_id}/report", response_model=SessionReport)
+async def get_face_report(
+    face_id: int,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    service: VideoStreamService = Depends(get_video_service)
+):
+    """Generate the monitoring report of one tracked face, optionally of a time range."""
+    report = await run_in_threadpool(service.get_face_report, face_id, *report_range(start, end))
+    return Response(render_report(report), media_type="application/json")
+
+@router.get("/sketches")
+async def get_sketches(service: VideoStreamService = Depends(get_video_service)):
+    """The session's metric histograms in mergeable form, for fleet-level statistics."""
+    return await run_in_threadpool(service.export_sketches)
+
+@router.post("/sketches/merge")
+async def merge_sketches(exports: List[Dict[str, Any]]):
+    """Merge /sketches payloads of many sessions or cameras into one set of distributions.
+
+    The merged ``metrics`` are themselves a payload, so merges can be chained.
+    """
+    try:
+        merged = merge_exported_sketches(exports)
+    except (KeyError, TypeError, ValueError) as e:
+        raise InvalidSketchException(str(e))
+    return {
+        "sessions": len(exports),
+        "distributions": summarize_distributions(merged),
+        "metrics": {name: histogram.to_dict() for name, histogram in merged.items()},
+    }
 
 @router.get("/status")
-async def get_monitoring_status(service: VideoStreamService = Depends(get_video_service)):
+async def get_monitoring_status(
+    request: Request,
+    wait_for_version: Optional[int] = Query(None, ge=0),
+    epoch: Optional[str] = Query(None, description="X-Snapshot-Epoch the version is from"),
+    service: VideoStreamService = Depends(get_video_service)
+):
     """Get current monitoring status."""
-    return {
-        "monitoring_active": service.monitoring_service.is_active,
-        "current_metrics": service.get_latest_data()
-    }
\ No newline at end of file
+    return await versioned_response(
+        request, "status", service.status_state,
+        lambda status: json_bytes({
+            "monitoring_active": status["monitoring_active"],
+            "current_metrics": status["current_metrics"].as_dict(),
+        }),
+        wait_for_version,
+        epoch,
+        service.frame_headers,
+    )
+
+@router.post("/recording/start", response_model=MonitoringResponse)
+async def start_recording(service: VideoStreamService = Depends(get_video_service)):
+    """Record the annotated video of the current session in rotating segments."""
+    # May open the camera and create the recording directory, which block
+    return MonitoringResponse(**await run_in_threadpool(service.start_recording))
+
+@router.post("/recording/stop", response_model=MonitoringResponse)
+async def stop_recording(service: VideoStreamService = Depends(get_video_service)):
+    """Stop recording; also happens when the session stops."""
+    return MonitoringResponse(**await run_in_threadpool(service.stop_recording))
+
+@router.get("/recording/status", response_model=RecordingStatus)
+async def get_recording_status(service: VideoStreamService = Depends(get_video_service)):
+    """Get segments written so far and frames written and dropped."""
+    return RecordingStatus(**await run_in_threadpool(service.get_recording_status))
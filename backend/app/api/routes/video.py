@@ -1,25 +1,73 @@
-from fastapi import APIRouter, Depends
-from fastapi.responses import StreamingResponse
+from email.utils import formatdate
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from app.api.caching import versioned_response
+from app.services.engine_channel import EngineClient
 from app.services.video_stream import VideoStreamService
-from app.models.schemas import FaceMetrics, DrowsinessStatus
-from app.services.stream_window import stream_window
+from app.models.records import json_bytes
+from app.models.schemas import FaceMetrics, DrowsinessStatus, TrackedFace
+from app.services.quality_ladder import resolve_rendition, resolve_snapshot_rendition
+from app.services.stream_window import stream_window, window_streamer
 
 router = APIRouter()
 
-# Create a single shared instance
-video_stream_service = VideoStreamService()
+# The single shared instance, opened at startup (see app.main): the engine itself in the worker
+# that owns camera and analysis, a client of that worker in every other one. Calls a client
+# forwards block on the owner, so async routes make them with run_in_threadpool.
+video_stream_service: Optional[Union[VideoStreamService, EngineClient]] = None
 
 def get_video_service() -> VideoStreamService:
     return video_stream_service
 
 @router.get("/stream")
-async def video_feed(service: VideoStreamService = Depends(get_video_service)):
-    """Stream video feed with computer vision processing."""
+async def video_feed(
+    profile: str = Query("full", description="thumb, sd, full, auto or raw"),
+    width: Optional[int] = Query(None, ge=16, le=4096),
+    quality: Optional[int] = Query(None, ge=10, le=100),
+    service: VideoStreamService = Depends(get_video_service)
+):
+    """Stream video feed with computer vision processing.
+
+    Viewers pick a rendition by profile, or by explicit width/quality; "auto"
+    lowers resolution and quality while the client falls behind.
+    """
+    rendition = resolve_rendition(profile, width, quality)
     return StreamingResponse(
-        service.generate_frames(),
+        service.generate_frames(rendition=rendition),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
+@router.get("/snapshot")
+def video_snapshot(
+    request: Request,
+    profile: str = Query("full", description="thumb, sd or full"),
+    width: Optional[int] = Query(None, ge=16, le=4096),
+    quality: Optional[int] = Query(None, ge=10, le=100),
+    service: VideoStreamService = Depends(get_video_service)
+):
+    """The most recently rendered frame as a JPEG, from the shared frame cache.
+
+    Never opens the camera or runs the models: it returns whatever the running
+    stream published last, with its sequence number and capture timestamp.
+    """
+    rendition = resolve_snapshot_rendition(profile, width, quality)
+    frame = service.get_snapshot()
+    # Sequence numbers restart with the engine; the epoch tells its boots apart
+    etag = f'"frame-{service.metrics_state.epoch}-{frame.seq}-{rendition.width or "full"}-{rendition.quality}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Last-Modified": formatdate(frame.timestamp, usegmt=True),
+        "X-Frame-Seq": str(frame.seq),
+        "X-Frame-Timestamp": f"{frame.timestamp:.6f}",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=frame.jpeg(rendition.width, rendition.quality),
+                    media_type="image/jpeg", headers=headers)
+
 @router.get("/local")
 async def run_local(service: VideoStreamService = Depends(get_video_service)):
     """Run video processing locally (for development)."""
@@ -29,21 +77,111 @@ async def run_local(service: VideoStreamService = Depends(get_video_service)):
     )
 
 @router.get("/metrics", response_model=FaceMetrics)
-async def get_metrics(service: VideoStreamService = Depends(get_video_service)):
-    """Get current face metrics."""
-    return FaceMetrics(**service.get_latest_data())
+async def get_metrics(
+    request: Request,
+    wait_for_version: Optional[int] = Query(None, ge=0),
+    epoch: Optional[str] = Query(None, description="X-Snapshot-Epoch the version is from"),
+    service: VideoStreamService = Depends(get_video_service)
+):
+    """Get current face metrics.
+
+    Served with an ETag; ?wait_for_version=N waits until version N is published.
+    X-Frame-Seq and X-Capture-Ts identify the frame the metrics are current as of.
+    """
+    return await versioned_response(
+        request, "metrics", service.metrics_state,
+        lambda metrics: metrics.to_json_bytes(),
+        wait_for_version,
+        epoch,
+        service.frame_headers,
+    )
 
 @router.get("/drowsiness", response_model=DrowsinessStatus)
-async def get_drowsiness_status(service: VideoStreamService = Depends(get_video_service)):
+async def get_drowsiness_status(
+    request: Request,
+    wait_for_version: Optional[int] = Query(None, ge=0),
+    epoch: Optional[str] = Query(None, description="X-Snapshot-Epoch the version is from"),
+    service: VideoStreamService = Depends(get_video_service)
+):
     """Get current drowsiness detection status."""
-    return DrowsinessStatus(**service.get_drowsiness_status())
+    return await versioned_response(
+        request, "drowsiness", service.drowsiness_state,
+        lambda status: status.to_json_bytes(),
+        wait_for_version,
+        epoch,
+        service.frame_headers,
+    )
+
+@router.get("/faces", response_model=List[TrackedFace])
+async def get_faces(service: VideoStreamService = Depends(get_video_service)):
+    """Get current metrics of every tracked face."""
+    headers = service.frame_headers()
+    body = json_bytes([face.as_dict() for face in service.get_faces().values()])
+    return Response(body, media_type="application/json", headers=headers)
+
+@router.get("/faces/{face_id}/metrics", response_model=FaceMetrics)
+async def get_face_metrics(face_id: int, service: VideoStreamService = Depends(get_video_service)):
+    """Get current metrics of one tracked face."""
+    headers = service.frame_headers()
+    return Response(service.get_face(face_id).metrics().to_json_bytes(), media_type="application/json",
+                    headers=headers)
+
+@router.get("/faces/{face_id}/drowsiness", response_model=DrowsinessStatus)
+async def get_face_drowsiness_status(face_id: int, service: VideoStreamService = Depends(get_video_service)):
+    """Get drowsiness detection status of one tracked face."""
+    headers = service.frame_headers()
+    return Response(service.get_face_drowsiness(face_id).to_json_bytes(), media_type="application/json",
+                    headers=headers)
+
+@router.websocket("/feed/binary")
+async def binary_feed(websocket: WebSocket, service: VideoStreamService = Depends(get_video_service)):
+    """Every frame's metrics as binary chunks, one chunk per message.
+
+    See app.models.feed_format for the layout and app.clients.feed_reader for a reader.
+    """
+    await websocket.accept()
+    chunks = service.feed_chunks()
+    try:
+        async for chunk in iterate_in_threadpool(chunks):
+            await websocket.send_bytes(chunk)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        chunks.close()
+
+@router.get("/camera")
+async def get_camera_status(service: VideoStreamService = Depends(get_video_service)):
+    """Capture health: whether the camera is up, outages, reconnects and downtime."""
+    return await run_in_threadpool(service.get_camera_status)
+
+@router.get("/analysis")
+async def get_analysis_status(service: VideoStreamService = Depends(get_video_service)):
+    """How often each analysis runs, how old its latest result is, and the quality tier."""
+    return await run_in_threadpool(service.get_analysis_status)
+
+@router.get("/latency")
+async def get_latency_stats(service: VideoStreamService = Depends(get_video_service)):
+    """How old frames are, from capture, when read, analysed, encoded and written to viewers."""
+    return await run_in_threadpool(service.get_latency_stats)
+
+@router.post("/latency/reset")
+async def reset_latency_stats(service: VideoStreamService = Depends(get_video_service)):
+    """Start the latency histograms afresh."""
+    await run_in_threadpool(service.reset_latency_stats)
+    return {"message": "Latency histograms reset", "status": "reset"}
 
 @router.post("/close_camera")
 async def close_camera(service: VideoStreamService = Depends(get_video_service)):
-    """Close the camera resource."""
-    service.close_camera()
-    return {"message": "Camera closed."}
+    """Close the camera resource, stopping the monitoring session if one is running."""
+    # Joins the frame loop and capture threads, which blocks
+    return await run_in_threadpool(service.close_camera)
 
 @router.get("/stream_window")
-def video_feed():
-    return StreamingResponse(stream_window(), media_type="multipart/x-mixed-replace; boundary=frame")
\ No newline at end of file
+def window_feed():
+    """Stream a desktop window, sharing one grab loop between all viewers."""
+    return StreamingResponse(stream_window(), media_type="multipart/x-mixed-replace; boundary=frame")
+
+@router.post("/stream_window/refresh")
+def refresh_window_geometry():
+    """Look up the streamed window's position and size again."""
+    return {"region": window_streamer.get_region(refresh=True)}
@@ -0,0 +1,85 @@
+"""Read the binary metrics feed into NumPy structured arrays.
+
+    python -m app.clients.feed_reader ws://localhost:8000/video/feed/binary
+    python -m app.clients.feed_reader unix:///tmp/spinovate-feed.sock
+
+Each chunk becomes one array with fields timestamp, camera_id, flags,
+distance, pitch, yaw, ear, mar, brightness and posture (shape (n, 6)).
+"""
+import argparse
+import socket
+from typing import Iterator
+
+import numpy as np
+
+from app.models.feed_format import FLAG_FACE, HEADER, chunk_sequence, chunk_size, decode_chunk
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise EOFError("Feed closed")
+        received += n
+    return bytes(buffer)
+
+
+def unix_chunks(path: str) -> Iterator[bytes]:
+    """Yield raw chunks from the feed's Unix socket."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        while True:
+            try:
+                header = _recv_exactly(sock, HEADER.size)
+                yield header + _recv_exactly(sock, chunk_size(header) - HEADER.size)
+            except EOFError:
+                return
+
+
+def websocket_chunks(url: str) -> Iterator[bytes]:
+    """Yield raw chunks from the feed's WebSocket endpoint."""
+    from websockets.exceptions import ConnectionClosed
+    from websockets.sync.client import connect
+
+    with connect(url) as websocket:
+        while True:
+            try:
+                yield websocket.recv()
+            except ConnectionClosed:
+                return
+
+
+def feed_chunks(address: str) -> Iterator[bytes]:
+    if address.startswith("unix://"):
+        return unix_chunks(address[len("unix://"):])
+    return websocket_chunks(address)
+
+
+def read_feed(address: str) -> Iterator[np.ndarray]:
+    """Yield one structured array per chunk from a ws:// or unix:// feed address."""
+    for chunk in feed_chunks(address):
+        yield decode_chunk(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("address", help="ws://host:port/video/feed/binary or unix:///path/to.sock")
+    args = parser.parse_args()
+
+    last_seq = None
+    for chunk in feed_chunks(args.address):
+        seq = chunk_sequence(chunk)
+        if last_seq is not None and seq != last_seq + 1:
+            print(f"missed {seq - last_seq - 1} chunks")
+        last_seq = seq
+        records = decode_chunk(chunk)
+        faces = records[(records["flags"] & FLAG_FACE) != 0]
+        distance = f"{faces['distance'].mean():.1f} cm" if len(faces) else "-"
+        print(f"chunk {seq}: {len(records)} records, {len(faces)} with a face, mean distance {distance}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,13 +15,36 @@ class Settings(BaseSettings):
     ALLOWED_HOSTS: List[str] = ["*"]
     
     # Camera settings
+    CAMERA_SOURCE: str = "device"  # device, file, images or synthetic
+    CAMERA_URI: str = ""           # stream URL, video file or image directory; device uses CAMERA_INDEX if empty
     CAMERA_INDEX: int = 2
+    CAMERA_LOOP: bool = True       # replay files and image directories from the start when they end
+    CAMERA_REALTIME: bool = True   # pace files, images and synthetic frames like a live camera
+    CAMERA_PREFETCH: int = 2       # frames read ahead of processing
+    CAMERA_STALL_FACTOR: float = 5.0          # no frame within this many frame intervals = camera down
+    CAMERA_RECONNECT_INITIAL_SEC: float = 0.5
+    CAMERA_RECONNECT_MAX_SEC: float = 30.0    # reconnect backoff doubles up to this
+    CAMERA_PASSTHROUGH: bool = False  # keep the camera's MJPEG bytes for ?profile=raw viewers
+    CAMERA_DECODE_SCALE: int = 1      # 1, 2, 4 or 8: decode passthrough frames at reduced size for analysis
     VIDEO_FPS: int = 15
+    FRAME_PIPELINE: bool = False      # run inference and render/encode on their own threads behind capture
+    FRAME_PIPELINE_QUEUE: int = 2     # frames queued in front of each pipeline stage
+    FRAME_POOL_SIZE: int = 16         # reusable frame buffers kept per resolution; 0 disables pooling
+    
+    # Analysis cadence (the face mesh runs on every frame)
+    ANALYSIS_DETECTION_EVERY: int = 5    # face detection and distance, every Nth frame
+    ANALYSIS_BRIGHTNESS_EVERY: int = 15  # face brightness, every Nth frame
+    ANALYSIS_POSTURE_EVERY: int = 0      # posture regression; 0 = only when distance or pitch change
+    ANALYSIS_TIER: str = "full"          # full, balanced, fast or minimal: best quality tier to run at
+    ANALYSIS_ADAPTIVE: bool = True       # step tiers down/up to keep frame processing within budget
+    ANALYSIS_TARGET_FPS: float = 0       # frame rate the budget is derived from; 0 uses VIDEO_FPS
     
     # Distance measurement
     KNOWN_DISTANCE: float = 50.0  # cm
     REAL_WIDTH: float = 16.0      # cm (human head average)
     FOCAL_LENGTH: int = 440       # Adjusted focal length
+    DISTANCE_METHOD: str = "detector"  # detector (face width from the face detector) or iris (mesh only, no detector)
+    IRIS_DIAMETER_CM: float = 1.17     # cm (human iris average)
     
     # Thresholds
     GOOD_DISTANCE_MIN: int = 40
@@ -38,6 +61,63 @@ class Settings(BaseSettings):
     YAWN_CONSEC_FRAMES: int = 15
     LONG_BLINK_GAP_SEC: int = 10  # seconds
     
+    # Multi-face tracking
+    MAX_NUM_FACES: int = 1
+    FACE_TRACK_MIN_IOU: float = 0.3
+    FACE_TRACK_MAX_MISSED: int = 15  # frames before a face id is retired
+    FACE_REPORTS_KEPT: int = 32  # finished sessions of retired faces kept for /faces/{id}/report
+    
+    # Monitoring
+    MONITORING_HEADLESS: bool = True  # sessions run the frame loop themselves, without an open stream
+    MONITORING_TIMELINE_SEC: float = 1.0  # bucket width of the session timeline behind ?from=&to= reports
+
+    # Monitoring history (sqlite rollups of every session, kept across restarts)
+    HISTORY_DB_PATH: str = ""                   # sqlite file shared by all cameras; empty disables history
+    HISTORY_COMPACT_INTERVAL_SEC: float = 60.0  # how often new buckets are written and rolled up
+    HISTORY_SECOND_RETENTION_DAYS: float = 2    # per-MONITORING_TIMELINE_SEC rows kept this long; 0 = forever
+    HISTORY_MINUTE_RETENTION_DAYS: float = 90   # per-minute rows
+    HISTORY_HOUR_RETENTION_DAYS: float = 0      # per-hour rows
+    
+    # Multiple workers (uvicorn --workers N)
+    ENGINE_SHARED: bool = True  # one worker owns camera and analysis; the others read from it over ENGINE_SOCKET
+    ENGINE_SOCKET: str = ""     # Unix socket of the owning worker; empty = <CAMERA_ID>.sock in a private dir of the temp dir
+
+    # API polling
+    LONG_POLL_TIMEOUT_SEC: float = 25.0  # max wait for ?wait_for_version=
+    
+    # Binary metrics feed
+    CAMERA_ID: int = 0                    # identifies this camera in feed records
+    BINARY_FEED_BATCH_SIZE: int = 15      # records per chunk
+    BINARY_FEED_MAX_DELAY_MS: int = 250   # send a partial chunk once its oldest record is this old
+    BINARY_FEED_SOCKET: str = ""          # Unix socket path to also serve the feed on; empty disables
+    
+    # Session recording
+    RECORDING_DIR: str = "recordings"
+    RECORDING_CODEC: str = "mp4v"
+    RECORDING_SEGMENT_SEC: int = 300      # start a new file after this much footage
+    RECORDING_SEGMENT_MB: int = 200       # ... or once the file reaches this size
+    RECORDING_QUEUE_SIZE: int = 30        # frames buffered for the writer before dropping
+    
+    # Alert notifications (all sinks off by default)
+    ALERT_WEBHOOK_URL: str = ""           # POST batches of raised alerts here
+    ALERT_SOCKET: str = ""                # Unix socket to write alert batches to, one JSON line each
+    ALERT_JSONL_PATH: str = ""            # file to append raised alerts to, one JSON object per line
+    ALERT_SINK_TIMEOUT_SEC: float = 5.0
+    ALERT_QUEUE_SIZE: int = 1000          # alerts waiting for dispatch before the oldest is dropped
+    ALERT_DEDUP_SEC: float = 60.0         # the same alert is notified at most once in this window
+    ALERT_BATCH_SIZE: int = 20
+    ALERT_BATCH_DELAY_MS: int = 500       # send a partial batch once its oldest alert is this old
+    ALERT_RATE_PER_MIN: int = 30          # batches per minute per sink
+    ALERT_RETRY_INITIAL_SEC: float = 1.0  # retry backoff doubles from this ...
+    ALERT_RETRY_MAX_SEC: float = 60.0     # ... up to this
+    ALERT_MAX_ATTEMPTS: int = 5           # attempts per batch before it is dropped
+
+    # Window streaming
+    WINDOW_TITLE: str = "python main.py"
+    WINDOW_STREAM_FPS: int = 30
+    WINDOW_STREAM_IDLE_FPS: int = 2  # grab rate floor while nothing changes
+    WINDOW_TILE_SIZE: int = 32       # px, granularity of change detection
+    
     class Config:
         env_file = ".env"
 
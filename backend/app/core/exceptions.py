@@ -10,4 +10,32 @@ class MonitoringNotActiveException(HTTPException):
 
 class MonitoringAlreadyActiveException(HTTPException):
     def __init__(self):
-        super().__init__(status_code=400, detail="Monitoring session already active")
\ No newline at end of file
+        super().__init__(status_code=400, detail="Monitoring session already active")
+
+class InvalidStreamProfileException(HTTPException):
+    def __init__(self, profile: str, profiles: list):
+        super().__init__(
+            status_code=400,
+            detail=f"Unknown stream profile '{profile}'; expected one of {', '.join(profiles)}"
+        )
+
+class FaceNotFoundException(HTTPException):
+    def __init__(self, face_id: int):
+        super().__init__(status_code=404, detail=f"Face {face_id} is not being tracked")
+
+class NoFrameAvailableException(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=503, detail="No frame has been rendered yet; open /video/stream first")
+
+
+class InvalidSketchException(HTTPException):
+    def __init__(self, reason: str):
+        super().__init__(status_code=400, detail=f"Invalid metric sketch: {reason}")
+
+class HistoryNotEnabledException(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=404, detail="Monitoring history is not kept; set HISTORY_DB_PATH")
+
+class EngineUnavailableException(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=503, detail="The worker running camera and analysis cannot be reached")
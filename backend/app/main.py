@@ -1,7 +1,41 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import video, monitoring, health, alerts
 from app.core.config import settings
+from app.services.binary_feed import UnixFeedServer
+from app.services.engine_channel import EngineClient, open_video_service
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    """Open the video service; in the worker that owns it, serve it to the other
+    workers, serve the binary metrics feed on a Unix socket when one is
+    configured, deliver alert notifications to the configured sinks and keep
+    the monitoring history."""
+    service = video.video_stream_service = open_video_service()
+    if isinstance(service, EngineClient):
+        service.start()
+        yield
+        service.stop()
+        return
+
+    feed_server = None
+    service.alert_dispatcher.start()
+    if service.history is not None:
+        service.history.start()
+    if service.engine_server is not None:
+        service.engine_server.start()
+    if settings.BINARY_FEED_SOCKET:
+        feed_server = UnixFeedServer(settings.BINARY_FEED_SOCKET, service.feed_chunks)
+        feed_server.start()
+    yield
+    if feed_server is not None:
+        feed_server.stop()
+    if service.engine_server is not None:
+        service.engine_server.stop()
+    if service.history is not None:
+        service.history.stop()
+    service.alert_dispatcher.stop()
 
 def create_application() -> FastAPI:
     """Create and configure FastAPI application."""
@@ -10,6 +44,7 @@ def create_application() -> FastAPI:
         description="Computer Vision Monitoring API",
         version=settings.VERSION,
         debug=settings.DEBUG,
+        lifespan=lifespan,
     )
 
     # Add CORS middleware
@@ -0,0 +1,80 @@
+import struct
+from typing import Optional, Sequence
+
+import numpy as np
+
+# Wire format of the binary metrics feed. Every chunk is one header followed by
+# ``count`` fixed-size records, all little-endian:
+#
+#   header  magic "SPMF", format version u16, record size u16, record count u32,
+#           chunk sequence number u32
+#   record  capture timestamp f64 (unix seconds), camera id u32, flag bits u32,
+#           distance, pitch, yaw, EAR, MAR, brightness f32, posture angles 6 x f32
+#           in PostureAngleId order
+#
+# Missing values are NaN. Bump FEED_VERSION whenever the record layout changes.
+FEED_MAGIC = b"SPMF"
+FEED_VERSION = 1
+
+HEADER = struct.Struct("<4sHHII")
+RECORD = struct.Struct("<dII6f6f")
+
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("camera_id", "<u4"),
+    ("flags", "<u4"),
+    ("distance", "<f4"),
+    ("pitch", "<f4"),
+    ("yaw", "<f4"),
+    ("ear", "<f4"),
+    ("mar", "<f4"),
+    ("brightness", "<f4"),
+    ("posture", "<f4", (6,)),
+])
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+# Flag bits
+FLAG_FACE = 1 << 0          # a face was found in the frame
+FLAG_DROWSY = 1 << 1
+FLAG_YAWN = 1 << 2
+FLAG_BLINK = 1 << 3
+FLAG_MONITORING = 1 << 4    # a monitoring session was running
+
+_NO_POSTURE = (float("nan"),) * 6
+
+
+def _value(value: Optional[float]) -> float:
+    return float("nan") if value is None else value
+
+
+def pack_record(buffer: bytearray, offset: int, timestamp: float, camera_id: int, flags: int,
+                distance: Optional[float], pitch: Optional[float], yaw: Optional[float],
+                ear: Optional[float], mar: Optional[float], brightness: Optional[float],
+                posture: Optional[Sequence[float]]):
+    """Write one record into ``buffer`` at ``offset``."""
+    RECORD.pack_into(
+        buffer, offset, timestamp, camera_id, flags,
+        _value(distance), _value(pitch), _value(yaw), _value(ear), _value(mar), _value(brightness),
+        *(posture if posture is not None else _NO_POSTURE)
+    )
+
+
+def chunk_size(header: bytes) -> int:
+    """Total size in bytes of the chunk that starts with ``header``."""
+    _, _, record_size, count, _ = HEADER.unpack_from(header)
+    return HEADER.size + record_size * count
+
+
+def decode_chunk(chunk: bytes) -> np.ndarray:
+    """View one chunk's records as a structured array, without copying or per-record parsing."""
+    magic, version, record_size, count, _ = HEADER.unpack_from(chunk)
+    if magic != FEED_MAGIC:
+        raise ValueError(f"Not a metrics feed chunk (magic {magic!r})")
+    if version != FEED_VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"Unsupported feed format version {version} (record size {record_size})")
+    return np.frombuffer(chunk, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
+
+
+def chunk_sequence(chunk: bytes) -> int:
+    """Sequence number of a chunk; gaps mean the reader fell behind and chunks were dropped."""
+    return HEADER.unpack_from(chunk)[4]
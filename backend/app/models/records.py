@@ -0,0 +1,159 @@
+from array import array
+from enum import IntEnum
+from typing import Any, Dict, Iterable, Optional, Tuple
+from pydantic_core import to_json
+
+
+class PostureAngleId(IntEnum):
+    """Fixed slot of each posture angle in a posture array."""
+    CERVICAL_ANTEVERSION = 0
+    T1_SLOPE = 1
+    UPPER_THORACIC_KYPHOSIS = 2
+    MIDDLE_LOWER_THORACIC_KYPHOSIS = 3
+    T8_T12_L3 = 4
+    LUMBAR_LORDOSIS = 5
+
+
+# Display names, which are also the JSON keys of "posture_angles", by PostureAngleId
+POSTURE_ANGLE_NAMES: Tuple[str, ...] = (
+    "Degree of Anteversion of Cervical Spine (y1)",
+    "T1 Slope (y2)",
+    "Upper Thoracic Kyphosis Angle (y3)",
+    "Middle and Lower Thoracic Kyphosis Angle (y4)",
+    "T8-T12-L3 Angle (new)",
+    "Lumbar Lordosis Angle (y5)",
+)
+
+# Healthy (low, high) range in degrees, by PostureAngleId
+POSTURE_HEALTHY_RANGES: Tuple[Tuple[float, float], ...] = (
+    (25, 34),
+    (30, 50),
+    (140, 158),
+    (154, 155.5),
+    (175, 180.3),
+    (170, 174),
+)
+
+
+def posture_array(values: Optional[Iterable[float]]) -> Optional[array]:
+    """Pack posture angles in PostureAngleId order into a float array."""
+    if values is None:
+        return None
+    packed = array("d", values)
+    return packed if len(packed) == len(PostureAngleId) else None
+
+
+def json_bytes(value: Any) -> bytes:
+    """Serialize plain dicts, lists and numbers to compact JSON without model validation.
+
+    Non-finite floats become null, as in the response models.
+    """
+    return to_json(value, inf_nan_mode="null")
+
+
+class FrameMetrics:
+    """Metrics of one face in one frame in a compact fixed layout.
+
+    Serializes to the FaceMetrics JSON shape without running model validation.
+    """
+    __slots__ = ("distance", "pitch", "brightness", "ear", "mar", "yaw", "posture")
+
+    def __init__(
+        self,
+        distance: Optional[float] = None,
+        pitch: Optional[float] = None,
+        brightness: Optional[float] = None,
+        ear: Optional[float] = None,
+        mar: Optional[float] = None,
+        yaw: Optional[float] = None,
+        posture: Optional[array] = None,
+    ):
+        self.distance = distance
+        self.pitch = pitch
+        self.brightness = brightness
+        self.ear = ear
+        self.mar = mar
+        self.yaw = yaw
+        self.posture = posture
+
+    def _key(self) -> tuple:
+        return (self.distance, self.pitch, self.brightness, self.ear, self.mar, self.yaw, self.posture)
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is type(self) and self._key() == other._key()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.as_dict()!r})"
+
+    @property
+    def posture_angles(self) -> Optional[Dict[str, float]]:
+        if self.posture is None:
+            return None
+        return dict(zip(POSTURE_ANGLE_NAMES, self.posture))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "distance": self.distance, "pitch": self.pitch, "brightness": self.brightness,
+            "ear": self.ear, "mar": self.mar, "yaw": self.yaw,
+            "posture_angles": self.posture_angles,
+        }
+
+    def to_json_bytes(self) -> bytes:
+        return json_bytes(self.as_dict())
+
+
+class TrackedFaceMetrics(FrameMetrics):
+    """FrameMetrics of a tracked face plus its id and fatigue counters."""
+    __slots__ = ("face_id", "primary", "eye_counter", "yawn_counter", "blink_count")
+
+    def __init__(self, face_id: int, primary: bool, eye_counter: int, yawn_counter: int,
+                 blink_count: int, **metrics):
+        super().__init__(**metrics)
+        self.face_id = face_id
+        self.primary = primary
+        self.eye_counter = eye_counter
+        self.yawn_counter = yawn_counter
+        self.blink_count = blink_count
+
+    def _key(self) -> tuple:
+        return super()._key() + (self.face_id, self.primary, self.eye_counter,
+                                 self.yawn_counter, self.blink_count)
+
+    def metrics(self) -> FrameMetrics:
+        return FrameMetrics(self.distance, self.pitch, self.brightness,
+                            self.ear, self.mar, self.yaw, self.posture)
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = super().as_dict()
+        data.update(face_id=self.face_id, primary=self.primary, eye_counter=self.eye_counter,
+                    yawn_counter=self.yawn_counter, blink_count=self.blink_count)
+        return data
+
+
+class DrowsinessRecord:
+    """Drowsiness status of one face in the DrowsinessStatus JSON shape."""
+    __slots__ = ("ear", "mar", "yaw", "eye_counter", "yawn_counter", "drowsiness_alert", "yawn_alert")
+
+    def __init__(self, ear: Optional[float] = None, mar: Optional[float] = None,
+                 yaw: Optional[float] = None, eye_counter: int = 0, yawn_counter: int = 0,
+                 drowsiness_alert: bool = False, yawn_alert: bool = False):
+        self.ear = ear
+        self.mar = mar
+        self.yaw = yaw
+        self.eye_counter = eye_counter
+        self.yawn_counter = yawn_counter
+        self.drowsiness_alert = drowsiness_alert
+        self.yawn_alert = yawn_alert
+
+    def _key(self) -> tuple:
+        return (self.ear, self.mar, self.yaw, self.eye_counter, self.yawn_counter,
+                self.drowsiness_alert, self.yawn_alert)
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is type(self) and self._key() == other._key()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(zip(self.__slots__, self._key()))
+
+    def to_json_bytes(self) -> bytes:
+        return json_bytes(self.as_dict())
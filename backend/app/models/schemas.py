@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 class FaceMetrics(BaseModel):
@@ -10,6 +10,13 @@ class FaceMetrics(BaseModel):
     yaw: Optional[float] = None
     posture_angles: Optional[dict] = None
 
+class TrackedFace(FaceMetrics):
+    face_id: int
+    primary: bool
+    eye_counter: int
+    yawn_counter: int
+    blink_count: int
+
 class DrowsinessStatus(BaseModel):
     ear: Optional[float] = None
     mar: Optional[float] = None
@@ -23,6 +30,31 @@ class MonitoringResponse(BaseModel):
     message: str
     status: str
 
+class RecordingStatus(BaseModel):
+    recording: bool
+    name: Optional[str]
+    started_at: Optional[float]
+    stopped_at: Optional[float]
+    segments: List[str]
+    frames_written: int
+    frames_dropped: int
+    error: Optional[str]
+
+class DistributionBucket(BaseModel):
+    lo: float
+    hi: float
+    count: int
+
+class MetricDistribution(BaseModel):
+    count: int
+    mean: Optional[float]
+    min: Optional[float]
+    max: Optional[float]
+    p50: Optional[float]
+    p90: Optional[float]
+    p99: Optional[float]
+    buckets: List[DistributionBucket]
+
 class SessionReport(BaseModel):
     start_time: Optional[str]
     stop_time: Optional[str]
@@ -33,17 +65,22 @@ class SessionReport(BaseModel):
     avg_pitch_deg: float
     bad_posture_time_min: float
     bad_posture_events: int
+    bad_posture_events_per_hour: float
     max_good_posture_streak_sec: float
     avg_brightness: float
     max_brightness: float
     high_brightness_time_min: float
     high_brightness_events: int
     face_missing_time_min: float
+    camera_down_time_min: float = 0.0
+    camera_outages: int = 0
     drowsiness_time_min: float
     drowsiness_events: int
+    drowsiness_events_per_hour: float
     yawns_detected: int
     yawns_per_hour: float
     session_score: float
     blinks: int
     long_blink_gaps: int
-    longest_no_blink_sec: float
\ No newline at end of file
+    longest_no_blink_sec: float
+    distributions: Dict[str, MetricDistribution] = {}
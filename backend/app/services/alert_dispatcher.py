@@ -0,0 +1,327 @@
+import json
+import socket
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+import httpx
+
+from app.core.config import settings
+
+_LATENCY_SAMPLES = 256  # recent deliveries kept for latency percentiles
+
+
+class AlertSink:
+    """Somewhere raised alerts are delivered to; ``send`` raises when delivery fails."""
+
+    name = "sink"
+
+    def send(self, batch: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class WebhookSink(AlertSink):
+    """POSTs each batch as {"alerts": [...]} JSON; any non-2xx response is a failure."""
+
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self._client = httpx.Client(timeout=timeout)
+
+    def send(self, batch):
+        self._client.post(self.url, json={"alerts": batch}).raise_for_status()
+
+    def close(self):
+        self._client.close()
+
+
+class UnixSocketSink(AlertSink):
+    """Writes each batch as one JSON line to a local Unix socket listener."""
+
+    name = "unix"
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+
+    def send(self, batch):
+        line = json.dumps({"alerts": batch}).encode() + b"\n"
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._sock = sock
+        try:
+            self._sock.sendall(line)
+        except OSError:
+            self.close()
+            raise
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class JsonlFileSink(AlertSink):
+    """Appends every alert to a file as one JSON object per line; a stand-in for real receivers."""
+
+    name = "jsonl"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, batch):
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(alert) + "\n" for alert in batch)
+
+
+def create_alert_sinks() -> List[AlertSink]:
+    """The sinks configured by the ALERT_* settings; empty when notifications are off."""
+    sinks: List[AlertSink] = []
+    if settings.ALERT_WEBHOOK_URL:
+        sinks.append(WebhookSink(settings.ALERT_WEBHOOK_URL, settings.ALERT_SINK_TIMEOUT_SEC))
+    if settings.ALERT_SOCKET:
+        sinks.append(UnixSocketSink(settings.ALERT_SOCKET, settings.ALERT_SINK_TIMEOUT_SEC))
+    if settings.ALERT_JSONL_PATH:
+        sinks.append(JsonlFileSink(settings.ALERT_JSONL_PATH))
+    return sinks
+
+
+class _SinkWorker:
+    """Batches, rate-limits and retries deliveries to one sink on its own thread."""
+
+    def __init__(self, sink: AlertSink, dispatcher: "AlertDispatcher"):
+        self.sink = sink
+        self.dispatcher = dispatcher
+        self._pending: Deque[Dict[str, Any]] = deque(maxlen=dispatcher.queue_size)
+        self._cond = threading.Condition()
+        self._tokens = float(dispatcher.rate_per_min)
+        self._refilled = time.monotonic()
+        self._thread: Optional[threading.Thread] = None
+        self.delivered = 0
+        self.batches = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.last_error: Optional[str] = None
+        self.latencies: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+
+    def start(self, stop: threading.Event):
+        self._thread = threading.Thread(
+            target=self._run, args=(stop,), name=f"alert-sink-{self.sink.name}", daemon=True
+        )
+        self._thread.start()
+
+    def join(self, timeout: float):
+        if self._thread is not None:
+            with self._cond:
+                self._cond.notify_all()
+            self._thread.join(timeout)
+
+    def offer(self, alert: Dict[str, Any]):
+        with self._cond:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(alert)
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            "queued": len(self._pending),
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "latency_p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+            "latency_max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+            "last_error": self.last_error,
+        }
+
+    def _run(self, stop: threading.Event):
+        try:
+            while not stop.is_set():
+                batch = self._next_batch(stop)
+                if batch and self._take_token(stop):
+                    self._deliver(batch, stop)
+            # Last chance for whatever is still queued: one attempt, no retries
+            batch = self._drain(self.dispatcher.batch_size)
+            if batch:
+                self._deliver(batch, stop)
+        finally:
+            self.sink.close()
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        with self._cond:
+            return [self._pending.popleft() for _ in range(min(limit, len(self._pending)))]
+
+    def _next_batch(self, stop: threading.Event) -> List[Dict[str, Any]]:
+        """Wait for a full batch, or for the oldest alert to be ``batch_delay`` old."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or stop.is_set(), timeout=1.0)
+            if not self._pending:
+                return []
+            deadline = self._pending[0]["queued_at"] + self.dispatcher.batch_delay
+            while len(self._pending) < self.dispatcher.batch_size and not stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        return self._drain(self.dispatcher.batch_size)
+
+    def _take_token(self, stop: threading.Event) -> bool:
+        """Token bucket of ``rate_per_min`` batches per minute; waits for a token if empty."""
+        rate = self.dispatcher.rate_per_min / 60.0
+        while not stop.is_set():
+            now = time.monotonic()
+            self._tokens = min(self.dispatcher.rate_per_min, self._tokens + (now - self._refilled) * rate)
+            self._refilled = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.rate_limited += 1
+            stop.wait((1 - self._tokens) / rate)
+        return True
+
+    def _deliver(self, batch: List[Dict[str, Any]], stop: threading.Event):
+        payload = [{k: v for k, v in alert.items() if k != "queued_at"} for alert in batch]
+        delay = self.dispatcher.retry_initial
+        for attempt in range(1, self.dispatcher.max_attempts + 1):
+            try:
+                self.sink.send(payload)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                if attempt == self.dispatcher.max_attempts or stop.is_set():
+                    break
+                self.retries += 1
+                if stop.wait(delay):
+                    break
+                delay = min(delay * 2, self.dispatcher.retry_max)
+                continue
+            now = time.time()
+            self.delivered += len(batch)
+            self.batches += 1
+            self.latencies.extend(now - alert["raised_at"] for alert in batch)
+            return
+        self.failed += len(batch)
+        print(f"Alert sink {self.sink.name} gave up on {len(batch)} alerts: {self.last_error}")
+
+
+class AlertDispatcher:
+    """Delivers raised alerts to outbound sinks without ever blocking the frame loop.
+
+    ``notify`` only appends to a bounded queue (dropping the oldest alert when
+    full). A dispatcher thread drops repeats of an alert seen within
+    ``dedup_seconds`` and hands the rest to one worker thread per sink, so a
+    slow or dead sink only delays itself. Each worker sends batches of up to
+    ``batch_size`` alerts, at most ``batch_delay`` after the oldest was queued,
+    no more than ``rate_per_min`` batches a minute, retrying failures with
+    exponential backoff up to ``max_attempts`` times.
+    """
+
+    def __init__(
+        self,
+        sinks: Sequence[AlertSink],
+        queue_size: int = 1000,
+        batch_size: int = 20,
+        batch_delay: float = 0.5,
+        dedup_seconds: float = 60.0,
+        rate_per_min: int = 30,
+        retry_initial: float = 1.0,
+        retry_max: float = 60.0,
+        max_attempts: int = 5,
+    ):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.dedup_seconds = dedup_seconds
+        self.rate_per_min = rate_per_min
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self.max_attempts = max_attempts
+        self.workers = [_SinkWorker(sink, self) for sink in sinks]
+        self._queue: Deque[Dict[str, Any]] = deque(maxlen=queue_size)
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_sent: Dict[str, float] = {}
+        self.received = 0
+        self.dropped = 0
+        self.deduplicated = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None or not self.workers:
+            return
+        self._stop = threading.Event()
+        for worker in self.workers:
+            worker.start(self._stop)
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop dispatching; each sink gets one last attempt at what it has queued."""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        thread.join(timeout)
+        for worker in self.workers:
+            worker.join(timeout)
+
+    def notify(self, alert: str, raised_at: float, **details: Any):
+        """Queue a raised alert. Safe to call from the frame loop: it never waits on a sink."""
+        if self._thread is None:
+            return
+        event = {"alert": alert, "raised_at": raised_at, **details, "queued_at": time.monotonic()}
+        with self._cond:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(event)
+            self.received += 1
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.is_running,
+            "queued": len(self._queue),
+            "received": self.received,
+            "dropped": self.dropped,
+            "deduplicated": self.deduplicated,
+            "sinks": {worker.sink.name: worker.stats() for worker in self.workers},
+        }
+
+    def _run(self, stop: threading.Event):
+        while not stop.is_set():
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or stop.is_set(), timeout=1.0)
+                events = list(self._queue)
+                self._queue.clear()
+            for event in events:
+                # One notification per alert per window, not one per re-raise
+                last = self._last_sent.get(event["alert"])
+                if last is not None and event["raised_at"] - last < self.dedup_seconds:
+                    self.deduplicated += 1
+                    continue
+                self._last_sent[event["alert"]] = event["raised_at"]
+                for worker in self.workers:
+                    worker.offer(event)
@@ -1,8 +1,34 @@
+import itertools
 import time
-from threading import Lock
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, NamedTuple, Optional, Sequence, Tuple
+
+ALERT_DISPLAY_SECONDS = 3  # raised alerts clear themselves after this long
+
+
+class AlertSnapshot(NamedTuple):
+    """Alert state as of the last update; never mutated once published."""
+    alerts: Dict[str, bool]
+    timestamps: Dict[str, Optional[float]]
+    reset_generation: int
+
+    def active(self, now: float) -> Dict[str, bool]:
+        """Alerts still within their display window at ``now``."""
+        return {
+            k: v and self.timestamps[k] is not None and now - self.timestamps[k] < ALERT_DISPLAY_SECONDS
+            for k, v in self.alerts.items()
+        }
+
 
 class AlertService:
+    """Tracks alert conditions on the frame loop and publishes them as snapshots.
+
+    Only the frame loop mutates alert state. Readers get the last published
+    AlertSnapshot without locking; a reset requested by a reader is recorded
+    as a generation number and applied by the frame loop on its next update.
+    ``on_raise`` is called with the alert name and time whenever an alert
+    that was off turns on.
+    """
+
     def __init__(
         self,
         posture_n_seconds: int = 5,
@@ -10,7 +36,8 @@ class AlertService:
         distance_n_seconds: int = 5,
         yawn_n_seconds: int = 5,
         drowsy_n_seconds: int = 5,
-        blink_n_seconds: int = 10
+        blink_n_seconds: int = 10,
+        on_raise: Optional[Callable[[str, float], None]] = None
     ):
         self.posture_n_seconds = posture_n_seconds
         self.multi_posture_n_seconds = multi_posture_n_seconds
@@ -18,7 +45,10 @@ class AlertService:
         self.yawn_n_seconds = yawn_n_seconds
         self.drowsy_n_seconds = drowsy_n_seconds
         self.blink_n_seconds = blink_n_seconds
-        self.lock = Lock()
+        self.on_raise = on_raise
+        self._reset_requests = itertools.count(1)
+        self._requested_generation = 0
+        self._applied_generation = 0
         self.reset_alerts()
         self.last_update = time.time()
 
@@ -40,90 +70,104 @@ class AlertService:
             "blink": []
         }
         self.last_blink_time = time.time()
+        self._publish()
+
+    def _publish(self):
+        self.snapshot = AlertSnapshot(
+            dict(self.alerts), dict(self.alert_timestamps), self._applied_generation
+        )
 
     def _set_alert(self, alert_name: str):
+        now = time.time()
+        if not self.alerts[alert_name] and self.on_raise is not None:
+            self.on_raise(alert_name, now)
         self.alerts[alert_name] = True
-        self.alert_timestamps[alert_name] = time.time()
+        self.alert_timestamps[alert_name] = now
 
     def _auto_reset_alerts(self):
         now = time.time()
         for k, v in self.alerts.items():
             if v and self.alert_timestamps[k] is not None:
-                if now - self.alert_timestamps[k] >= 3:
+                if now - self.alert_timestamps[k] >= ALERT_DISPLAY_SECONDS:
                     self.alerts[k] = False
                     self.alert_timestamps[k] = None
 
     def update(
         self,
-        posture_angles: Optional[dict],
+        posture_angles: Optional[Sequence[float]],
         distance: Optional[float],
         yawn: bool,
         drowsy: bool,
         blink: bool,
-        posture_thresholds: dict,
+        posture_thresholds: Sequence[Tuple[float, float]],
         distance_threshold: float,
         yawn_threshold: int,
         blink_threshold: int
     ):
         now = time.time()
-        with self.lock:
-            # Posture angle alerts
-            unhealthy_angles = 0
-            if posture_angles:
-                for k, v in posture_angles.items():
-                    if k in posture_thresholds and not posture_thresholds[k][0] <= v <= posture_thresholds[k][1]:
-                        unhealthy_angles += 1
-                        if k not in self.timers["posture"]:
-                            self.timers["posture"][k] = now
-                        elif now - self.timers["posture"][k] >= self.posture_n_seconds:
-                            self._set_alert("posture_angle_unhealthy")
-                    else:
-                        self.timers["posture"].pop(k, None)
-                if unhealthy_angles >= 3:
-                    if "multi" not in self.timers["posture"]:
-                        self.timers["posture"]["multi"] = now
-                    elif now - self.timers["posture"]["multi"] >= self.multi_posture_n_seconds:
-                        self._set_alert("multiple_posture_angles_unhealthy")
+        requested = self._requested_generation
+        if requested != self._applied_generation:
+            self._applied_generation = requested
+            self.reset_alerts()
+        # Posture angle alerts
+        unhealthy_angles = 0
+        if posture_angles:
+            # Angles and thresholds are both in PostureAngleId order
+            for k, (v, (low, high)) in enumerate(zip(posture_angles, posture_thresholds)):
+                if not low <= v <= high:
+                    unhealthy_angles += 1
+                    if k not in self.timers["posture"]:
+                        self.timers["posture"][k] = now
+                    elif now - self.timers["posture"][k] >= self.posture_n_seconds:
+                        self._set_alert("posture_angle_unhealthy")
                 else:
-                    self.timers["posture"].pop("multi", None)
-            # Distance alert
-            if distance is not None and distance < distance_threshold:
-                if self.timers["distance"] is None:
-                    self.timers["distance"] = now
-                elif now - self.timers["distance"] >= self.distance_n_seconds:
-                    self._set_alert("distance_too_close")
+                    self.timers["posture"].pop(k, None)
+            if unhealthy_angles >= 3:
+                if "multi" not in self.timers["posture"]:
+                    self.timers["posture"]["multi"] = now
+                elif now - self.timers["posture"]["multi"] >= self.multi_posture_n_seconds:
+                    self._set_alert("multiple_posture_angles_unhealthy")
             else:
-                self.timers["distance"] = None
-            # Yawn alert
-            if yawn:
-                self.timers["yawn"].append(now)
-            self.timers["yawn"] = [t for t in self.timers["yawn"] if now - t <= self.yawn_n_seconds]
-            if len(self.timers["yawn"]) >= yawn_threshold:
-                self._set_alert("excessive_yawning")
-            # Yawn + drowsy alert
-            if yawn and drowsy:
-                self.timers["drowsy"].append(now)
-            self.timers["drowsy"] = [t for t in self.timers["drowsy"] if now - t <= self.drowsy_n_seconds]
-            if len(self.timers["drowsy"]) >= yawn_threshold:
-                self._set_alert("yawn_and_drowsy")
-            # Blink alert
-            if blink:
-                self.last_blink_time = now
-                self.timers["blink"].append(now)
-            self.timers["blink"] = [t for t in self.timers["blink"] if now - t <= self.blink_n_seconds]
-            if len(self.timers["blink"]) < blink_threshold and now - self.last_blink_time >= self.blink_n_seconds:
-                self._set_alert("insufficient_blinks")
-            # At the end of update, call auto-reset
-            self._auto_reset_alerts()
+                self.timers["posture"].pop("multi", None)
+        # Distance alert
+        if distance is not None and distance < distance_threshold:
+            if self.timers["distance"] is None:
+                self.timers["distance"] = now
+            elif now - self.timers["distance"] >= self.distance_n_seconds:
+                self._set_alert("distance_too_close")
+        else:
+            self.timers["distance"] = None
+        # Yawn alert
+        if yawn:
+            self.timers["yawn"].append(now)
+        self.timers["yawn"] = [t for t in self.timers["yawn"] if now - t <= self.yawn_n_seconds]
+        if len(self.timers["yawn"]) >= yawn_threshold:
+            self._set_alert("excessive_yawning")
+        # Yawn + drowsy alert
+        if yawn and drowsy:
+            self.timers["drowsy"].append(now)
+        self.timers["drowsy"] = [t for t in self.timers["drowsy"] if now - t <= self.drowsy_n_seconds]
+        if len(self.timers["drowsy"]) >= yawn_threshold:
+            self._set_alert("yawn_and_drowsy")
+        # Blink alert
+        if blink:
+            self.last_blink_time = now
+            self.timers["blink"].append(now)
+        self.timers["blink"] = [t for t in self.timers["blink"] if now - t <= self.blink_n_seconds]
+        if len(self.timers["blink"]) < blink_threshold and now - self.last_blink_time >= self.blink_n_seconds:
+            self._set_alert("insufficient_blinks")
+        # At the end of update, call auto-reset
+        self._auto_reset_alerts()
+        self._publish()
 
     def get_alerts(self) -> Dict[str, bool]:
-        with self.lock:
-            self._auto_reset_alerts()
-            return self.alerts.copy()
+        snapshot = self.snapshot
+        if snapshot.reset_generation != self._requested_generation:
+            # A reset is pending; the frame loop has not applied it yet.
+            return {k: False for k in snapshot.alerts}
+        return snapshot.active(time.time())
 
     def get_and_reset_alerts(self) -> Dict[str, bool]:
-        with self.lock:
-            self._auto_reset_alerts()
-            result = self.alerts.copy()
-            self.reset_alerts()
-            return result
+        result = self.get_alerts()
+        self._requested_generation = next(self._reset_requests)
+        return result
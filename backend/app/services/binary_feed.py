@@ -0,0 +1,126 @@
+import os
+import socket
+import threading
+import time
+from typing import Callable, Iterator, Optional, Sequence, Tuple
+
+from app.models.feed_format import FEED_MAGIC, FEED_VERSION, HEADER, RECORD, pack_record
+from app.services.frame_broadcast import Subscription
+from app.utils.lock_stats import TimedLock
+
+
+class BinaryFeed:
+    """Packs every frame's metrics into fixed-size records and fans out chunks of them.
+
+    Records accumulate in a preallocated buffer and go out as one chunk once
+    ``batch_size`` records are collected or the oldest is ``max_delay`` seconds
+    old, so consumers get one message per chunk instead of one per frame.
+    Nothing is packed while there are no subscribers. A subscriber that falls
+    behind loses its oldest chunks; gaps show up in the chunk sequence number.
+    """
+
+    def __init__(self, camera_id: int, batch_size: int, max_delay: float):
+        self.camera_id = camera_id
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._buffer = bytearray(HEADER.size + RECORD.size * batch_size)
+        self._count = 0
+        self._first_at = 0.0
+        self._seq = 0
+        # Copy-on-write, like FrameBroadcaster, so publishing never takes the lock to fan out
+        self._subscribers: Tuple[Subscription, ...] = ()
+        self._lock = TimedLock("binary-feed")
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, maxsize: int = 64) -> Subscription:
+        subscription = Subscription(self, maxsize)
+        with self._lock:
+            self._subscribers += (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+            if not self._subscribers:
+                self._count = 0
+        subscription._close()
+
+    def publish(self, timestamp: float, flags: int, distance: Optional[float],
+                pitch: Optional[float], yaw: Optional[float], ear: Optional[float],
+                mar: Optional[float], brightness: Optional[float],
+                posture: Optional[Sequence[float]]):
+        """Add one frame's record, sending a chunk when the batch is full or old enough."""
+        if not self._subscribers:
+            return
+        with self._lock:
+            if self._count == 0:
+                self._first_at = time.monotonic()
+            pack_record(self._buffer, HEADER.size + RECORD.size * self._count,
+                        timestamp, self.camera_id, flags,
+                        distance, pitch, yaw, ear, mar, brightness, posture)
+            self._count += 1
+            if self._count < self.batch_size and time.monotonic() - self._first_at < self.max_delay:
+                return
+            chunk = self._seal_locked()
+        for subscription in self._subscribers:
+            subscription._push(chunk)
+
+    def _seal_locked(self) -> bytes:
+        self._seq = (self._seq + 1) & 0xFFFFFFFF
+        HEADER.pack_into(self._buffer, 0, FEED_MAGIC, FEED_VERSION, RECORD.size, self._count, self._seq)
+        chunk = bytes(self._buffer[:HEADER.size + RECORD.size * self._count])
+        self._count = 0
+        return chunk
+
+
+class UnixFeedServer:
+    """Serves the binary feed on a local Unix socket, one thread per connected reader.
+
+    Chunks are written back to back; each header carries the record count, so
+    readers can split the byte stream without any extra framing.
+    """
+
+    def __init__(self, path: str, chunks: Callable[[], Iterator[bytes]]):
+        self.path = path
+        self._chunks = chunks
+        self._server: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen()
+        self._thread = threading.Thread(target=self._accept, name="binary-feed-unix", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _accept(self):
+        server = self._server
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), name="binary-feed-client", daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        chunks = self._chunks()
+        try:
+            for chunk in chunks:
+                conn.sendall(chunk)
+        except OSError:
+            pass
+        finally:
+            chunks.close()
+            conn.close()
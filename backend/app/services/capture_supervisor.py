@@ -0,0 +1,140 @@
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.services.frame_sources import FrameSource, SourceFrame
+
+
+class CaptureSupervisor:
+    """Keeps a frame source alive across read failures and stalls.
+
+    A read that fails, or brings no frame within ``stall_factor`` frame
+    intervals (at least ``min_stall_timeout``), marks the camera down and
+    closes the source. While down, ``read`` returns None straight away and
+    reopens the source when the backoff expires, doubling the delay after
+    each failed attempt up to ``backoff_max``. The outage ends with the
+    first frame after a reopen. The first frame after any open may take
+    ``startup_timeout``, since cameras take a moment to start streaming.
+    Callers keep their subscribers and sessions; they only see ticks with
+    no frame.
+
+    Recorded sources get ``startup_timeout`` for every frame, as they may
+    legitimately decode slower than the frame rate. They are not reopened
+    when they run out: ``ended`` is set and ``read`` keeps returning None.
+    """
+
+    def __init__(
+        self,
+        source: FrameSource,
+        interval: Callable[[], float],
+        stall_factor: float = 5.0,
+        backoff_initial: float = 0.5,
+        backoff_max: float = 30.0,
+        startup_timeout: float = 5.0,
+        min_stall_timeout: float = 0.5,
+    ):
+        self.source = source
+        self._interval = interval
+        self.stall_factor = stall_factor
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.startup_timeout = startup_timeout
+        self.min_stall_timeout = min_stall_timeout
+        self._starting = False
+        self.ended = False
+        self.down_since: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.outages = 0
+        self.reconnects = 0
+        self.reconnect_attempts = 0
+        self.total_down_time = 0.0
+        self.last_outage_duration: Optional[float] = None
+        self.longest_outage_duration = 0.0
+        self._backoff = backoff_initial
+        self._next_attempt = 0.0
+
+    @property
+    def is_down(self) -> bool:
+        return self.down_since is not None
+
+    def open(self):
+        """Open the source; failing here is reported to the caller, not retried."""
+        self.source.open()
+        self._starting = True
+        self.ended = False
+
+    def close(self):
+        self.source.close(timeout=self._stall_timeout())
+        self.down_since = None
+
+    def read(self) -> Optional[SourceFrame]:
+        """Next frame, or None while the camera is down or just went down."""
+        if self.is_down and not self._reconnect_due():
+            return None
+        live = self.source.live
+        timeout = self.startup_timeout if self._starting or not live else self._stall_timeout()
+        frame = self.source.read(timeout=timeout)
+        self._starting = False
+        if frame is None:
+            if not live and not self.source.is_opened:
+                self.ended = True
+                return None
+            self._failed("stalled" if self.source.is_opened else "read failed")
+            return None
+        if self.is_down:
+            self._recovered()
+        return frame
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "state": "ended" if self.ended else "down" if self.is_down else "up",
+            "down_since": self.down_since,
+            "current_outage_sec": round(now - self.down_since, 2) if self.is_down else 0.0,
+            "outages": self.outages,
+            "reconnects": self.reconnects,
+            "reconnect_attempts": self.reconnect_attempts,
+            "total_down_sec": round(self.total_down_time + (now - self.down_since if self.is_down else 0), 2),
+            "last_outage_sec": round(self.last_outage_duration, 2) if self.last_outage_duration is not None else None,
+            "longest_outage_sec": round(self.longest_outage_duration, 2),
+            "corrupt_frames": self.source.frames_corrupt,
+            "next_attempt_in_sec": round(max(0.0, self._next_attempt - time.monotonic()), 2) if self.is_down else None,
+            "last_error": self.last_error,
+        }
+
+    def _stall_timeout(self) -> float:
+        return max(self.stall_factor * self._interval(), self.min_stall_timeout)
+
+    def _failed(self, reason: str):
+        self.last_error = reason
+        if not self.is_down:
+            self.down_since = time.time()
+            self.outages += 1
+            self._backoff = self.backoff_initial
+            self._next_attempt = time.monotonic()  # first reconnect right away
+            print(f"Camera {reason}; reconnecting")
+        else:
+            self._next_attempt = time.monotonic() + self._backoff
+            self._backoff = min(self._backoff * 2, self.backoff_max)
+        self.source.close(timeout=self._stall_timeout())
+
+    def _reconnect_due(self) -> bool:
+        """Reopen the source if the backoff has expired; True if it is open now."""
+        if time.monotonic() < self._next_attempt:
+            return False
+        self.reconnect_attempts += 1
+        try:
+            self.source.open()
+            self._starting = True
+            return True
+        except Exception as e:
+            self._failed(f"reopen failed: {getattr(e, 'detail', e)}")
+            return False
+
+    def _recovered(self):
+        duration = time.time() - self.down_since
+        self.total_down_time += duration
+        self.last_outage_duration = duration
+        self.longest_outage_duration = max(self.longest_outage_duration, duration)
+        self.reconnects += 1
+        self.down_since = None
+        print(f"Camera back after {duration:.1f}s")
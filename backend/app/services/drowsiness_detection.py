@@ -1,122 +1,42 @@
 import cv2
 import mediapipe as mp
 import numpy as np
-from typing import Optional, Tuple, List
+from typing import Any, Dict, Optional, Sequence, Tuple, List
 from app.core.config import settings
 from app.utils.calculations import (
-    calculate_aspect_ratio, 
-    calculate_vector_angle, 
-    landmarks_to_3d
+    batch_aspect_ratio,
+    batch_iris_diameter,
+    batch_pitch,
+    batch_yaw,
+    iou_matrix
 )
 from app.services.face_detection import FaceDetectionService
+from app.services.face_tracker import FaceTracker
+from app.services.analysis_scheduler import AnalysisScheduler
 from app.services.posture_angles import PostureAngles
+from app.utils.buffer_pool import frame_pool
+from app.models.records import (
+    POSTURE_ANGLE_NAMES,
+    POSTURE_HEALTHY_RANGES,
+    posture_array
+)
+
+# How face distance is measured: from the face detector's box width or from the mesh's iris size
+DISTANCE_METHODS = ("detector", "iris")
+
+class FatigueState:
+    """Drowsiness, yawn and blink counters for one tracked face."""
 
-class DrowsinessDetectionService:
-    """Service for drowsiness and posture detection."""
-    
-    # Landmark indices
-    LEFT_EYE = [33, 160, 158, 133, 153, 144]
-    RIGHT_EYE = [362, 385, 387, 263, 373, 380]
-    MOUTH = [61, 81, 13, 311, 308, 402, 14, 178]
-    
     def __init__(self):
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=False, 
-            max_num_faces=1, 
-            refine_landmarks=True
-        )
-        self.face_detection_service = FaceDetectionService()
-        self.posture_angles = PostureAngles()
+        self.reset()
+
+    def reset(self):
         self.eye_counter = 0
         self.yawn_counter = 0
         self.blink_count = 0
         self.frame_counter = 0
 
-    
-    def process_frame(
-        self, 
-        rgb_image: np.ndarray, 
-        frame: np.ndarray
-    ) -> Tuple[Optional[float], Optional[float], Optional[float], Optional[float], bool, bool, Optional[dict]]:
-        """
-        Process frame for drowsiness detection and posture analysis.
-        
-        Returns:
-            Tuple of (pitch_angle, ear, mar, yaw_angle, drowsiness_detected, yawn_detected)
-        """
-        h, w = frame.shape[:2]
-        results = self.face_mesh.process(rgb_image)
-        
-        if not results.multi_face_landmarks:
-            return None, None, None, None, False, False
-            
-        for face_landmarks in results.multi_face_landmarks:
-            lm = face_landmarks.landmark
-            
-            # Convert landmarks
-            landmarks_2d = [(int(pt.x * w), int(pt.y * h)) for pt in lm]
-            landmarks_3d = [(pt.x * w, pt.y * h, pt.z * w) for pt in lm]
-            
-            # Calculate pitch
-            pitch_angle = self._calculate_pitch(lm, w, h)
-            
-            # Calculate EAR and MAR
-            ear = self._calculate_ear(landmarks_2d)
-            mar = self._calculate_mar(landmarks_2d)
-            
-            # Calculate yaw
-            yaw_angle = self._calculate_yaw(landmarks_3d)
-            
-            # Detect drowsiness and yawning
-            drowsiness_detected, yawn_detected, blink_detected = self._detect_fatigue(ear, mar, yaw_angle)
-
-            distance, brightness = self.face_detection_service.detect_face_and_measure_distance(rgb_image, frame)
-
-            posture_angles = self.posture_angles.compute_posture_angles(distance, pitch_angle)
-            
-            # Draw visualizations
-            self._draw_pitch_line(frame, lm, w, h)
-            self._draw_status_table(frame, pitch_angle, ear, mar, yaw_angle, brightness,
-                                  drowsiness_detected, yawn_detected, w, h, posture_angles)
-            
-            return pitch_angle, ear, mar, yaw_angle, drowsiness_detected, yawn_detected,blink_detected, posture_angles
-            
-        return None, None, None, None, False, False, False, None
-    
-    def _calculate_pitch(self, landmarks, w: int, h: int) -> float:
-        """Calculate head pitch angle."""
-        left_eye = landmarks_to_3d(landmarks, 33, w, h)
-        right_eye = landmarks_to_3d(landmarks, 263, w, h)
-        chin = landmarks_to_3d(landmarks, 152, w, h)
-        
-        eye_mid = (left_eye + right_eye) / 2
-        eye_vec = right_eye - left_eye
-        vertical_vec = chin - eye_mid
-        normal = np.cross(eye_vec, vertical_vec)
-        
-        ground_plane = np.array([0, -1, 0])
-        return calculate_vector_angle(normal, ground_plane)
-    
-    def _calculate_ear(self, landmarks_2d: List[Tuple[int, int]]) -> float:
-        """Calculate Eye Aspect Ratio."""
-        left_ear = calculate_aspect_ratio(landmarks_2d, self.LEFT_EYE)
-        right_ear = calculate_aspect_ratio(landmarks_2d, self.RIGHT_EYE)
-        return (left_ear + right_ear) / 2.0
-    
-    def _calculate_mar(self, landmarks_2d: List[Tuple[int, int]]) -> float:
-        """Calculate Mouth Aspect Ratio."""
-        return calculate_aspect_ratio(landmarks_2d, self.MOUTH)
-    
-    def _calculate_yaw(self, landmarks_3d: List[Tuple[float, float, float]]) -> float:
-        """Calculate head yaw angle."""
-        left_eye_outer_3d = np.array(landmarks_3d[self.LEFT_EYE[0]])
-        right_eye_outer_3d = np.array(landmarks_3d[self.RIGHT_EYE[3]])
-        eye_vector = right_eye_outer_3d - left_eye_outer_3d
-        yaw_angle_rad = np.arctan2(eye_vector[2], eye_vector[0])
-        return np.degrees(yaw_angle_rad)
-    
-    def _detect_fatigue(self, ear: float, mar: float, yaw_angle: float) -> Tuple[bool, bool, bool]:
+    def update(self, ear: float, mar: float, yaw_angle: float) -> Tuple[bool, bool, bool]:
         """Detect drowsiness, yawning, and blink detection.
         Returns: (drowsiness_detected, yawn_detected, blink_detected)
         """
@@ -155,17 +75,254 @@ class DrowsinessDetectionService:
         return drowsiness_detected, yawn_detected, blink_detected
 
 
+class DrowsinessDetectionService:
+    """Service for drowsiness and posture detection."""
+    
+    # Landmark indices
+    LEFT_EYE = [33, 160, 158, 133, 153, 144]
+    RIGHT_EYE = [362, 385, 387, 263, 373, 380]
+    MOUTH = [61, 81, 13, 311, 308, 402, 14, 178]
+    CHIN = 152
+    # Horizontal edges of each iris (refined mesh only)
+    IRIS_EDGES = [(469, 471), (474, 476)]
     
-    def _draw_pitch_line(self, frame: np.ndarray, landmarks, w: int, h: int):
+    def __init__(self, face_detection_service: Optional[FaceDetectionService] = None):
+        self.mp_face_mesh = mp.solutions.face_mesh
+        self.refine_landmarks = True
+        self._meshes = {}
+        self.face_mesh = self._mesh(True)
+        self.face_detection_service = face_detection_service or FaceDetectionService()
+        self.posture_angles = PostureAngles()
+        self.tracker = FaceTracker()
+        self.fatigue: Dict[int, FatigueState] = {}
+        self.primary_id: Optional[int] = None
+        self.retired: List[int] = []  # ids retired since the last take_retired
+
+    def _mesh(self, refine_landmarks: bool):
+        mesh = self._meshes.get(refine_landmarks)
+        if mesh is None:
+            mesh = self._meshes[refine_landmarks] = self.mp_face_mesh.FaceMesh(
+                static_image_mode=False, 
+                max_num_faces=settings.MAX_NUM_FACES, 
+                refine_landmarks=refine_landmarks
+            )
+        return mesh
+
+    def set_refine_landmarks(self, refine_landmarks: bool):
+        """Switch between the iris-refined and the plain face mesh; each is built once."""
+        if refine_landmarks != self.refine_landmarks:
+            self.face_mesh = self._mesh(refine_landmarks)
+            self.refine_landmarks = refine_landmarks
+
+    @property
+    def primary_state(self) -> FatigueState:
+        """Counters of the primary (largest) face, used by the single-face API."""
+        state = self.fatigue.get(self.primary_id)
+        return state if state is not None else FatigueState()
+
+    @property
+    def eye_counter(self) -> int:
+        return self.primary_state.eye_counter
+
+    @property
+    def yawn_counter(self) -> int:
+        return self.primary_state.yawn_counter
+
+    @property
+    def blink_count(self) -> int:
+        return self.primary_state.blink_count
+
+    def process_frame(
+        self, 
+        rgb_image: np.ndarray, 
+        frame: np.ndarray
+    ) -> Tuple[Optional[float], Optional[float], Optional[float], Optional[float], bool, bool, bool, Optional[dict]]:
+        """
+        Process frame for drowsiness detection and posture analysis of the primary face.
+        
+        Returns:
+            Tuple of (pitch_angle, ear, mar, yaw_angle, drowsiness_detected, yawn_detected,
+            blink_detected, posture_angles)
+        """
+        for face in self.process_faces(rgb_image, frame):
+            if face["primary"]:
+                posture = face["posture"]
+                posture_angles = dict(zip(POSTURE_ANGLE_NAMES, posture)) if posture else {}
+                return (face["pitch"], face["ear"], face["mar"], face["yaw"],
+                        face["drowsiness_detected"], face["yawn_detected"],
+                        face["blink_detected"], posture_angles)
+        return None, None, None, None, False, False, False, None
+
+    def process_faces(
+        self,
+        rgb_image: np.ndarray,
+        frame: np.ndarray,
+        detections: Optional[List[Dict[str, Any]]] = None,
+        draw: bool = True,
+        scheduler: Optional[AnalysisScheduler] = None,
+        distance: str = "detector",
+        scale: int = 1
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyse every face in the frame in one vectorized pass.
+
+        ``detections`` are FaceDetectionService.detect_faces results for this
+        frame; they are computed here when not supplied. With ``draw`` off the
+        frame is left untouched; see ``draw_faces``. Given a ``scheduler``, the
+        posture regression runs as its "posture" stage, keyed on its inputs.
+        With ``distance`` "iris" distances come from the iris landmarks (the
+        mesh must be refined), no detector runs and "brightness" is left None
+        for the caller to measure; ``scale`` is as in detect_faces.
+
+        Returns:
+            One dict per face with its stable "face_id", metrics, fatigue flags
+            and counters. The largest face is flagged "primary".
+        """
+        h, w = frame.shape[:2]
+        results = self.face_mesh.process(rgb_image)
+
+        if not results.multi_face_landmarks:
+            self._retire(self.tracker.update(np.empty((0, 4)))[1])
+            self.primary_id = None
+            return []
+
+        landmarks = np.array([
+            [(pt.x, pt.y, pt.z) for pt in face_landmarks.landmark]
+            for face_landmarks in results.multi_face_landmarks
+        ])
+        landmarks_3d = landmarks * (w, h, w)
+        landmarks_2d = (landmarks[:, :, :2] * (w, h)).astype(int)
+        boxes = np.concatenate([landmarks_2d.min(axis=1), landmarks_2d.max(axis=1)], axis=1)
+
+        face_ids, retired = self.tracker.update(boxes)
+        self._retire(retired)
+
+        # Calculate pitch, yaw, EAR and MAR for all faces at once
+        pitch = batch_pitch(landmarks_3d, self.LEFT_EYE[0], self.RIGHT_EYE[3], self.CHIN)
+        yaw = batch_yaw(landmarks_3d, self.LEFT_EYE[0], self.RIGHT_EYE[3])
+        ear = (batch_aspect_ratio(landmarks_2d, self.LEFT_EYE) +
+               batch_aspect_ratio(landmarks_2d, self.RIGHT_EYE)) / 2.0
+        mar = batch_aspect_ratio(landmarks_2d, self.MOUTH)
+
+        if distance == "iris":
+            matched: List[Optional[Dict[str, Any]]] = [None] * len(boxes)
+            distances = self._iris_distances(landmarks_3d, scale)
+        else:
+            if detections is None:
+                detections = self.face_detection_service.detect_faces(rgb_image, frame, draw=draw)
+            matched = self._match_detections(boxes, detections)
+            distances = [d["distance"] if d else None for d in matched]
+        if scheduler is None:
+            posture = self.posture_angles.compute_posture_array_batch(distances, pitch)
+        else:
+            # Pitch at the precision it is reported with, so mesh jitter alone does not rerun it
+            posture = scheduler.run(
+                "posture", self.posture_angles.compute_posture_array_batch, distances, pitch,
+                inputs=(tuple(distances), tuple(np.round(pitch, 2))),
+            )
+
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        primary_index = int(np.argmax(areas))
+        self.primary_id = face_ids[primary_index]
+
+        faces = []
+        for i, face_id in enumerate(face_ids):
+            state = self.fatigue.setdefault(face_id, FatigueState())
+            # Detect drowsiness and yawning
+            drowsiness_detected, yawn_detected, blink_detected = state.update(ear[i], mar[i], yaw[i])
+            faces.append({
+                "face_id": face_id,
+                "primary": i == primary_index,
+                "bbox": tuple(int(v) for v in boxes[i]),
+                "eye_line": (tuple(landmarks_2d[i, 33]), tuple(landmarks_2d[i, 263])),
+                "pitch": float(pitch[i]),
+                "ear": float(ear[i]),
+                "mar": float(mar[i]),
+                "yaw": float(yaw[i]),
+                "distance": distances[i],
+                "brightness": matched[i]["brightness"] if matched[i] else None,
+                "posture": None if np.isnan(posture[i]).any() else posture_array(posture[i]),
+                "drowsiness_detected": drowsiness_detected,
+                "yawn_detected": yawn_detected,
+                "blink_detected": blink_detected,
+                "eye_counter": state.eye_counter,
+                "yawn_counter": state.yawn_counter,
+                "blink_count": state.blink_count,
+            })
+
+        if draw:
+            self.draw_faces(frame, faces)
+        return faces
+
+    def draw_faces(self, frame: np.ndarray, faces: List[Dict[str, Any]], table: bool = True):
+        """Draw pitch lines, face ids and, with ``table``, the primary face's status table."""
+        if not faces:
+            return
+        h, w = frame.shape[:2]
+        for face in faces:
+            self._draw_pitch_line(frame, face["eye_line"])
+            if len(faces) > 1:
+                self._draw_face_id(frame, face)
+        if not table:
+            return
+        primary = next(face for face in faces if face["primary"])
+        self._draw_status_table(frame, primary["pitch"], primary["ear"], primary["mar"],
+                                primary["yaw"], primary["brightness"],
+                                primary["drowsiness_detected"], primary["yawn_detected"],
+                                w, h, primary["posture"], primary["blink_count"])
+
+    def _iris_distances(self, landmarks_3d: np.ndarray, scale: int) -> List[Optional[float]]:
+        """Distance of each face from its apparent iris size; None without iris landmarks."""
+        diameters = batch_iris_diameter(landmarks_3d, self.IRIS_EDGES) * scale
+        return [
+            settings.FOCAL_LENGTH * settings.IRIS_DIAMETER_CM / float(d) if d > 0 else None
+            for d in diameters
+        ]
+
+    def _match_detections(
+        self,
+        boxes: np.ndarray,
+        detections: List[Dict[str, Any]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Pair each mesh face box with the detector result that overlaps it most."""
+        matched: List[Optional[Dict[str, Any]]] = [None] * len(boxes)
+        if not detections:
+            return matched
+        iou = iou_matrix(boxes, [d["bbox"] for d in detections])
+        used = set()
+        for flat in np.argsort(iou, axis=None)[::-1]:
+            i, j = divmod(int(flat), len(detections))
+            if iou[i, j] <= 0:
+                break
+            if matched[i] is None and j not in used:
+                matched[i] = detections[j]
+                used.add(j)
+        return matched
+
+    def _retire(self, face_ids: List[int]):
+        for face_id in face_ids:
+            self.fatigue.pop(face_id, None)
+        self.retired.extend(face_ids)
+
+    def take_retired(self) -> List[int]:
+        """Ids of the faces retired by the tracker since the last call."""
+        retired, self.retired = self.retired, []
+        return retired
+
+    def _draw_pitch_line(self, frame: np.ndarray, eye_line):
         """Draw line between eyes for pitch visualization."""
-        left_eye = landmarks_to_3d(landmarks, 33, w, h)
-        right_eye = landmarks_to_3d(landmarks, 263, w, h)
-        cv2.line(frame, (int(left_eye[0]), int(left_eye[1])),
-                (int(right_eye[0]), int(right_eye[1])), (0, 255, 255), 1)
+        (x1, y1), (x2, y2) = eye_line
+        cv2.line(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 255), 1)
+    
+    def _draw_face_id(self, frame: np.ndarray, face: Dict[str, Any]):
+        """Label a face with its tracking id."""
+        x1, y1 = face["bbox"][:2]
+        cv2.putText(frame, f"#{face['face_id']}", (x1, max(y1 - 8, 12)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 200, 0), 1)
     
     def _draw_status_table(self, frame: np.ndarray, pitch: float, ear: float, 
                           mar: float, yaw: float, brightness: float, drowsiness: bool, yawn: bool,
-                          w: int, h: int, posture_angles: dict):
+                          w: int, h: int, posture: Optional[Sequence[float]], blink_count: int = 0):
         """Draw status table on frame."""
         # Table configuration
         table_width = 600
@@ -185,15 +342,19 @@ class DrowsinessDetectionService:
         metric_color = (255, 255, 255)
         label_color = (200, 200, 0)
         
-        # Draw semi-transparent background
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (table_x, table_y), 
-                     (table_x + table_width, table_y + table_height), 
-                     (30, 30, 30), -1)
-        cv2.rectangle(overlay, (table_x, table_y), 
-                     (table_x + table_width, table_y + table_height), 
-                     (80, 80, 80), 1)
-        frame[:] = cv2.addWeighted(overlay, 0.5, frame, 0.5, 0)
+        # Draw semi-transparent background, blending only the table's own area
+        x0, y0 = max(table_x, 0), max(table_y, 0)
+        x1, y1 = min(table_x + table_width + 1, w), min(table_y + table_height + 1, h)
+        if x1 > x0 and y1 > y0:
+            area = frame[y0:y1, x0:x1]
+            overlay = frame_pool.get_like(area)
+            overlay[:] = area
+            corners = ((table_x - x0, table_y - y0),
+                       (table_x - x0 + table_width, table_y - y0 + table_height))
+            cv2.rectangle(overlay, *corners, (30, 30, 30), -1)
+            cv2.rectangle(overlay, *corners, (80, 80, 80), 1)
+            cv2.addWeighted(overlay, 0.5, area, 0.5, 0, dst=area)
+            frame_pool.release(overlay)
         
         # Headers
         cv2.putText(frame, "ALERTS", (col1_x, table_y + 15), 
@@ -229,7 +390,7 @@ class DrowsinessDetectionService:
             f"MAR: {mar:.2f}",
             f"Yaw: {yaw:.1f}",
             f"Brightness: {brightness:.2f}" if brightness is not None else "Brightness: N/A",
-            f"Blinks: {self.blink_count}"
+            f"Blinks: {blink_count}"
         ]
         
         for metric in metrics:
@@ -238,20 +399,10 @@ class DrowsinessDetectionService:
             row += 1
         # Posture column
         row = 1
-        healthy_ranges = {
-            "Degree of Anteversion of Cervical Spine (y1)": (25, 34),
-            "T1 Slope (y2)": (30, 50),
-            "Upper Thoracic Kyphosis Angle (y3)": (140, 158),
-            "Middle and Lower Thoracic Kyphosis Angle (y4)": (154, 155.5),
-            "T8-T12-L3 Angle (new)": (175, 180.3),
-            "Lumbar Lordosis Angle (y5)": (170, 174),
-        }
-        for angle_name, angle_value in posture_angles.items():
-            if angle_name in healthy_ranges:
-                low, high = healthy_ranges[angle_name]
-                color = (0, 200, 0) if low <= angle_value <= high else (0, 0, 255)
-            else:
-                color = metric_color
+        for angle_name, angle_value, (low, high) in zip(
+            POSTURE_ANGLE_NAMES, posture or (), POSTURE_HEALTHY_RANGES
+        ):
+            color = (0, 200, 0) if low <= angle_value <= high else (0, 0, 255)
             cv2.putText(
                 frame,
                 f"{angle_name}: {angle_value:.2f} deg",
@@ -264,13 +415,12 @@ class DrowsinessDetectionService:
             row += 1
     
     def get_counters(self) -> Tuple[int, int, int]:
-        """Return current eye, yawn, and blink counters."""
-        return self.eye_counter, self.yawn_counter, self.blink_count
+        """Return current eye, yawn, and blink counters of the primary face."""
+        state = self.primary_state
+        return state.eye_counter, state.yawn_counter, state.blink_count
 
     
     def reset_counters(self):
         """Reset all detection counters."""
-        self.eye_counter = 0
-        self.yawn_counter = 0
-        self.blink_count = 0
-        self.frame_counter = 0
+        for state in self.fatigue.values():
+            state.reset()
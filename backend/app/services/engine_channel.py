@@ -0,0 +1,473 @@
+import os
+import pickle
+import queue
+import stat
+import tempfile
+import threading
+from collections import OrderedDict
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, AsyncIterator, Dict, Iterator, NamedTuple, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.exceptions import EngineUnavailableException
+from app.models.records import DrowsinessRecord, FrameMetrics
+from app.services.frame_broadcast import DEFAULT_JPEG_QUALITY
+from app.services.snapshot import FrameSnapshot, SnapshotReader
+from app.services.versioning import BOOT_ID, VersionedValue
+from app.services.video_stream import VideoStreamService
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): every worker runs its own engine
+    fcntl = None
+
+_PINNED_FRAMES = 4          # snapshot frames kept for a worker's follow-up JPEG request
+_IDLE_CONNECTIONS = 8       # call connections a client keeps open for reuse
+_RETRY_INITIAL_SEC = 0.1    # a client reconnects its watch with backoff from this ...
+_RETRY_MAX_SEC = 2.0        # ... up to this
+
+_engine_lock = None
+
+
+class EngineState(NamedTuple):
+    """What the owner pushes to the other workers whenever it publishes.
+
+    Versions travel with their values, so every worker serves the same ETags
+    and long polls wait for the same version numbers.
+    """
+    snapshot: FrameSnapshot          # without session aggregates; reports are built by the owner
+    metrics: Tuple[int, Any]         # (version, value) of metrics_state
+    drowsiness: Tuple[int, Any]      # ... of drowsiness_state
+    status: Tuple[int, Any]          # ... of status_state
+    report_version: int              # version of report_state
+    epoch: str                       # the owner's BOOT_ID, which the versions count within
+
+
+def engine_socket_path() -> str:
+    """ENGINE_SOCKET, or a socket in a directory of the temp dir only this user can enter."""
+    if settings.ENGINE_SOCKET:
+        return settings.ENGINE_SOCKET
+    directory = os.path.join(tempfile.gettempdir(), f"cv-engine-{os.getuid()}")
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    # Someone else may have created it first to get at the socket
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise RuntimeError(f"{directory} must be a directory of this user that nobody else can access")
+    return os.path.join(directory, f"{settings.CAMERA_ID}.sock")
+
+
+def write_authkey(path: str) -> bytes:
+    """Write a new random key to ``path`` (mode 0600, replaced atomically) and return it."""
+    key = os.urandom(32)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".")
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    os.replace(temp_path, path)
+    return key
+
+
+def read_authkey(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def acquire_engine_lock(path: str) -> bool:
+    """Take the engine lock for the rest of this process's life; False if another process holds it.
+
+    The lock goes with the process, so when the owner exits a worker
+    started after it takes over.
+    """
+    global _engine_lock
+    lock = open(path, "a")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return False
+    _engine_lock = lock
+    return True
+
+
+def open_video_service() -> Union[VideoStreamService, "EngineClient"]:
+    """This worker's engine: the VideoStreamService if it wins the engine lock, else a client of the owner.
+
+    The owner gets an ``engine_server`` to start; without flock there is
+    nothing to share and every process runs its own engine.
+    """
+    if not settings.ENGINE_SHARED or fcntl is None:
+        return VideoStreamService()
+    path = engine_socket_path()
+    if not acquire_engine_lock(path + ".lock"):
+        print(f"Camera and analysis run in another worker; reading them over {path}")
+        return EngineClient(path)
+    service = VideoStreamService()
+    service.engine_server = EngineServer(service, path)
+    return service
+
+
+class EngineServer:
+    """Serves the owner's VideoStreamService to the other workers on a Unix socket.
+
+    Connections authenticate with the key the server writes to the socket
+    path plus ``.key`` (readable by this user only), so only workers of the
+    same user get to send the pickles it loads. One thread per connection.
+    A connection either makes calls (request, reply, repeated), relays one
+    stream (frames or feed chunks as raw byte messages, until either side
+    closes) or watches: it gets an EngineState on every publish, coalesced
+    to the latest if the reader falls behind.
+    """
+
+    # VideoStreamService methods other workers may call; arguments and results must pickle
+    CALLS = frozenset({
+        "start_monitoring", "stop_monitoring", "start_recording", "stop_recording",
+        "get_recording_status", "get_report", "get_face_report", "get_history", "export_sketches",
+        "get_camera_status", "get_analysis_status", "get_latency_stats", "reset_latency_stats",
+        "close_camera", "get_and_reset_alerts", "get_alerts", "get_notification_stats",
+        "get_engine_stats",
+    })
+    STREAMS = frozenset({"generate_frames", "feed_chunks"})
+
+    def __init__(self, service: VideoStreamService, path: str):
+        self.service = service
+        self.path = path
+        self.key_path = path + ".key"
+        self._listener: Optional[Listener] = None
+        self._lock = threading.Lock()
+        self._pinned: "OrderedDict[int, Any]" = OrderedDict()
+        self._state: Tuple[int, bytes] = (-1, b"")
+        self.connections = 0
+        self.watchers = 0
+        self.calls = 0
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        authkey = write_authkey(self.key_path)
+        # The socket is created 0600 rather than chmod-ed after bind, which would leave a window
+        umask = os.umask(0o177)
+        try:
+            self._listener = Listener(self.path, family="AF_UNIX", backlog=64, authkey=authkey)
+        finally:
+            os.umask(umask)
+        threading.Thread(target=self._accept, name="engine-server", daemon=True).start()
+
+    def stop(self):
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()
+
+    def _accept(self):
+        listener = self._listener
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, EOFError):
+                continue  # failed or abandoned the handshake
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), name="engine-client", daemon=True).start()
+
+    def _serve(self, conn: Connection):
+        with self._lock:
+            self.connections += 1
+        try:
+            while True:
+                kind, name, args, kwargs = conn.recv()
+                if kind == "call":
+                    conn.send(self._call(name, args, kwargs))
+                elif kind == "stream":
+                    self._stream(conn, name, args, kwargs)
+                    return
+                elif kind == "watch":
+                    self._watch(conn)
+                    return
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            with self._lock:
+                self.connections -= 1
+
+    def _call(self, name: str, args: tuple, kwargs: dict) -> tuple:
+        self.calls += 1
+        try:
+            if name == "get_snapshot":
+                frame = self.service.get_snapshot()
+                with self._lock:
+                    self._pinned[frame.seq] = frame
+                    while len(self._pinned) > _PINNED_FRAMES:
+                        self._pinned.popitem(last=False)
+                return ("ok", (frame.seq, frame.timestamp))
+            if name == "snapshot_jpeg":
+                seq, width, quality = args
+                with self._lock:
+                    frame = self._pinned.get(seq)
+                return ("ok", (frame or self.service.get_snapshot()).jpeg(width, quality))
+            if name not in self.CALLS:
+                return ("error", 404, f"Unknown engine call '{name}'")
+            return ("ok", getattr(self.service, name)(*args, **kwargs))
+        except HTTPException as e:
+            return ("error", e.status_code, e.detail)
+        except Exception as e:
+            print(f"Engine call {name} failed: {e}")
+            return ("error", 500, f"Engine call {name} failed")
+
+    def _stream(self, conn: Connection, name: str, args: tuple, kwargs: dict):
+        if name not in self.STREAMS:
+            return
+        chunks = getattr(self.service, name)(*args, **kwargs)
+        try:
+            for chunk in chunks:
+                conn.send_bytes(chunk)
+        except HTTPException as e:
+            print(f"Engine stream {name} ended: {e.detail}")
+        finally:
+            chunks.close()
+
+    def _watch(self, conn: Connection):
+        with self._lock:
+            self.watchers += 1
+        try:
+            changes = self.service.state_changes
+            seen = -1
+            while self._listener is not None:
+                version, _ = changes.wait_for(seen + 1, timeout=1.0)
+                if version == seen:
+                    continue
+                seen = version
+                conn.send_bytes(self._pickled_state(version))
+        finally:
+            with self._lock:
+                self.watchers -= 1
+
+    def _pickled_state(self, version: int) -> bytes:
+        """The state as of ``version``, pickled once however many workers watch."""
+        cached_version, data = self._state
+        if cached_version == version:
+            return data
+        service = self.service
+        state = EngineState(
+            snapshot=service.snapshot._replace(session={}),
+            metrics=service.metrics_state.get(),
+            drowsiness=service.drowsiness_state.get(),
+            status=service.status_state.get(),
+            report_version=service.report_state.version,
+            epoch=BOOT_ID,
+        )
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        self._state = (version, data)
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "role": "owner",
+            "pid": os.getpid(),
+            "socket": self.path,
+            "connections": self.connections,
+            "watchers": self.watchers,
+            "calls": self.calls,
+        }
+
+
+class RemoteFrame(NamedTuple):
+    """The owner's last published frame as seen from another worker; encoded by the owner."""
+    client: "EngineClient"
+    seq: int
+    timestamp: float
+
+    def jpeg(self, width: Optional[int] = None, quality: int = DEFAULT_JPEG_QUALITY) -> bytes:
+        return self.client._call("snapshot_jpeg", self.seq, width, quality)
+
+
+def _forward(name: str):
+    def call(self, *args, **kwargs):
+        return self._call(name, *args, **kwargs)
+    call.__name__ = name
+    call.__doc__ = f"VideoStreamService.{name}, run by the owner."
+    return call
+
+
+class EngineClient(SnapshotReader):
+    """Stands in for VideoStreamService in workers that do not own the engine.
+
+    Snapshot reads, versions and long polls are answered from the state the
+    owner pushes over a watch connection, so they never leave this process.
+    Control calls, reports and stats are forwarded over pooled connections,
+    and every stream or feed reader relays its own connection. Calls raise
+    EngineUnavailableException while the owner cannot be reached; reads
+    keep serving the last state received.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.snapshot = FrameSnapshot(
+            seq=0, timestamp=None, metrics=FrameMetrics(), drowsiness=DrowsinessRecord(),
+            faces={}, alerts={}, session={},
+        )
+        self.metrics_state = VersionedValue(FrameMetrics(), name="metrics-state")
+        self.drowsiness_state = VersionedValue(DrowsinessRecord(), name="drowsiness-state")
+        self.status_state = VersionedValue(
+            {"monitoring_active": False, "current_metrics": FrameMetrics()}, name="status-state"
+        )
+        self.report_state = VersionedValue(name="monitoring-report")
+        self.connected = False
+        self.states_received = 0
+        self._idle: "queue.LifoQueue[Connection]" = queue.LifoQueue(maxsize=_IDLE_CONNECTIONS)
+        self._watch_conn: Optional[Connection] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name="engine-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._watch_conn is not None:
+            self._watch_conn.close()
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+    def _watch(self):
+        delay = _RETRY_INITIAL_SEC
+        while not self._stopped.is_set():
+            try:
+                conn = self._open_connection()
+            except (AuthenticationError, EOFError, OSError):
+                # Not up yet, or the key was read before a new owner replaced it
+                self._stopped.wait(delay)
+                delay = min(delay * 2, _RETRY_MAX_SEC)
+                continue
+            self._watch_conn = conn
+            try:
+                conn.send(("watch", None, (), {}))
+                while True:
+                    self._apply(conn.recv())
+                    self.connected = True
+                    delay = _RETRY_INITIAL_SEC
+            except (EOFError, OSError):
+                pass
+            finally:
+                self.connected = False
+                conn.close()
+
+    def _apply(self, state: EngineState):
+        self.snapshot = state.snapshot
+        self.metrics_state.mirror(*state.metrics, epoch=state.epoch)
+        self.drowsiness_state.mirror(*state.drowsiness, epoch=state.epoch)
+        self.status_state.mirror(*state.status, epoch=state.epoch)
+        self.report_state.mirror(state.report_version, None, epoch=state.epoch)
+        self.states_received += 1
+
+    def _open_connection(self) -> Connection:
+        # Read every time: an owner taking over writes a new key
+        return Client(self.path, family="AF_UNIX", authkey=read_authkey(self.path + ".key"))
+
+    def _connect(self) -> Connection:
+        try:
+            return self._open_connection()
+        except (AuthenticationError, EOFError, OSError):
+            raise EngineUnavailableException()
+
+    def _call(self, name: str, *args, **kwargs) -> Any:
+        request = ("call", name, args, kwargs)
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+        try:
+            if conn is not None:
+                try:
+                    conn.send(request)
+                    reply = conn.recv()
+                except (EOFError, OSError):
+                    # A pooled connection to an owner that has since restarted
+                    conn.close()
+                    conn = None
+            if conn is None:
+                conn = self._connect()
+                conn.send(request)
+                reply = conn.recv()
+        except (EOFError, OSError):
+            conn.close()
+            raise EngineUnavailableException()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+        if reply[0] == "error":
+            raise HTTPException(status_code=reply[1], detail=reply[2])
+        return reply[1]
+
+    def _stream(self, name: str, **kwargs) -> Iterator[bytes]:
+        conn = self._connect()
+        try:
+            conn.send(("stream", name, (), kwargs))
+            while True:
+                yield conn.recv_bytes()
+        except (EOFError, OSError):
+            return
+        finally:
+            conn.close()
+
+    async def generate_frames(self, local: bool = False, rendition=None) -> AsyncIterator[bytes]:
+        """The owner's MJPEG parts for this viewer; a slow viewer backs up the owner's queue for it.
+
+        Asynchronous so that a viewer leaving cancels it and closes the
+        owner's stream straight away; an abandoned sync generator would only
+        close once collected, keeping the owner rendering for nobody.
+        """
+        conn = await run_in_threadpool(self._connect)
+        try:
+            conn.send(("stream", "generate_frames", (), {"local": local, "rendition": rendition}))
+            while True:
+                yield await run_in_threadpool(conn.recv_bytes)
+        except (EOFError, OSError):
+            return
+        finally:
+            conn.close()
+
+    def feed_chunks(self) -> Iterator[bytes]:
+        return self._stream("feed_chunks")
+
+    def get_snapshot(self) -> RemoteFrame:
+        seq, timestamp = self._call("get_snapshot")
+        return RemoteFrame(self, seq, timestamp)
+
+    start_monitoring = _forward("start_monitoring")
+    stop_monitoring = _forward("stop_monitoring")
+    start_recording = _forward("start_recording")
+    stop_recording = _forward("stop_recording")
+    get_recording_status = _forward("get_recording_status")
+    get_report = _forward("get_report")
+    get_face_report = _forward("get_face_report")
+    get_history = _forward("get_history")
+    export_sketches = _forward("export_sketches")
+    get_camera_status = _forward("get_camera_status")
+    get_analysis_status = _forward("get_analysis_status")
+    get_latency_stats = _forward("get_latency_stats")
+    reset_latency_stats = _forward("reset_latency_stats")
+    close_camera = _forward("close_camera")
+    get_and_reset_alerts = _forward("get_and_reset_alerts")
+    get_alerts = _forward("get_alerts")
+    get_notification_stats = _forward("get_notification_stats")
+
+    def get_engine_stats(self) -> Dict[str, Any]:
+        stats = self._call("get_engine_stats")
+        stats["engine"] = {
+            "role": "client",
+            "pid": os.getpid(),
+            "socket": self.path,
+            "connected": self.connected,
+            "states_received": self.states_received,
+            "owner": stats.get("engine"),
+        }
+        return stats
@@ -1,18 +1,32 @@
 import cv2
 import mediapipe as mp
 import numpy as np
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from app.core.config import settings
 from app.utils.calculations import get_face_width_pixels
 
 class FaceDetectionService:
     """Service for face detection and distance measurement."""
     
-    def __init__(self):
-        self.mp_face_detection = mp.solutions.face_detection.FaceDetection(
-            model_selection=1, 
-            min_detection_confidence=0.6
-        )
+    def __init__(self, model_selection: int = 1):
+        self.model_selection = model_selection
+        self._detectors = {}
+        self.mp_face_detection = self._detector(model_selection)
+
+    def _detector(self, model_selection: int):
+        detector = self._detectors.get(model_selection)
+        if detector is None:
+            detector = self._detectors[model_selection] = mp.solutions.face_detection.FaceDetection(
+                model_selection=model_selection,
+                min_detection_confidence=0.6
+            )
+        return detector
+
+    def set_model(self, model_selection: int):
+        """Switch between the full-range (1) and short-range (0) detector; each is built once."""
+        if model_selection != self.model_selection:
+            self.mp_face_detection = self._detector(model_selection)
+            self.model_selection = model_selection
     
     def detect_face_and_measure_distance(
         self, 
@@ -25,15 +39,36 @@ class FaceDetectionService:
         Returns:
             Tuple of (distance, brightness) or (None, None) if no face detected
         """
+        faces = self.detect_faces(rgb_image, frame)
+        if not faces:
+            return None, None
+        return faces[0]["distance"], faces[0]["brightness"]
+
+    def detect_faces(
+        self, rgb_image: np.ndarray, frame: np.ndarray, scale: int = 1, draw: bool = True,
+        brightness: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Detect every face and calculate its distance and brightness.
+        
+        ``scale`` is how much smaller the frame is than the camera resolution
+        the focal length was calibrated at (frames decoded at reduced size).
+        With ``draw`` off the frame is left untouched; see ``draw_detections``.
+        With ``brightness`` off it is left None; see ``measure_brightness``.
+        
+        Returns:
+            List of dicts with "bbox" (x1, y1, x2, y2), "distance" and "brightness"
+        """
         h, w = frame.shape[:2]
         results = self.mp_face_detection.process(rgb_image)
         
         if not results.detections:
-            return None, None
+            return []
             
+        faces = []
         for detection in results.detections:
             bbox = detection.location_data.relative_bounding_box
-            face_width_px = get_face_width_pixels(bbox, w)
+            face_width_px = get_face_width_pixels(bbox, w) * scale
             
             if face_width_px <= 0:
                 continue
@@ -41,25 +76,41 @@ class FaceDetectionService:
             # Calculate distance
             distance = (settings.FOCAL_LENGTH * settings.REAL_WIDTH) / face_width_px
             
-            # Draw bounding box
             x1 = int(bbox.xmin * w)
             y1 = int(bbox.ymin * h)
             x2 = int((bbox.xmin + bbox.width) * w)
             y2 = int((bbox.ymin + bbox.height) * h)
             
+            faces.append({
+                "bbox": (x1, y1, x2, y2),
+                "distance": distance,
+                "brightness": self._brightness(frame, (x1, y1, x2, y2)) if brightness else None,
+            })
+            
+        if draw:
+            self.draw_detections(frame, faces)
+        return faces
+
+    def measure_brightness(self, frame: np.ndarray, faces: List[Dict[str, Any]]) -> List[Optional[float]]:
+        """Brightness of each detected face's box in ``frame``."""
+        return [self._brightness(frame, face["bbox"]) for face in faces]
+
+    @staticmethod
+    def _brightness(frame: np.ndarray, bbox) -> Optional[float]:
+        # Mean luma, from the channel means without a grey copy
+        x1, y1, x2, y2 = bbox
+        face_roi = frame[max(y1, 0):y2, max(x1, 0):x2]
+        if face_roi.size == 0:
+            return None
+        blue, green, red, _ = cv2.mean(face_roi)
+        return 0.114 * blue + 0.587 * green + 0.299 * red
+
+    def draw_detections(self, frame: np.ndarray, faces: List[Dict[str, Any]]):
+        """Draw each detected face's bounding box and distance."""
+        for face in faces:
+            x1, y1, x2, y2 = face["bbox"]
             cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 1)
             cv2.putText(
-                frame, f"Distance: {distance:.2f} cm", (x1, y1 - 5),
+                frame, f"Distance: {face['distance']:.2f} cm", (x1, y1 - 5),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1
             )
-            
-            # Calculate brightness
-            face_roi = frame[y1:y2, x1:x2]
-            brightness = None
-            if face_roi.size > 0:
-                gray = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
-                brightness = np.mean(gray)
-            
-            return distance, brightness
-            
-        return None, None
\ No newline at end of file
@@ -0,0 +1,75 @@
+import numpy as np
+from typing import Dict, List, Tuple
+from app.core.config import settings
+from app.utils.calculations import iou_matrix
+
+
+class FaceTracker:
+    """Greedy IoU tracker that keeps face ids stable across frames.
+
+    Each frame's face boxes are matched to the previous boxes of live tracks,
+    best overlap first. Unmatched boxes start new tracks; tracks unseen for
+    more than ``max_missed`` frames are retired.
+    """
+
+    def __init__(
+        self,
+        min_iou: float = settings.FACE_TRACK_MIN_IOU,
+        max_missed: int = settings.FACE_TRACK_MAX_MISSED
+    ):
+        self.min_iou = min_iou
+        self.max_missed = max_missed
+        self._next_id = 1
+        self._boxes: Dict[int, np.ndarray] = {}
+        self._missed: Dict[int, int] = {}
+
+    @property
+    def track_ids(self) -> List[int]:
+        return list(self._boxes)
+
+    def update(self, boxes: np.ndarray) -> Tuple[List[int], List[int]]:
+        """
+        Assign ids to this frame's (x1, y1, x2, y2) boxes.
+
+        Returns:
+            Tuple of (ids in box order, ids of tracks retired this frame)
+        """
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        ids: List[int] = [0] * len(boxes)
+        track_ids = self.track_ids
+        matched = set()
+
+        if track_ids and len(boxes):
+            iou = iou_matrix(boxes, np.array([self._boxes[t] for t in track_ids]))
+            assigned = np.zeros(len(boxes), dtype=bool)
+            for flat in np.argsort(iou, axis=None)[::-1]:
+                i, j = divmod(int(flat), len(track_ids))
+                if iou[i, j] < self.min_iou:
+                    break
+                if assigned[i] or track_ids[j] in matched:
+                    continue
+                ids[i] = track_ids[j]
+                assigned[i] = True
+                matched.add(track_ids[j])
+
+        for i, box in enumerate(boxes):
+            if not ids[i]:
+                ids[i] = self._next_id
+                self._next_id += 1
+            self._boxes[ids[i]] = box
+            self._missed[ids[i]] = 0
+
+        retired = []
+        for track_id in track_ids:
+            if track_id in matched:
+                continue
+            self._missed[track_id] += 1
+            if self._missed[track_id] > self.max_missed:
+                del self._boxes[track_id]
+                del self._missed[track_id]
+                retired.append(track_id)
+        return ids, retired
+
+    def reset(self):
+        self._boxes.clear()
+        self._missed.clear()
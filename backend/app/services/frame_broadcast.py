@@ -0,0 +1,326 @@
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.utils.buffer_pool import frame_pool
+from app.utils.lock_stats import TimedLock
+
+DEFAULT_JPEG_QUALITY = 95  # OpenCV's own default for cv2.imencode(".jpg")
+
+
+def mjpeg_part(jpeg: bytes, seq: Optional[int] = None, timestamp: Optional[float] = None) -> bytes:
+    """Wrap one JPEG image as a multipart/x-mixed-replace part.
+
+    With ``seq`` and ``timestamp`` the part carries X-Frame-Seq and X-Capture-Ts headers.
+    """
+    headers = b'Content-Type: image/jpeg\r\n'
+    if seq is not None:
+        headers += b'X-Frame-Seq: %d\r\nX-Capture-Ts: %.6f\r\n' % (seq, timestamp)
+    return b'--frame\r\n' + headers + b'\r\n' + jpeg + b'\r\n'
+
+
+class SharedFrame:
+    """A published frame shared by every subscriber, with its JPEG encodings cached.
+
+    A passthrough frame has no image, only the camera's original JPEG bytes,
+    which are served as they are whatever rendition is asked for. The frame
+    owns its image: a pooled one goes back to frame_pool once the last
+    subscriber, queue or cache holding the frame lets go of it, so take what
+    is needed from ``image`` while holding the frame.
+    """
+
+    def __init__(self, seq: int, timestamp: float, image: Optional[np.ndarray],
+                 source_jpeg: Optional[bytes] = None, origin: Optional[float] = None):
+        self.seq = seq
+        self.timestamp = timestamp
+        # Where latency tracing counts this frame's age from
+        self.origin = origin if origin is not None else timestamp
+        self.image = image
+        if image is not None:
+            weakref.finalize(self, frame_pool.release, image)
+        self.source_jpeg = source_jpeg
+        self._encoded: Dict[Tuple[Optional[int], int], bytes] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def encodings(self) -> Tuple[Tuple[Optional[int], int], ...]:
+        """The (width, quality) pairs encoded so far."""
+        return tuple(self._encoded)
+
+    def jpeg(self, width: Optional[int] = None, quality: int = DEFAULT_JPEG_QUALITY) -> bytes:
+        """Return the frame as JPEG, encoding each (width, quality) pair at most once."""
+        if self.image is None:
+            return self.source_jpeg
+        key = (width, quality)
+        data = self._encoded.get(key)
+        if data is not None:
+            return data
+        with self._lock:
+            data = self._encoded.get(key)
+            if data is None:
+                image = self.image
+                resized = None
+                if width and width < image.shape[1]:
+                    height = max(1, round(image.shape[0] * width / image.shape[1]))
+                    resized = frame_pool.get((height, width) + image.shape[2:], image.dtype)
+                    image = cv2.resize(image, (width, height), dst=resized, interpolation=cv2.INTER_AREA)
+                try:
+                    _, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                finally:
+                    frame_pool.release(resized)
+                data = buffer.tobytes()
+                self._encoded[key] = data
+        return data
+
+
+class Subscription:
+    """A subscriber's bounded queue of frames; the oldest frame is dropped when full.
+
+    Also queues the binary feed's chunks, with BinaryFeed as the broadcaster.
+    A subscription without ``images`` is never handed frames; it only keeps
+    the producer loop running.
+    """
+
+    def __init__(self, broadcaster: "FrameBroadcaster", maxsize: int = 2, passthrough: bool = False,
+                 images: bool = True):
+        self._broadcaster = broadcaster
+        self.passthrough = passthrough
+        self.images = images
+        self._frames: deque = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+        self.last_pull = time.monotonic()
+
+    @property
+    def backlog(self) -> int:
+        """Number of frames published but not yet taken by this subscriber."""
+        return len(self._frames)
+
+    def _push(self, frame: SharedFrame):
+        with self._cond:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(frame)
+            self._cond.notify()
+
+    def _close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[SharedFrame]:
+        """Wait for the next frame. Returns None on timeout or once closed."""
+        self.last_pull = time.monotonic()
+        with self._cond:
+            if not self._frames and not self.closed:
+                self._cond.wait(timeout)
+            if self._frames and not self.closed:
+                self.delivered += 1
+                return self._frames.popleft()
+            return None
+
+    def frames(self, timeout: float = 1.0) -> Iterator[SharedFrame]:
+        """Iterate frames until the broadcaster stops; unsubscribes on exit."""
+        try:
+            while not self.closed:
+                frame = self.get(timeout)
+                if frame is not None:
+                    yield frame
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        self._broadcaster.unsubscribe(self)
+
+
+class FrameBroadcaster:
+    """Runs a single producer loop on a background thread and fans its frames out.
+
+    The loop only runs while there are subscribers, so an endpoint nobody is
+    watching costs nothing. ``produce`` returns the next image, or None when
+    there is nothing new to publish this tick; raising ends the stream for
+    every subscriber. ``interval`` is asked for the delay before each tick.
+    """
+
+    def __init__(
+        self,
+        produce: Callable[[], Optional[np.ndarray]],
+        interval: Callable[[], float],
+        name: str = "frame-broadcaster",
+        on_start: Optional[Callable[[], None]] = None,
+        on_stop: Optional[Callable[[], None]] = None,
+        idle_timeout: float = 30.0,
+    ):
+        self.name = name
+        self._produce = produce
+        self._interval = interval
+        self._on_start = on_start
+        self._on_stop = on_stop
+        self.idle_timeout = idle_timeout
+        # Copy-on-write, so publishing never takes the lock
+        self._subscribers: Tuple[Subscription, ...] = ()
+        self._lock = TimedLock("frame-broadcaster")
+        self._thread: Optional[threading.Thread] = None
+        self._last_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._seq = 0
+        self._passthrough_sent = False
+        # The last published frame while the loop runs; None once it has stopped
+        self.latest: Optional[SharedFrame] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def image_subscriber_count(self) -> int:
+        """Subscribers that take frames, as opposed to only keeping the loop running."""
+        return sum(1 for subscription in self._subscribers if subscription.images)
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def subscribe(self, maxsize: int = 2, passthrough: bool = False, images: bool = True) -> Subscription:
+        """Add a subscriber, starting the producer loop if it is not running.
+
+        Passthrough subscribers get frames from ``publish_passthrough`` when
+        the producer offers them, and processed frames otherwise. With
+        ``images`` off the subscription only keeps the loop running.
+        """
+        subscription = Subscription(self, maxsize, passthrough, images)
+        with self._lock:
+            self._subscribers += (subscription,)
+            if self._thread is None:
+                self._start_locked()
+            elif self.latest is not None and images:
+                # Late joiners get the current picture straight away.
+                subscription._push(self.latest)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+        subscription._close()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the producer loop, close every subscription and wait for the loop to exit."""
+        self._stop.set()
+        self._close_all()
+        self.latest = None
+        thread = self._last_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def publish(
+        self,
+        image: np.ndarray,
+        timestamp: Optional[float] = None,
+        skip_passthrough: Optional[bool] = None,
+        encode: Iterable[Tuple[Optional[int], int]] = (),
+        seq: Optional[int] = None,
+        origin: Optional[float] = None,
+    ) -> SharedFrame:
+        """Publish an image to all current subscribers.
+
+        ``skip_passthrough`` says whether passthrough subscribers already got
+        this picture; by default, whether ``publish_passthrough`` was called
+        since the last publish. ``encode`` lists (width, quality) renditions
+        to encode before the frame is handed out. ``seq`` is the frame's
+        capture sequence id, which must increase; by default frames are
+        numbered as they are published.
+        """
+        self._seq = seq if seq is not None else self._seq + 1
+        frame = SharedFrame(self._seq, timestamp if timestamp is not None else time.time(), image,
+                            origin=origin)
+        for width, quality in encode:
+            frame.jpeg(width, quality)
+        self.latest = frame
+        # Passthrough subscribers already got this tick's picture
+        sent, self._passthrough_sent = self._passthrough_sent, False
+        if skip_passthrough is None:
+            skip_passthrough = sent
+        for subscription in self._subscribers:
+            if subscription.images and not (skip_passthrough and subscription.passthrough):
+                subscription._push(frame)
+        return frame
+
+    def publish_passthrough(self, jpeg: bytes, timestamp: float, seq: Optional[int] = None,
+                            origin: Optional[float] = None):
+        """Hand the camera's original JPEG to passthrough subscribers before processing.
+
+        Call from ``produce``; the processed frame it returns then skips them.
+        """
+        subscribers = [s for s in self._subscribers if s.passthrough and s.images]
+        if not subscribers:
+            return
+        frame = SharedFrame(seq if seq is not None else self._seq + 1, timestamp, None, jpeg, origin)
+        self._passthrough_sent = True
+        for subscription in subscribers:
+            subscription._push(frame)
+
+    def _start_locked(self):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stop, self._last_thread), name=self.name, daemon=True
+        )
+        self._last_thread = self._thread
+        self._thread.start()
+
+    def _close_all(self):
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, ()
+        for subscription in subscribers:
+            subscription._close()
+
+    def _reap_idle(self):
+        """Drop subscribers whose client went away without closing the generator."""
+        now = time.monotonic()
+        for subscription in self._subscribers:
+            if subscription.backlog and now - subscription.last_pull > self.idle_timeout:
+                self.unsubscribe(subscription)
+
+    def _run(self, stop: threading.Event, previous: Optional[threading.Thread]):
+        # Let the previous loop finish its cleanup before opening resources again.
+        if previous is not None and previous is not threading.current_thread():
+            previous.join()
+        try:
+            if self._on_start:
+                self._on_start()
+            while not stop.is_set():
+                self._reap_idle()
+                if not self._subscribers:
+                    with self._lock:
+                        if not self._subscribers:
+                            self._thread = None
+                            return
+                started = time.monotonic()
+                image = self._produce()
+                if image is not None:
+                    self.publish(image)
+                delay = self._interval() - (time.monotonic() - started)
+                if delay > 0:
+                    stop.wait(delay)
+        except Exception as e:
+            print(f"{self.name} stopped:", e)
+        finally:
+            subscribers = []
+            with self._lock:
+                # Still the owner means we stopped on error or on request rather
+                # than because the last subscriber left.
+                if self._thread is threading.current_thread():
+                    self._thread = None
+                    subscribers, self._subscribers = self._subscribers, ()
+            for subscription in subscribers:
+                subscription._close()
+            # Nothing newer is coming; stale frames are not served as current
+            self.latest = None
+            if self._on_stop:
+                self._on_stop()
@@ -0,0 +1,192 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+_POLL = 0.1  # how often blocked workers look at the stop flag
+
+
+class PipelineStage:
+    """One worker thread of a FramePipeline, with its bounded input queue and timings."""
+
+    def __init__(self, name: str, handle: Callable[[Any], Any], queue_size: int):
+        self.name = name
+        self.handle = handle
+        self.queue: "queue.Queue[Tuple[int, float, float, Any]]" = queue.Queue(queue_size)
+        self.thread: Optional[threading.Thread] = None
+        self.processed = 0
+        self.failed = 0
+        self.wait_time = 0.0
+        self.busy_time = 0.0
+        self.max_latency = 0.0
+
+    def reset(self):
+        self.queue = queue.Queue(self.queue.maxsize)
+        self.processed = self.failed = 0
+        self.wait_time = self.busy_time = self.max_latency = 0.0
+
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        n = max(1, self.processed)
+        return {
+            "processed": self.processed,
+            "failed": self.failed,
+            "queued": self.queue.qsize(),
+            "wait_ms": round(self.wait_time / n * 1000, 3),
+            "busy_ms": round(self.busy_time / n * 1000, 3),
+            "latency_ms": round((self.wait_time + self.busy_time) / n * 1000, 3),
+            "max_latency_ms": round(self.max_latency * 1000, 3),
+            "utilization": round(self.busy_time / elapsed, 3) if elapsed > 0 else 0.0,
+        }
+
+
+class FramePipeline:
+    """Runs per-frame work as a chain of stages, each on its own thread.
+
+    Every stage has a single worker and a bounded FIFO input queue, so frames
+    leave the pipeline in the order they were submitted, and stateful stages
+    (face tracking, fatigue counters) see them in order too. While one frame
+    is in inference the previous one can be rendered and encoded, so
+    throughput approaches the slowest stage's rate rather than the sum of all
+    stages. OpenCV and MediaPipe release the GIL in their native code, which
+    is what lets the stages overlap on separate cores. A full queue blocks
+    the stage before it, pushing back on ``submit``.
+
+    A stage returns what the next stage gets; returning None drops the frame.
+    The last stage's return value is ignored. Exceptions are printed and drop
+    only the frame that raised. ``discard`` is called with every item the
+    pipeline drops itself (on a stage's exception, or still queued when it
+    stops), so whatever the item holds can be released.
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[Tuple[str, Callable[[Any], Any]]],
+        queue_size: int = 2,
+        name: str = "pipeline",
+        discard: Optional[Callable[[Any], None]] = None,
+    ):
+        self.name = name
+        self._discard = discard
+        self.stages = [PipelineStage(stage_name, handle, queue_size) for stage_name, handle in stages]
+        self._stop = threading.Event()
+        self._seq = 0
+        self._started_at = 0.0
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return any(stage.thread is not None for stage in self.stages)
+
+    def start(self):
+        if self.is_running:
+            return
+        self._stop = threading.Event()
+        self._seq = 0
+        self._started_at = time.monotonic()
+        self.submitted = self.rejected = self.completed = 0
+        self.total_latency = self.max_latency = 0.0
+        for stage in self.stages:
+            stage.reset()
+        for index, stage in enumerate(self.stages):
+            following = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            stage.thread = threading.Thread(
+                target=self._work, args=(stage, following, self._stop),
+                name=f"{self.name}-{stage.name}", daemon=True,
+            )
+            stage.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop every stage; frames still in flight are discarded."""
+        self._stop.set()
+        for stage in self.stages:
+            thread, stage.thread = stage.thread, None
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(timeout)
+        for stage in self.stages:
+            while True:
+                try:
+                    self._dropped(stage.queue.get_nowait()[3])
+                except queue.Empty:
+                    break
+
+    def _dropped(self, item: Any):
+        if self._discard is not None:
+            self._discard(item)
+
+    def submit(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """Queue a frame for the first stage, waiting while it is full.
+
+        Returns False if it could not be queued within ``timeout`` seconds
+        or the pipeline stopped meanwhile.
+        """
+        self._seq += 1
+        now = time.monotonic()
+        if not self._put(self.stages[0].queue, (self._seq, now, now, item), self._stop, timeout):
+            self.rejected += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-stage queue wait and work time per frame, and end-to-end latency."""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        n = max(1, self.completed)
+        return {
+            "running": self.is_running,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "fps": round(self.completed / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": round(self.total_latency / n * 1000, 3),
+            "max_latency_ms": round(self.max_latency * 1000, 3),
+            "stages": {stage.name: stage.stats(elapsed) for stage in self.stages},
+        }
+
+    @staticmethod
+    def _put(target: queue.Queue, entry, stop: threading.Event, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not stop.is_set():
+            wait = _POLL if deadline is None else min(_POLL, deadline - time.monotonic())
+            if wait <= 0:
+                return False
+            try:
+                target.put(entry, timeout=wait)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _work(self, stage: PipelineStage, following: Optional[PipelineStage], stop: threading.Event):
+        inbox = stage.queue
+        while not stop.is_set():
+            try:
+                seq, submitted_at, queued_at, item = inbox.get(timeout=_POLL)
+            except queue.Empty:
+                continue
+            started = time.monotonic()
+            try:
+                result = stage.handle(item)
+            except Exception as e:
+                stage.failed += 1
+                print(f"{self.name} {stage.name} failed on frame {seq}:", e)
+                self._dropped(item)
+                continue
+            finally:
+                finished = time.monotonic()
+                stage.processed += 1
+                stage.wait_time += started - queued_at
+                stage.busy_time += finished - started
+                stage.max_latency = max(stage.max_latency, finished - queued_at)
+            if following is not None:
+                if result is not None:
+                    if not self._put(following.queue, (seq, submitted_at, finished, result), stop):
+                        self._dropped(result)
+            else:
+                latency = finished - submitted_at
+                self.completed += 1
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
@@ -0,0 +1,415 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from app.core.exceptions import CameraNotAvailableException
+from app.utils.buffer_pool import frame_pool
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+# JPEG decoders can scale down by 2, 4 or 8 while decoding, skipping most IDCT work
+_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class SourceFrame(NamedTuple):
+    image: np.ndarray
+    timestamp: float               # capture time, unix seconds
+    index: int                     # frames produced by the source so far, starting at 0
+    jpeg: Optional[bytes] = None   # the camera's own compressed picture, in passthrough mode
+    scale: int = 1                 # image is 1/scale of the capture resolution
+
+
+def decode_jpeg(data: np.ndarray, scale: int = 1) -> Optional[np.ndarray]:
+    """Decode JPEG bytes (as a uint8 array), downscaled by 1, 2, 4 or 8 during decoding."""
+    return cv2.imdecode(data, _DECODE_FLAGS[scale])
+
+
+class FrameSource:
+    """Base class for anything that produces camera frames.
+
+    Subclasses implement ``_open``, ``_grab`` and ``_close``; ``_grab`` runs on
+    the source's own prefetch thread and returns (image, timestamp), or None
+    once the source is exhausted. Up to ``prefetch`` frames are buffered ahead
+    of ``read``. Live sources drop the oldest buffered frame when the consumer
+    is slow, so it always gets recent footage; recorded sources wait instead,
+    so no frame is skipped.
+
+    A frame's image is leased from frame_pool; whoever takes the frame from
+    ``read`` owns it. Frames dropped or discarded here are released.
+
+    Sources that can get at compressed JPEG frames support ``passthrough``:
+    they keep the original bytes for viewers that want the unprocessed
+    picture and decode for analysis only, at 1/``decode_scale`` resolution.
+    """
+
+    drop_oldest = False
+    # Live sources are reconnected when they stop; recorded ones just end
+    live = False
+
+    def __init__(self, prefetch: int = 2, passthrough: bool = False, decode_scale: int = 1):
+        if decode_scale not in _DECODE_FLAGS:
+            raise ValueError(f"decode_scale must be one of {sorted(_DECODE_FLAGS)}")
+        self.prefetch = max(1, prefetch)
+        self.passthrough = passthrough
+        self.decode_scale = decode_scale
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.frames_corrupt = 0  # grabbed but not decodable, skipped
+        self._frames: deque = deque()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._exhausted = False
+
+    @property
+    def is_opened(self) -> bool:
+        return self._thread is not None and not (self._exhausted and not self._frames)
+
+    def open(self):
+        """Open the underlying device or files and start prefetching."""
+        if self._thread is not None:
+            return
+        self._open()
+        self._discard_frames()
+        self._exhausted = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stop,), name=type(self).__name__, daemon=True
+        )
+        self._thread.start()
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop prefetching and release the underlying resource.
+
+        If the prefetch thread is stuck in a driver call for longer than
+        ``timeout``, it is abandoned together with the resource it holds,
+        so a hung device cannot block a reopen.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        thread.join(timeout)
+        self._thread = None
+        self._discard_frames()
+        if thread.is_alive():
+            print(f"{type(self).__name__}: prefetch thread is stuck; abandoning it")
+            return
+        self._close()
+
+    def read(self, timeout: Optional[float] = None) -> Optional[SourceFrame]:
+        """Take the next frame; None on timeout or once the source is exhausted."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._frames or self._exhausted, timeout)
+            if not self._frames:
+                return None
+            frame = self._frames.popleft()
+            self._cond.notify_all()
+        return frame
+
+    def _run(self, stop: threading.Event):
+        index = 0
+        try:
+            while not stop.is_set():
+                grabbed = self._grab(stop)
+                if grabbed is None:
+                    break
+                image, timestamp, jpeg = grabbed
+                if image is None:
+                    # A corrupt frame is skipped; consumers never get one without a picture
+                    self.frames_corrupt += 1
+                    continue
+                scale = self.decode_scale if jpeg is not None else 1
+                with self._cond:
+                    if not self.drop_oldest:
+                        self._cond.wait_for(
+                            lambda: len(self._frames) < self.prefetch or stop.is_set()
+                        )
+                    if stop.is_set():
+                        frame_pool.release(image)
+                        break
+                    if self.drop_oldest and len(self._frames) >= self.prefetch:
+                        frame_pool.release(self._frames.popleft().image)
+                        self.frames_dropped += 1
+                    self._frames.append(SourceFrame(image, timestamp, index, jpeg, scale))
+                    self.frames_read += 1
+                    self._cond.notify_all()
+                index += 1
+        except Exception as e:
+            print(f"{type(self).__name__} stopped:", e)
+        finally:
+            with self._cond:
+                # An abandoned thread must not mark a reopened source exhausted
+                if self._stop is stop:
+                    self._exhausted = True
+                self._cond.notify_all()
+
+    def _discard_frames(self):
+        with self._cond:
+            frames, self._frames = self._frames, deque()
+        for frame in frames:
+            frame_pool.release(frame.image)
+
+    def _open(self):
+        pass
+
+    def _grab(self, stop: threading.Event) -> Optional[Tuple[np.ndarray, float, Optional[bytes]]]:
+        """Return (image, timestamp, original JPEG bytes or None), or None when exhausted.
+
+        The image is None for a frame that could not be decoded; it is skipped.
+        """
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+
+class DeviceSource(FrameSource):
+    """A webcam by index, or a live stream URL (RTSP, MJPEG over HTTP, ...).
+
+    In passthrough mode the camera is asked for MJPEG and OpenCV's own
+    conversion is turned off, so ``retrieve`` hands back the compressed
+    frame. Backends that ignore that still deliver decoded frames, without
+    passthrough bytes.
+    """
+
+    drop_oldest = True
+    live = True
+
+    def __init__(self, device: Union[int, str], prefetch: int = 1, passthrough: bool = False,
+                 decode_scale: int = 1):
+        super().__init__(prefetch, passthrough, decode_scale)
+        self.device = device
+        self._cap: Optional[cv2.VideoCapture] = None
+        self._shape: Optional[Tuple[int, ...]] = None
+
+    def _open(self):
+        self._cap = cv2.VideoCapture(self.device)
+        if not self._cap.isOpened():
+            self._cap.release()
+            self._cap = None
+            raise CameraNotAvailableException()
+        if self.passthrough:
+            self._cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+            self._cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+
+    def _grab(self, stop):
+        cap = self._cap  # an abandoned thread keeps its own capture after a reopen
+        # Stamp between grab and decode: grab returns as soon as the driver has the frame.
+        if not cap.grab():
+            return None
+        timestamp = time.time()
+        if self.passthrough:
+            # Compressed frames differ in size every time, so there is nothing to pool
+            ok, image = cap.retrieve()
+        else:
+            buffer = frame_pool.get(self._shape) if self._shape else None
+            ok, image = cap.retrieve(buffer)
+            if not ok or image is not buffer:
+                # Failed, or the frame changed size and came in an array of its own
+                frame_pool.release(buffer)
+        if not ok:
+            return None
+        if self.passthrough and (image.ndim == 1 or image.shape[0] == 1):
+            # Undecoded MJPEG: a single row of bytes
+            data = image.reshape(-1)
+            return decode_jpeg(data, self.decode_scale), timestamp, data.tobytes()
+        self._shape = image.shape
+        return image, timestamp, None
+
+    def _close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class PacedSource(FrameSource):
+    """A recorded or generated source whose frames sit on a fixed-rate timeline.
+
+    Frame ``i`` is stamped ``start + i / fps``. With ``realtime`` the source
+    also waits until that moment before handing the frame out, so it behaves
+    like a live camera; without it frames come as fast as they are consumed.
+    """
+
+    def __init__(self, fps: float, loop: bool = True, realtime: bool = True, prefetch: int = 2,
+                 passthrough: bool = False, decode_scale: int = 1):
+        super().__init__(prefetch, passthrough, decode_scale)
+        self.fps = fps
+        self.loop = loop
+        self.realtime = realtime
+        self._start = 0.0
+        self._position = 0
+
+    def _open(self):
+        self._start = time.time()
+        self._position = 0
+
+    def _grab(self, stop):
+        grabbed = self._next_image()
+        if grabbed is None:
+            return None
+        image, jpeg = grabbed
+        timestamp = self._start + self._position / self.fps
+        self._position += 1
+        if self.realtime:
+            delay = timestamp - time.time()
+            if delay > 0 and stop.wait(delay):
+                return None
+        return image, timestamp, jpeg
+
+    def _next_image(self) -> Optional[Tuple[np.ndarray, Optional[bytes]]]:
+        """Return the next (image, original JPEG bytes or None), or None when done."""
+        raise NotImplementedError
+
+
+class VideoFileSource(PacedSource):
+    """Frames of a video file, optionally looping, at the file's own frame rate."""
+
+    def __init__(self, path: str, loop: bool = True, realtime: bool = True, prefetch: int = 2):
+        super().__init__(fps=30.0, loop=loop, realtime=realtime, prefetch=prefetch)
+        self.path = path
+        self._cap: Optional[cv2.VideoCapture] = None
+        self._shape: Optional[Tuple[int, ...]] = None
+
+    def _open(self):
+        self._cap = cv2.VideoCapture(self.path)
+        if not self._cap.isOpened():
+            self._cap.release()
+            self._cap = None
+            raise CameraNotAvailableException()
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        super()._open()
+
+    def _next_image(self):
+        buffer = frame_pool.get(self._shape) if self._shape else None
+        ok, image = self._cap.read(buffer)
+        if not ok and self.loop and self._position:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, image = self._cap.read(buffer)
+        if not ok or image is not buffer:
+            frame_pool.release(buffer)
+        if not ok:
+            return None
+        self._shape = image.shape
+        return image, None
+
+    def _close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class ImageDirectorySource(PacedSource):
+    """Image files of a directory in name order, played back at ``fps``.
+
+    In passthrough mode JPEG files are served as they are on disk. Files that
+    cannot be read or decoded are skipped.
+    """
+
+    def __init__(self, directory: str, fps: float, loop: bool = True, realtime: bool = True,
+                 prefetch: int = 2, passthrough: bool = False, decode_scale: int = 1):
+        super().__init__(fps=fps, loop=loop, realtime=realtime, prefetch=prefetch,
+                         passthrough=passthrough, decode_scale=decode_scale)
+        self.directory = directory
+        self._paths: List[str] = []
+        self._shapes: Dict[str, Tuple[int, ...]] = {}
+
+    def _open(self):
+        if not os.path.isdir(self.directory):
+            raise CameraNotAvailableException()
+        self._paths = sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not self._paths:
+            raise CameraNotAvailableException()
+        super()._open()
+
+    def _next_image(self):
+        while self._paths:
+            if self._position >= len(self._paths) and not self.loop:
+                return None
+            index = self._position % len(self._paths)
+            path = self._paths[index]
+            grabbed = self._read(path)
+            if grabbed is not None:
+                return grabbed
+            # Unreadable, corrupt or not an image after all: left out until the source reopens
+            print(f"{type(self).__name__}: skipping unreadable {path}")
+            del self._paths[index]
+        return None
+
+    def _read(self, path: str) -> Optional[Tuple[np.ndarray, Optional[bytes]]]:
+        try:
+            if self.passthrough and path.lower().endswith((".jpg", ".jpeg")):
+                data = np.fromfile(path, dtype=np.uint8)
+                image = decode_jpeg(data, self.decode_scale)
+                return (image, data.tobytes()) if image is not None else None
+            shape = self._shapes.get(path)
+            buffer = frame_pool.get(shape) if shape else None
+            image = cv2.imread(path, buffer)
+            if image is not buffer:
+                frame_pool.release(buffer)
+        except (OSError, cv2.error):
+            return None
+        if image is None:
+            return None
+        self._shapes[path] = image.shape
+        return image, None
+
+
+class SyntheticSource(PacedSource):
+    """Generated frames (a scrolling gradient with a moving block) needing no hardware or files."""
+
+    def __init__(self, width: int = 640, height: int = 480, fps: float = 15.0,
+                 frames: Optional[int] = None, realtime: bool = True, prefetch: int = 2):
+        super().__init__(fps=fps, loop=frames is None, realtime=realtime, prefetch=prefetch)
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self._ramp = (np.arange(width) * 255 // max(1, width - 1)).astype(np.uint8)
+
+    def _next_image(self):
+        n = self._position
+        if self.frames is not None and n >= self.frames:
+            return None
+        image = frame_pool.get((self.height, self.width, 3))
+        image[:] = np.roll(self._ramp, n * 4)[None, :, None]
+        size = min(self.width, self.height) // 4
+        x = (n * 7) % max(1, self.width - size)
+        y = (n * 3) % max(1, self.height - size)
+        image[y:y + size, x:x + size] = (40, 200, 255)
+        return image, None
+
+
+def create_frame_source(kind: str, uri: str = "", device_index: int = 0, fps: float = 15.0,
+                        loop: bool = True, realtime: bool = True, prefetch: int = 2,
+                        width: int = 640, height: int = 480, passthrough: bool = False,
+                        decode_scale: int = 1) -> FrameSource:
+    """Build a frame source by kind: device, file, images or synthetic.
+
+    Passthrough is supported by devices and image directories; other kinds ignore it.
+    """
+    if kind == "device":
+        return DeviceSource(int(uri) if uri.isdigit() else (uri or device_index), prefetch=1,
+                            passthrough=passthrough, decode_scale=decode_scale)
+    if kind == "file":
+        return VideoFileSource(uri, loop=loop, realtime=realtime, prefetch=prefetch)
+    if kind == "images":
+        return ImageDirectorySource(uri, fps=fps, loop=loop, realtime=realtime, prefetch=prefetch,
+                                    passthrough=passthrough, decode_scale=decode_scale)
+    if kind == "synthetic":
+        return SyntheticSource(width, height, fps=fps, realtime=realtime, prefetch=prefetch)
+    raise ValueError(f"Unknown camera source '{kind}'; expected device, file, images or synthetic")
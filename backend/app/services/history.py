@@ -0,0 +1,302 @@
+import math
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.services.monitoring import TIMELINE_COUNTS, TIMELINE_FIELDS, TIMELINE_PEAKS, format_report
+
+COLUMNS = TIMELINE_FIELDS + TIMELINE_PEAKS
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS rollups ("
+    " camera_id INTEGER NOT NULL, tier REAL NOT NULL, bucket_start REAL NOT NULL, "
+    + ", ".join(f"{field} REAL NOT NULL DEFAULT 0" for field in TIMELINE_FIELDS) + ", "
+    + ", ".join(f"{peak} REAL" for peak in TIMELINE_PEAKS) + ","
+    " PRIMARY KEY (camera_id, tier, bucket_start)) WITHOUT ROWID",
+    # Where each coarser tier has been rolled up to
+    "CREATE TABLE IF NOT EXISTS rollup_progress ("
+    " camera_id INTEGER NOT NULL, tier REAL NOT NULL, rolled_until REAL NOT NULL,"
+    " PRIMARY KEY (camera_id, tier))",
+)
+
+# Buckets written twice (the open bucket of a session stopped and one started
+# within the same second) add up
+_UPSERT = (
+    f"INSERT INTO rollups (camera_id, tier, bucket_start, {', '.join(COLUMNS)}) "
+    f"VALUES (?, ?, ?, {', '.join('?' for _ in COLUMNS)}) "
+    "ON CONFLICT (camera_id, tier, bucket_start) DO UPDATE SET "
+    + ", ".join([f"{field} = {field} + excluded.{field}" for field in TIMELINE_FIELDS]
+                + [f"{peak} = max(coalesce({peak}, excluded.{peak}), coalesce(excluded.{peak}, {peak}))"
+                   for peak in TIMELINE_PEAKS])
+)
+_AGGREGATES = ", ".join([f"SUM({field})" for field in TIMELINE_FIELDS] + [f"MAX({peak})" for peak in TIMELINE_PEAKS])
+
+Tier = Tuple[str, float, float]  # name, bucket width and retention in seconds (0 = forever)
+
+
+def history_tiers() -> List[Tier]:
+    """The tiers configured by the HISTORY_* settings, finest first."""
+    day = 86400
+    return [
+        ("second", settings.MONITORING_TIMELINE_SEC, settings.HISTORY_SECOND_RETENTION_DAYS * day),
+        ("minute", 60.0, settings.HISTORY_MINUTE_RETENTION_DAYS * day),
+        ("hour", 3600.0, settings.HISTORY_HOUR_RETENTION_DAYS * day),
+    ]
+
+
+class MetricsHistory:
+    """Long-term monitoring history of one camera in sqlite, compacted as it ages.
+
+    Sessions already sum their metrics per timeline bucket (see
+    SessionTimeline). A background thread writes every closed bucket as a
+    row of the finest tier, holding the sums and maxima a SessionReport is
+    built from, rolls complete minutes and hours up into the coarser tiers,
+    and deletes rows past their tier's retention once rolled up. Cameras
+    share the file, told apart by ``camera_id``.
+
+    Queries read the coarsest tier that still holds the start of the range
+    and whose buckets line up with the range and the requested resolution,
+    and take the part not rolled up yet from the finer tiers. The session
+    still running is included up to the last write.
+    """
+
+    def __init__(self, path: str, camera_id: int, session: Callable[[], Dict[str, Any]],
+                 tiers: Sequence[Tier], interval: float = 60.0):
+        for (_, fine, keep), (name, coarse, _) in zip(tiers, tiers[1:]):
+            if coarse % fine:
+                raise ValueError(f"History tier '{name}' ({coarse} s) is not a multiple of {fine} s")
+            # The last coarse bucket is rolled up again each time, from the finer rows
+            if keep and keep < 2 * coarse:
+                raise ValueError(f"History rows of {fine} s must be kept at least {2 * coarse} s")
+        self.path = path
+        self.camera_id = camera_id
+        self.tiers = list(tiers)
+        self.interval = interval
+        self._session = session
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Timeline being written, its next unwritten bucket, and whether it is written out
+        self._timeline = None
+        self._written = 0
+        self._finished = False
+        self.buckets_written = 0
+        self.compactions = 0
+        self.last_compaction_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        with closing(self._connect()) as conn, conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        # Readers do not block the writer, nor the cameras' writers each other for long
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="history-compaction", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop compacting; the session so far, including its open bucket, is written first."""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.is_running,
+            "path": self.path,
+            "buckets_written": self.buckets_written,
+            "compactions": self.compactions,
+            "last_compaction_ms": self.last_compaction_ms,
+            "last_error": self.last_error,
+        }
+
+    def _run(self, stop: threading.Event):
+        with closing(self._connect()) as conn:
+            while not stop.wait(self.interval):
+                self.compact(conn)
+            self.compact(conn, final=True)
+
+    def compact(self, conn: sqlite3.Connection, final: bool = False):
+        """Write new session buckets, roll them up and expire old rows, in one transaction."""
+        started = time.perf_counter()
+        try:
+            with conn:
+                written = self._write_session(conn, final)
+                now = time.time()
+                for (_, fine, _), (_, coarse, _) in zip(self.tiers, self.tiers[1:]):
+                    self._roll_up(conn, fine, coarse, now)
+                self._expire(conn, now)
+        except sqlite3.Error as e:
+            # Nothing was committed; the same buckets are written next time
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"History compaction failed: {self.last_error}")
+            return
+        self._timeline, self._written, self._finished, count = written
+        self.buckets_written += count
+        self.compactions += 1
+        self.last_compaction_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def _write_session(self, conn: sqlite3.Connection, final: bool) -> tuple:
+        """Insert the session's buckets not written yet; returns the write position to keep."""
+        view = self._session()
+        timeline = view.get("timeline")
+        timeline_written, finished, count = self._written, self._finished, 0
+        if timeline is not self._timeline:
+            # A new session: whatever is left of the previous one is final
+            if self._timeline is not None and not finished:
+                count += self._insert(conn, self._timeline.buckets(timeline_written, include_open=True))
+            timeline_written, finished = 0, False
+        if timeline is not None and not finished:
+            # A stopped session gets no more records, so its open bucket is final too
+            ended = final or view.get("stop_time") is not None
+            rows = list(timeline.buckets(timeline_written, include_open=ended))
+            count += self._insert(conn, rows)
+            timeline_written += len(rows) - ended
+            finished = ended
+        return timeline, timeline_written, finished, count
+
+    def _insert(self, conn: sqlite3.Connection, buckets) -> int:
+        tier = self.tiers[0][1]
+        rows = [(self.camera_id, tier, start, *(sums[field] for field in TIMELINE_FIELDS),
+                 *(peaks[peak] for peak in TIMELINE_PEAKS))
+                for start, sums, peaks in buckets]
+        conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def _rolled_until(self, conn: sqlite3.Connection, tier: float) -> Optional[float]:
+        row = conn.execute("SELECT rolled_until FROM rollup_progress WHERE camera_id = ? AND tier = ?",
+                           (self.camera_id, tier)).fetchone()
+        return row[0] if row else None
+
+    def _roll_up(self, conn: sqlite3.Connection, fine: float, coarse: float, now: float):
+        """Rebuild coarse buckets from the fine rows, up to the last complete coarse bucket."""
+        rolled = self._rolled_until(conn, coarse)
+        until = math.floor(now / coarse) * coarse
+        # Again from one bucket back, for fine rows written after it was rolled up
+        since = rolled - coarse if rolled is not None else 0.0
+        if until <= since:
+            return
+        conn.execute(
+            f"INSERT OR REPLACE INTO rollups (camera_id, tier, bucket_start, {', '.join(COLUMNS)}) "
+            f"SELECT camera_id, ?, CAST(bucket_start / ? AS INTEGER) * ?, {_AGGREGATES} FROM rollups "
+            "WHERE camera_id = ? AND tier = ? AND bucket_start >= ? AND bucket_start < ? GROUP BY 3",
+            (coarse, coarse, coarse, self.camera_id, fine, since, until),
+        )
+        conn.execute("INSERT OR REPLACE INTO rollup_progress VALUES (?, ?, ?)", (self.camera_id, coarse, until))
+
+    def _expire(self, conn: sqlite3.Connection, now: float):
+        for i, (_, width, keep) in enumerate(self.tiers):
+            if not keep:
+                continue
+            cutoff = now - keep
+            if i + 1 < len(self.tiers):
+                # Never drop rows the coarser tier does not hold yet
+                coarse = self.tiers[i + 1][1]
+                rolled = self._rolled_until(conn, coarse)
+                cutoff = min(cutoff, rolled - coarse if rolled is not None else -math.inf)
+            conn.execute("DELETE FROM rollups WHERE camera_id = ? AND tier = ? AND bucket_start < ?",
+                         (self.camera_id, width, cutoff))
+
+    def choose_tier(self, start: float, end: float, resolution: Optional[float] = None,
+                    now: Optional[float] = None) -> int:
+        """Index of the coarsest tier that holds ``start`` and fits the range and resolution.
+
+        A tier fits when the range ends (unless in the future) and the
+        resolution fall on its bucket boundaries. Without any that fit, the
+        finest tier still holding ``start``: the range snaps out to its buckets.
+        """
+        now = now if now is not None else time.time()
+        held = [i for i, (_, _, keep) in enumerate(self.tiers) if not keep or start >= now - keep]
+        if not held:
+            held = [len(self.tiers) - 1]
+        fits = [
+            i for i in held
+            if start % self.tiers[i][1] == 0
+            and (end >= now or end % self.tiers[i][1] == 0)
+            and (resolution is None or resolution % self.tiers[i][1] == 0)
+        ]
+        return max(fits) if fits else min(held)
+
+    def query(self, start: float, end: float, resolution: Optional[float] = None) -> Dict[str, Any]:
+        """Report of [start, end), and with ``resolution`` (seconds) one per bucket of it."""
+        now = time.time()
+        tier = self.choose_tier(start, end, resolution, now)
+        width = self.tiers[tier][1]
+        if resolution is not None:
+            resolution = max(resolution, width)
+        groups: Dict[int, Dict[str, Any]] = {}
+        with closing(self._connect()) as conn:
+            # The chosen tier up to where it is rolled up, finer tiers after that;
+            # the bucket holding ``start`` counts whole
+            since = math.floor(start / width) * width
+            for i in range(tier, -1, -1):
+                if i:
+                    rolled = self._rolled_until(conn, self.tiers[i][1])
+                    until = min(end, rolled if rolled is not None else since)
+                else:
+                    until = end
+                if until > since:
+                    self._collect(conn, self.tiers[i][1], since, until, resolution, groups)
+                    since = until
+                if since >= end:
+                    break
+        if not groups:
+            return {"error": "No monitoring history in the requested range"}
+
+        merged = _merge(groups.values())
+        result = {
+            "camera_id": self.camera_id,
+            "tier": self.tiers[tier][0],
+            "resolution_sec": resolution,
+            "report": format_report(merged, {}),
+        }
+        if resolution is not None:
+            result["buckets"] = [format_report(_merge([groups[key]]), {}) for key in sorted(groups)]
+        return result
+
+    def _collect(self, conn: sqlite3.Connection, width: float, start: float, end: float,
+                 resolution: Optional[float], groups: Dict[int, Dict[str, Any]]):
+        """Sums and maxima of the ``width`` rows starting in [start, end), per ``resolution`` group."""
+        key = "CAST(bucket_start / ? AS INTEGER)" if resolution is not None else "0 * ?"
+        rows = conn.execute(
+            f"SELECT {key} AS k, MIN(bucket_start), MAX(bucket_start), {_AGGREGATES} FROM rollups "
+            "WHERE camera_id = ? AND tier = ? AND bucket_start >= ? AND bucket_start < ? GROUP BY k",
+            (resolution or 0, self.camera_id, width, start, end),
+        ).fetchall()
+        for k, first, last, *values in rows:
+            data = dict(zip(COLUMNS, values))
+            if resolution is not None:
+                first = max(first, k * resolution)
+            data["start_time"] = first
+            data["stop_time"] = last + width
+            groups[k] = _merge([groups[k], data]) if k in groups else data
+
+
+def _merge(groups) -> Dict[str, Any]:
+    """Sum the fields and take the max of the peaks, start and stop of row groups."""
+    groups = list(groups)
+    merged: Dict[str, Any] = {field: sum(g[field] for g in groups) for field in TIMELINE_FIELDS}
+    for peak in TIMELINE_PEAKS:
+        values = [g[peak] for g in groups if g[peak] is not None]
+        merged[peak] = max(values) if values else 0
+    merged["start_time"] = min(g["start_time"] for g in groups)
+    merged["stop_time"] = max(g["stop_time"] for g in groups)
+    # Stored as REAL; counts are reported as ints
+    for field in TIMELINE_COUNTS:
+        merged[field] = int(round(merged[field]))
+    return merged
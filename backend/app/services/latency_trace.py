@@ -0,0 +1,61 @@
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+from app.utils.sketches import Histogram
+
+# Where a frame's age is measured, in the order it gets there
+TRACE_POINTS = ("read", "analysis", "encode", "write")
+
+
+class FrameStamp(NamedTuple):
+    """Identity of one captured frame, carried with it through analysis and encode."""
+    seq: int            # capture sequence id, increasing across reconnects
+    captured_at: float  # capture time, unix seconds, as the source reported it
+    origin: float       # when latency starts counting: capture time, or when the frame was
+                        # read if the source's clock runs ahead (files and images not paced)
+
+
+class LatencyTracer:
+    """Histograms of how old frames are at each trace point, in milliseconds.
+
+    ``read`` is when the frame loop takes the frame from the source (after
+    any prefetch queue), ``analysis`` when its metrics are published,
+    ``encode`` when a viewer has its JPEG and ``write`` when the part was
+    handed to the viewer's connection. Safe to record from any thread.
+    """
+
+    def __init__(self, max_ms: float = 5000.0, bin_ms: float = 1.0):
+        self.max_ms = max_ms
+        self.bin_ms = bin_ms
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        histograms = {point: Histogram(0.0, self.max_ms, self.bin_ms) for point in TRACE_POINTS}
+        with self._lock:
+            self._histograms = histograms
+            self.since = time.time()
+
+    def record(self, point: str, origin: float, now: Optional[float] = None):
+        age_ms = ((now if now is not None else time.time()) - origin) * 1000
+        with self._lock:
+            self._histograms[point].add(max(age_ms, 0.0))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = {"since": self.since}
+            for point, histogram in self._histograms.items():
+                stats[point] = {
+                    "count": histogram.count,
+                    "mean_ms": _ms(histogram.mean),
+                    "p50_ms": _ms(histogram.quantile(0.5)),
+                    "p90_ms": _ms(histogram.quantile(0.9)),
+                    "p99_ms": _ms(histogram.quantile(0.99)),
+                    "max_ms": _ms(histogram.max) if histogram.count else None,
+                }
+            return stats
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
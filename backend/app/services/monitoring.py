@@ -1,49 +1,198 @@
 import time
-from typing import Dict, Any, Optional
-from threading import Lock
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from app.core.config import settings
+from app.services.versioning import VersionedValue
+from app.utils.lock_stats import TimedLock
+from app.utils.sketches import Histogram, merge_histograms
+from app.utils.timeline import SessionTimeline
+
+# Per-metric histogram layout (low, high, bin width) and the report's bucket edges.
+# Pitch is absolute, as in avg_pitch_deg.
+DISTRIBUTIONS = {
+    "distance_cm": ((0.0, 300.0, 1.0), (30, 40, 50, 60, 70, 80)),
+    "pitch_deg": ((0.0, 90.0, 0.5), (5, 10, 15, 20, 30)),
+    "ear": ((0.0, 0.6, 0.005), (0.15, 0.2, 0.23, 0.26, 0.3, 0.35)),
+    "brightness": ((0.0, 256.0, 1.0), (40, 80, 120, 140, 180, 220)),
+}
+REPORT_QUANTILES = (("p50", 0.5), ("p90", 0.9), ("p99", 0.99))
+
+# Session sums kept on the timeline, so any time range can be reported (see SessionTimeline)
+TIMELINE_FIELDS = (
+    "total_duration", "total_frames", "frames_with_face", "distance_sum", "good_distance_time",
+    "pitch_sum", "bad_posture_time", "bad_posture_events", "brightness_sum",
+    "high_brightness_time", "high_brightness_events", "face_missing_time",
+    "camera_down_time", "camera_outages", "drowsiness_time", "drowsiness_events",
+    "yawns_detected", "blinks", "long_blink_gaps",
+)
+TIMELINE_COUNTS = (
+    "total_frames", "frames_with_face", "bad_posture_events", "high_brightness_events",
+    "camera_outages", "drowsiness_events", "yawns_detected", "blinks", "long_blink_gaps",
+)
+# Session maxima, kept per timeline bucket
+TIMELINE_PEAKS = ("max_brightness", "max_good_posture_streak", "longest_no_blink")
 
 def format_timestamp(ts: Optional[float]) -> Optional[str]:
     return datetime.fromtimestamp(ts).isoformat() if ts else None
 
+def new_histograms() -> Dict[str, Histogram]:
+    return {name: Histogram(*layout) for name, (layout, _) in DISTRIBUTIONS.items()}
+
+def summarize_distributions(histograms: Dict[str, Histogram]) -> Dict[str, Dict[str, Any]]:
+    """Count, mean, range, p50/p90/p99 and report buckets of each metric."""
+    summary = {}
+    for name, histogram in histograms.items():
+        edges = DISTRIBUTIONS[name][1] if name in DISTRIBUTIONS else ()
+        entry = {
+            "count": histogram.count,
+            "mean": _round(histogram.mean),
+            "min": _round(histogram.min) if histogram.count else None,
+            "max": _round(histogram.max) if histogram.count else None,
+        }
+        for label, q in REPORT_QUANTILES:
+            entry[label] = _round(histogram.quantile(q))
+        entry["buckets"] = histogram.buckets(edges)
+        summary[name] = entry
+    return summary
+
+def merge_exported_sketches(exports: List[Dict[str, Any]]) -> Dict[str, Histogram]:
+    """Merge ``MonitoringService.export_sketches`` payloads of many sessions or cameras."""
+    by_metric: Dict[str, List[Histogram]] = {}
+    for export in exports:
+        for name, data in export["metrics"].items():
+            by_metric.setdefault(name, []).append(Histogram.from_dict(data))
+    return {name: merge_histograms(histograms) for name, histograms in by_metric.items()}
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 4) if value is not None else None
+
+def format_report(data: Dict[str, Any], distributions: Dict[str, Any]) -> Dict[str, Any]:
+    """A SessionReport from session sums (as in MonitoringService.monitoring_data)."""
+    duration = data["total_duration"]
+    total_seen_time = duration - data["face_missing_time"] - data["camera_down_time"]
+
+    avg_distance = (data["distance_sum"] /
+                    data["frames_with_face"]
+                    if data["frames_with_face"] else 0)
+    avg_pitch = (data["pitch_sum"] /
+                 data["frames_with_face"]
+                 if data["frames_with_face"] else 0)
+    avg_brightness = (data["brightness_sum"] /
+                      data["frames_with_face"]
+                      if data["frames_with_face"] else 0)
+    yawns_per_hour = (
+        data["yawns_detected"] / duration * 3600 
+        if duration else 0
+    )
+    drowsiness_events_per_hour = (
+        data["drowsiness_events"] / duration * 3600 
+        if duration else 0
+    )
+    bad_posture_events_per_hour = (
+        data["bad_posture_events"] / duration * 3600 
+        if duration else 0
+    )
+
+    score = session_score(data, duration)
+
+    return {
+        "start_time": format_timestamp(data["start_time"]),
+        "stop_time": format_timestamp(data.get("stop_time")),
+        "session_duration_min": round(duration / 60, 2),
+        "time_face_visible_min": round(total_seen_time / 60, 2),
+        "avg_distance_cm": round(avg_distance, 2),
+        "time_good_distance_min": round(data["good_distance_time"] / 60, 2),
+        "avg_pitch_deg": round(avg_pitch, 2),
+        "bad_posture_time_min": round(data["bad_posture_time"] / 60, 2),
+        "bad_posture_events": data["bad_posture_events"],
+        "bad_posture_events_per_hour": round(bad_posture_events_per_hour, 2),
+        "max_good_posture_streak_sec": round(data["max_good_posture_streak"], 2),
+        "avg_brightness": round(avg_brightness, 2),
+        "max_brightness": round(data["max_brightness"], 2),
+        "high_brightness_time_min": round(data["high_brightness_time"] / 60, 2),
+        "high_brightness_events": data["high_brightness_events"],
+        "face_missing_time_min": round(data["face_missing_time"] / 60, 2),
+        "camera_down_time_min": round(data["camera_down_time"] / 60, 2),
+        "camera_outages": data["camera_outages"],
+        "drowsiness_time_min": round(data["drowsiness_time"] / 60, 2),
+        "drowsiness_events": data["drowsiness_events"],
+        "drowsiness_events_per_hour": round(drowsiness_events_per_hour, 2),
+        "yawns_detected": data["yawns_detected"],
+        "yawns_per_hour": round(yawns_per_hour, 2),
+        "session_score": score,  
+        "blinks": data["blinks"],
+        "long_blink_gaps": data["long_blink_gaps"],
+        "longest_no_blink_sec": round(data["longest_no_blink"], 2),
+        "distributions": distributions,
+    }
+
+def session_score(data: Dict[str, Any], duration: float) -> float:
+    if duration <= 0:
+        return 0.0
+
+    score = 100.0
+    score -= (data["bad_posture_time"] / duration) * 30
+    score -= (data["high_brightness_time"] / duration) * 20
+    score -= (data["face_missing_time"] / duration) * 10
+    score -= data["yawns_detected"] * 5
+    score -= (data["drowsiness_time"] / duration) * 25
+    score -= data["drowsiness_events"] * 3
+
+    return round(max(0, min(100, score)), 2)
+
 class MonitoringService:
-    """Service for session monitoring and analytics."""
+    """Service for session monitoring and analytics.
+
+    ``update_metrics`` runs on the frame loop and publishes a copy of the
+    session aggregates as ``session_view`` after every frame; reports are
+    built from that copy, so readers never block the frame loop. Frame
+    updates and start/stop, which swap in whole new session dicts, share a
+    lock that nothing else takes: start and stop wait for the frame in
+    flight, and a stopped session takes no more data.
+    """
 
     def __init__(self):
         self.monitoring_active = False
         self.monitoring_data: Dict[str, Any] = {}
-        self.lock = Lock()
+        self._control_lock = TimedLock("monitoring-control")
+        self.report_state = VersionedValue(name="monitoring-report")  # bumped whenever session data changes
         self._reset_session_data()
+        self.session_view: Dict[str, Any] = dict(self.monitoring_data)
 
     def start_monitoring(self) -> Dict[str, str]:
-        with self.lock:
+        with self._control_lock:
             if self.monitoring_active:
                 return {"message": "Monitoring already started", "status": "already_started"}
+            self._reset_session_data(start_time=time.time())
             self.monitoring_active = True
-            self._reset_session_data()
-            self.monitoring_data["start_time"] = time.time()
+            self._publish_session()
             return {"message": "Monitoring started", "status": "started"}
 
     def stop_monitoring(self) -> Dict[str, str]:
-        with self.lock:
+        with self._control_lock:
             if not self.monitoring_active:
                 return {"message": "Monitoring already stopped", "status": "already_stopped"}
             self.monitoring_active = False
             self.monitoring_data["stop_time"] = time.time()
+            self._publish_session()
             return {"message": "Monitoring stopped", "status": "stopped"}
 
+    def _publish_session(self):
+        self.session_view = dict(self.monitoring_data)
+        self.report_state.touch()
+
     def update_metrics(self, distance: Optional[float], pitch: Optional[float], 
                        brightness: Optional[float], drowsiness_detected: bool, 
-                       yawn_detected: bool, blink_detected: bool):
-        if not self.monitoring_active:
-            return
+                       yawn_detected: bool, blink_detected: bool, ear: Optional[float] = None):
+        with self._control_lock:
+            if not self.monitoring_active:
+                return
 
-        with self.lock:
             current_time = time.time()
             elapsed = 1 / settings.VIDEO_FPS
 
             self.monitoring_data["total_frames"] += 1
+            self.monitoring_data["_camera_down_state"] = False
             self.monitoring_data["total_duration"] = current_time - self.monitoring_data["start_time"]
 
             face_detected = distance is not None
@@ -53,9 +202,53 @@ class MonitoringService:
                 self._update_brightness_metrics(brightness, elapsed)
                 self._update_posture_metrics(pitch, elapsed)
                 self._update_drowsiness_metrics(drowsiness_detected, yawn_detected, elapsed)
-                self._update_blink_metrics(blink_detected, current_time)
+                blink_gap = self._update_blink_metrics(blink_detected, current_time)
+                self._update_distributions(distance, pitch, brightness, ear)
+                self.monitoring_data["timeline"].record(current_time, self.monitoring_data, {
+                    "max_brightness": brightness,
+                    "max_good_posture_streak": self.monitoring_data["current_good_posture_streak"],
+                    "longest_no_blink": blink_gap,
+                })
             else:
                 self.monitoring_data["face_missing_time"] += elapsed
+                self.monitoring_data["timeline"].record(current_time, self.monitoring_data)
+            self._publish_session()
+
+    def record_camera_down(self, elapsed: float):
+        """Account time with no frames at all, kept apart from face-missing time."""
+        with self._control_lock:
+            if not self.monitoring_active:
+                return
+            now = time.time()
+            self.monitoring_data["total_duration"] = now - self.monitoring_data["start_time"]
+            if not self.monitoring_data["_camera_down_state"]:
+                self.monitoring_data["camera_outages"] += 1
+                self.monitoring_data["_camera_down_state"] = True
+            self.monitoring_data["camera_down_time"] += elapsed
+            self.monitoring_data["timeline"].record(now, self.monitoring_data)
+            self._publish_session()
+
+    def _update_distributions(self, distance: float, pitch: Optional[float],
+                              brightness: Optional[float], ear: Optional[float]):
+        # Shared with session_view, not copied per frame: a report may miss the frame being added
+        histograms = self.monitoring_data["distributions"]
+        histograms["distance_cm"].add(distance)
+        if pitch is not None:
+            histograms["pitch_deg"].add(abs(pitch))
+        if ear is not None:
+            histograms["ear"].add(ear)
+        if brightness is not None:
+            histograms["brightness"].add(brightness)
+
+    def export_sketches(self) -> Dict[str, Any]:
+        """The session's metric histograms in mergeable form (see ``merge_exported_sketches``)."""
+        data = self.session_view
+        return {
+            "camera_id": settings.CAMERA_ID,
+            "start_time": format_timestamp(data.get("start_time")),
+            "stop_time": format_timestamp(data.get("stop_time")),
+            "metrics": {name: h.to_dict() for name, h in data.get("distributions", {}).items()},
+        }
 
     def _update_distance_metrics(self, distance: float, elapsed: float):
         self.monitoring_data["distance_sum"] += distance
@@ -111,7 +304,9 @@ class MonitoringService:
         else:
             self.monitoring_data["_yawn_state"] = False
 
-    def _update_blink_metrics(self, blink_detected: bool, current_time: float):
+    def _update_blink_metrics(self, blink_detected: bool, current_time: float) -> Optional[float]:
+        """Count a blink; returns the time since the previous one, if there was one."""
+        gap = None
         if blink_detected:
             self.monitoring_data["blinks"] += 1
             last_blink_time = self.monitoring_data["last_blink_time"]
@@ -122,84 +317,46 @@ class MonitoringService:
                 if gap > settings.LONG_BLINK_GAP_SEC:
                     self.monitoring_data["long_blink_gaps"] += 1
             self.monitoring_data["last_blink_time"] = current_time
+        return gap
 
-    def generate_report(self) -> Dict[str, Any]:
-        if not self.monitoring_data:
+    def generate_report(self, start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, Any]:
+        """Report of the whole session, or of the part of it between unix times ``start`` and ``end``."""
+        data = self.session_view
+        if not data:
             return {"error": "No session data"}
+        if start is None and end is None:
+            return format_report(data, summarize_distributions(data["distributions"]))
 
-        with self.lock:
-            duration = self.monitoring_data["total_duration"]
-            total_seen_time = duration - self.monitoring_data["face_missing_time"]
-
-            avg_distance = (self.monitoring_data["distance_sum"] /
-                            self.monitoring_data["frames_with_face"]
-                            if self.monitoring_data["frames_with_face"] else 0)
-            avg_pitch = (self.monitoring_data["pitch_sum"] /
-                         self.monitoring_data["frames_with_face"]
-                         if self.monitoring_data["frames_with_face"] else 0)
-            avg_brightness = (self.monitoring_data["brightness_sum"] /
-                              self.monitoring_data["frames_with_face"]
-                              if self.monitoring_data["frames_with_face"] else 0)
-            yawns_per_hour = (
-                self.monitoring_data["yawns_detected"] / duration * 3600 
-                if duration else 0
-            )
-            drowsiness_events_per_hour = (
-                self.monitoring_data["drowsiness_events"] / duration * 3600 
-                if duration else 0
-            )
-            bad_posture_events_per_hour = (
-                self.monitoring_data["bad_posture_events"] / duration * 3600 
-                if duration else 0
-            )
+        timeline = data.get("timeline")
+        if timeline is None:
+            return {"error": "No session data"}
+        lo, hi = timeline.bounds(start if start is not None else timeline.start,
+                                 end if end is not None else time.time())
+        session_end = timeline.start + data["total_duration"]
+        range_start = max(timeline.origin + lo * timeline.resolution, timeline.start)
+        range_end = min(timeline.origin + hi * timeline.resolution, session_end)
+        if range_end <= range_start:
+            return {"error": "No session data in the requested range"}
+
+        ranged = timeline.totals(lo, hi)
+        # The timeline stores floats; counts go back to ints
+        for field in TIMELINE_COUNTS:
+            ranged[field] = int(round(ranged[field]))
+        duration = range_end - range_start
+        for name in TIMELINE_PEAKS:
+            ranged[name] = timeline.peak(name, lo, hi) or 0
+        # Streaks and gaps that began before the range count only from its start
+        for name in ("max_good_posture_streak", "longest_no_blink"):
+            ranged[name] = min(ranged[name], duration)
+        ranged.update(start_time=range_start, stop_time=range_end, total_duration=duration)
+        # Histograms cover the whole session only
+        return format_report(ranged, {})
 
-            score = self._calculate_session_score(duration)
-
-            return {
-                "start_time": format_timestamp(self.monitoring_data["start_time"]),
-                "stop_time": format_timestamp(self.monitoring_data.get("stop_time")),
-                "session_duration_min": round(duration / 60, 2),
-                "time_face_visible_min": round(total_seen_time / 60, 2),
-                "avg_distance_cm": round(avg_distance, 2),
-                "time_good_distance_min": round(self.monitoring_data["good_distance_time"] / 60, 2),
-                "avg_pitch_deg": round(avg_pitch, 2),
-                "bad_posture_time_min": round(self.monitoring_data["bad_posture_time"] / 60, 2),
-                "bad_posture_events": self.monitoring_data["bad_posture_events"],
-                "bad_posture_events_per_hour": round(bad_posture_events_per_hour, 2),
-                "max_good_posture_streak_sec": round(self.monitoring_data["max_good_posture_streak"], 2),
-                "avg_brightness": round(avg_brightness, 2),
-                "max_brightness": round(self.monitoring_data["max_brightness"], 2),
-                "high_brightness_time_min": round(self.monitoring_data["high_brightness_time"] / 60, 2),
-                "high_brightness_events": self.monitoring_data["high_brightness_events"],
-                "face_missing_time_min": round(self.monitoring_data["face_missing_time"] / 60, 2),
-                "drowsiness_time_min": round(self.monitoring_data["drowsiness_time"] / 60, 2),
-                "drowsiness_events": self.monitoring_data["drowsiness_events"],
-                "drowsiness_events_per_hour": round(drowsiness_events_per_hour, 2),
-                "yawns_detected": self.monitoring_data["yawns_detected"],
-                "yawns_per_hour": round(yawns_per_hour, 2),
-                "session_score": score,  
-                "blinks": self.monitoring_data["blinks"],
-                "long_blink_gaps": self.monitoring_data["long_blink_gaps"],
-                "longest_no_blink_sec": round(self.monitoring_data["longest_no_blink"], 2),
-            }
-        
-    def _calculate_session_score(self, duration: float) -> float:
-        if duration <= 0:
-            return 0.0
-
-        score = 100.0
-        score -= (self.monitoring_data["bad_posture_time"] / duration) * 30
-        score -= (self.monitoring_data["high_brightness_time"] / duration) * 20
-        score -= (self.monitoring_data["face_missing_time"] / duration) * 10
-        score -= self.monitoring_data["yawns_detected"] * 5
-        score -= (self.monitoring_data["drowsiness_time"] / duration) * 25
-        score -= self.monitoring_data["drowsiness_events"] * 3
-
-        return round(max(0, min(100, score)), 2)
-
-    def _reset_session_data(self):
+    def _reset_session_data(self, start_time: Optional[float] = None):
+        # Build the new session completely before swapping it in, so the
+        # frame loop never sees a half-initialised dict.
         self.monitoring_data = {
-            "start_time": None,
+            "start_time": start_time,
             "stop_time": None,
             "total_duration": 0,
             "total_frames": 0,
@@ -217,16 +374,22 @@ class MonitoringService:
             "high_brightness_events": 0,
             "max_brightness": 0,
             "face_missing_time": 0,
+            "camera_down_time": 0,
+            "camera_outages": 0,
             "drowsiness_time": 0,
             "drowsiness_events": 0,
             "yawns_detected": 0,
             "_brightness_state": False,
             "_drowsiness_state": False,
             "_yawn_state": False,
+            "_camera_down_state": False,
             "blinks": 0,
             "last_blink_time": None,
             "long_blink_gaps": 0,
             "longest_no_blink": 0,
+            "distributions": new_histograms(),
+            "timeline": SessionTimeline(start_time, TIMELINE_FIELDS, TIMELINE_PEAKS,
+                                        settings.MONITORING_TIMELINE_SEC) if start_time else None,
         }
 
     @property
@@ -1,4 +1,5 @@
-
+import numpy as np
+from app.models.records import POSTURE_ANGLE_NAMES
 
 
 class PostureAngles:
@@ -13,6 +14,9 @@ class PostureAngles:
         'Lumbar Lordosis Angle (y5)': [-0.231200126, 0.0320771938, 0.00107482760, -0.00260748300, 180.932086]
     }
 
+    # Rows in PostureAngleId order
+    _coefficient_matrix = np.array(list(map(coefficients.__getitem__, POSTURE_ANGLE_NAMES)))
+
     def __init__(self):
         self.distance = 0
         self.pitch = 0
@@ -39,3 +43,17 @@ class PostureAngles:
             results[angle_name] = round(y, 2)
         self.posture_angles = results
         return results
+
+
+    def compute_posture_array_batch(self, distances, pitches) -> np.ndarray:
+        """
+        Compute posture angles for many faces in one matrix product.
+
+        Returns:
+            (faces, angles) array in PostureAngleId order; rows of faces with a
+            missing (None/NaN) distance or pitch are NaN.
+        """
+        x1 = np.asarray(distances, dtype=float)
+        x2 = np.asarray(pitches, dtype=float)
+        features = np.stack([x1, x2, x1 ** 2, x2 ** 2, np.ones_like(x1)], axis=1)
+        return np.round(features @ self._coefficient_matrix.T, 2)
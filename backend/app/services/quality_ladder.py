@@ -0,0 +1,127 @@
+from typing import Dict, List, NamedTuple, Optional
+
+from app.core.exceptions import InvalidStreamProfileException
+from app.services.frame_broadcast import DEFAULT_JPEG_QUALITY, Subscription
+
+
+class Rendition(NamedTuple):
+    width: Optional[int]  # None keeps the source resolution
+    quality: int
+
+
+PROFILES: Dict[str, Rendition] = {
+    "thumb": Rendition(320, 50),
+    "sd": Rendition(640, 70),
+    "full": Rendition(None, DEFAULT_JPEG_QUALITY),
+}
+
+# Best first; automatic clients walk down this list under pressure.
+LADDER: List[Rendition] = [
+    PROFILES["full"],
+    Rendition(960, 80),
+    PROFILES["sd"],
+    Rendition(480, 60),
+    PROFILES["thumb"],
+]
+
+
+class FixedRendition:
+    """Always serves the same rendition."""
+
+    passthrough = False
+
+    def __init__(self, rendition: Rendition):
+        self.rendition = rendition
+
+    def select(self, subscription: Subscription) -> Rendition:
+        return self.rendition
+
+
+class PassthroughRendition(FixedRendition):
+    """Serves the camera's own JPEG bytes without overlay or re-encoding.
+
+    Falls back to the processed full-quality picture for sources that do not
+    deliver compressed frames (see CAMERA_PASSTHROUGH).
+    """
+
+    passthrough = True
+
+    def __init__(self):
+        super().__init__(PROFILES["full"])
+
+
+class AdaptiveRendition:
+    """Walks a subscriber down the ladder while its queue backs up.
+
+    A frame already waiting after we take one, or frames dropped since the
+    last check, means the client cannot keep up with the source. After
+    ``down_after`` such frames in a row we step one rung down; after
+    ``up_after`` frames in a row without pressure we step back up.
+    """
+
+    def __init__(self, ladder: List[Rendition] = LADDER, down_after: int = 3, up_after: int = 45):
+        self.passthrough = False
+        self.ladder = ladder
+        self.down_after = down_after
+        self.up_after = up_after
+        self.index = 0
+        self._pressured = 0
+        self._calm = 0
+        self._seen_dropped = 0
+
+    @property
+    def rendition(self) -> Rendition:
+        return self.ladder[self.index]
+
+    def select(self, subscription: Subscription) -> Rendition:
+        dropped = subscription.dropped - self._seen_dropped
+        self._seen_dropped = subscription.dropped
+
+        if dropped or subscription.backlog:
+            self._pressured += 1
+            self._calm = 0
+            if self._pressured >= self.down_after and self.index < len(self.ladder) - 1:
+                self.index += 1
+                self._pressured = 0
+        else:
+            self._calm += 1
+            self._pressured = 0
+            if self._calm >= self.up_after and self.index > 0:
+                self.index -= 1
+                self._calm = 0
+        return self.rendition
+
+
+def resolve_rendition(profile: str = "full", width: Optional[int] = None, quality: Optional[int] = None):
+    """Build the rendition selector for a stream request.
+
+    ``profile`` is one of PROFILES, "auto" or "raw"; explicit width/quality
+    override the profile's values and pin the stream to that fixed rendition.
+    "raw" passes the camera's pictures through untouched and ignores them.
+    """
+    if profile == "raw":
+        return PassthroughRendition()
+    if profile == "auto" and width is None and quality is None:
+        return AdaptiveRendition()
+    if profile == "auto":
+        base = PROFILES["full"]
+    elif profile in PROFILES:
+        base = PROFILES[profile]
+    else:
+        raise InvalidStreamProfileException(profile, list(PROFILES) + ["auto", "raw"])
+    return FixedRendition(Rendition(
+        width if width is not None else base.width,
+        quality if quality is not None else base.quality,
+    ))
+
+
+def resolve_snapshot_rendition(profile: str = "full", width: Optional[int] = None,
+                               quality: Optional[int] = None) -> Rendition:
+    """The fixed rendition of a single snapshot; same profiles as streams, minus auto and raw."""
+    if profile not in PROFILES:
+        raise InvalidStreamProfileException(profile, list(PROFILES))
+    base = PROFILES[profile]
+    return Rendition(
+        width if width is not None else base.width,
+        quality if quality is not None else base.quality,
+    )
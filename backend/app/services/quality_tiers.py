@@ -0,0 +1,116 @@
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+
+class AnalysisTier(NamedTuple):
+    name: str
+    refine_landmarks: bool  # iris-refined face mesh
+    detector_model: int     # MediaPipe face detector: 1 full range (to 5 m), 0 short range (2 m)
+    input_scale: float      # analysis runs on the frame resized by this
+    overlay: str            # "full", "basic" (boxes and lines, no status table) or "none"
+
+
+# Best first; the controller walks down this list while frames take longer than the budget.
+TIERS: List[AnalysisTier] = [
+    AnalysisTier("full", True, 1, 1.0, "full"),
+    AnalysisTier("balanced", False, 1, 1.0, "full"),
+    AnalysisTier("fast", False, 0, 0.75, "basic"),
+    AnalysisTier("minimal", False, 0, 0.5, "none"),
+]
+
+_CHANGES_KEPT = 20
+
+
+def tier_index(name: str) -> int:
+    for index, tier in enumerate(TIERS):
+        if tier.name == name:
+            return index
+    raise ValueError(f"Unknown analysis tier '{name}'; expected one of {[t.name for t in TIERS]}")
+
+
+class LatencyBudgetController:
+    """Steps analysis quality down and up to keep per-frame processing within budget.
+
+    ``observe`` takes each frame's processing time; its moving average is
+    compared with the budget of one frame at ``target_fps``. After
+    ``down_after`` frames in a row over budget we step one tier down; after
+    ``up_after`` frames in a row under ``up_ratio`` of the budget we step one
+    back up, never above ``best``. The gap between the two thresholds keeps
+    a load near the budget from flapping between tiers. With ``adaptive``
+    off the tier stays at ``best``.
+    """
+
+    def __init__(self, target_fps: float, best: str = "full", adaptive: bool = True,
+                 down_after: int = 10, up_after: int = 90, up_ratio: float = 0.5, smoothing: float = 0.2):
+        self.target_fps = target_fps
+        self.best = tier_index(best)
+        self.adaptive = adaptive
+        self.down_after = down_after
+        self.up_after = up_after
+        self.up_ratio = up_ratio
+        self.smoothing = smoothing
+        self.index = self.best
+        self.average: Optional[float] = None
+        self._over = 0
+        self._under = 0
+        self.changes: Deque[Dict[str, Any]] = deque(maxlen=_CHANGES_KEPT)
+        self.change_count = 0
+
+    @property
+    def tier(self) -> AnalysisTier:
+        return TIERS[self.index]
+
+    @property
+    def budget(self) -> float:
+        return 1.0 / self.target_fps
+
+    def observe(self, seconds: float) -> AnalysisTier:
+        """Record one frame's processing time; returns the tier for the next frame."""
+        if self.average is None:
+            self.average = seconds
+        else:
+            self.average += self.smoothing * (seconds - self.average)
+        if not self.adaptive:
+            return self.tier
+
+        budget = self.budget
+        if self.average > budget:
+            self._over += 1
+            self._under = 0
+            if self._over >= self.down_after and self.index < len(TIERS) - 1:
+                self._step(1)
+        elif self.average < budget * self.up_ratio:
+            self._under += 1
+            self._over = 0
+            if self._under >= self.up_after and self.index > self.best:
+                self._step(-1)
+        else:
+            self._over = self._under = 0
+        return self.tier
+
+    def _step(self, direction: int):
+        previous = self.tier
+        self.index += direction
+        self._over = self._under = 0
+        self.change_count += 1
+        self.changes.append({
+            "at": time.time(),
+            "from": previous.name,
+            "to": self.tier.name,
+            "frame_ms": round(self.average * 1000, 2),
+            "budget_ms": round(self.budget * 1000, 2),
+        })
+        print(f"Analysis quality {previous.name} -> {self.tier.name}: "
+              f"{self.average * 1000:.1f} ms per frame against a {self.budget * 1000:.1f} ms budget")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tier": self.tier.name,
+            "tier_index": self.index,
+            "adaptive": self.adaptive,
+            "frame_ms": round(self.average * 1000, 2) if self.average is not None else None,
+            "budget_ms": round(self.budget * 1000, 2),
+            "changes": self.change_count,
+            "recent_changes": list(self.changes),
+        }
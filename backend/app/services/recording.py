@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import cv2
+
+from app.services.frame_broadcast import FrameBroadcaster, SharedFrame, Subscription
+
+
+class RecordingSink:
+    """Records the annotated frame stream to disk on its own thread.
+
+    The sink is just another subscriber of the frame broadcaster: the frame
+    loop hands it frames through a bounded queue and never waits on encoding
+    or disk I/O. When the writer falls behind, the oldest queued frames are
+    dropped and counted. Output is split into segments of at most
+    ``segment_seconds`` of footage or ``segment_bytes`` on disk.
+    """
+
+    def __init__(
+        self,
+        broadcaster: FrameBroadcaster,
+        directory: str,
+        fps: float,
+        segment_seconds: float,
+        segment_bytes: int,
+        queue_size: int,
+        codec: str = "mp4v",
+    ):
+        self.broadcaster = broadcaster
+        self.directory = directory
+        self.fps = fps
+        self.segment_seconds = segment_seconds
+        self.segment_bytes = segment_bytes
+        self.queue_size = queue_size
+        self.codec = codec
+        self._subscription: Optional[Subscription] = None
+        self._thread: Optional[threading.Thread] = None
+        self._control_lock = threading.Lock()
+        self._reset("")
+
+    def _reset(self, name: str):
+        self.name = name
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self.segments: List[str] = []
+        self.frames_written = 0
+        self.error: Optional[str] = None
+        self._writer: Optional[cv2.VideoWriter] = None
+        self._segment_started = 0.0
+
+    @property
+    def is_recording(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def frames_dropped(self) -> int:
+        subscription = self._subscription
+        return subscription.dropped if subscription is not None else 0
+
+    def start(self, name: str) -> Dict[str, str]:
+        """Start recording into segments named after ``name``."""
+        with self._control_lock:
+            if self.is_recording:
+                return {"message": "Recording already started", "status": "already_started"}
+            os.makedirs(self.directory, exist_ok=True)
+            self._reset(name)
+            self.started_at = time.time()
+            self._subscription = self.broadcaster.subscribe(maxsize=self.queue_size)
+            self._thread = threading.Thread(
+                target=self._run, args=(self._subscription,), name="recording-sink", daemon=True
+            )
+            self._thread.start()
+            return {"message": "Recording started", "status": "started"}
+
+    def stop(self, timeout: float = 10.0) -> Dict[str, str]:
+        """Stop recording and wait for the current segment to be finalized."""
+        with self._control_lock:
+            if not self.is_recording:
+                return {"message": "Recording already stopped", "status": "already_stopped"}
+            self._subscription.cancel()
+            self._thread.join(timeout)
+            return {"message": "Recording stopped", "status": "stopped"}
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "recording": self.is_recording,
+            "name": self.name or None,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "segments": list(self.segments),
+            "frames_written": self.frames_written,
+            "frames_dropped": self.frames_dropped,
+            "error": self.error,
+        }
+
+    def _run(self, subscription: Subscription):
+        try:
+            for frame in subscription.frames():
+                self._write(frame)
+        except Exception as e:
+            self.error = str(e)
+            print("Recording stopped:", e)
+        finally:
+            subscription.cancel()
+            self._close_segment()
+            self.stopped_at = time.time()
+
+    def _write(self, frame: SharedFrame):
+        if self._writer is None or self._segment_full(frame.timestamp):
+            self._open_segment(frame)
+        self._writer.write(frame.image)
+        self.frames_written += 1
+
+    def _segment_full(self, timestamp: float) -> bool:
+        if timestamp - self._segment_started >= self.segment_seconds:
+            return True
+        # Checking the file size costs a syscall; about once a second is plenty.
+        if self.frames_written % max(1, int(self.fps)) == 0:
+            return os.path.getsize(self.segments[-1]) >= self.segment_bytes
+        return False
+
+    def _open_segment(self, frame: SharedFrame):
+        self._close_segment()
+        height, width = frame.image.shape[:2]
+        stamp = datetime.fromtimestamp(frame.timestamp).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"{self.name}-{len(self.segments) + 1:03d}-{stamp}.mp4")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.codec), self.fps, (width, height))
+        if not writer.isOpened():
+            raise RuntimeError(f"Cannot open video writer for {path}")
+        self._writer = writer
+        self._segment_started = frame.timestamp
+        self.segments.append(path)
+
+    def _close_segment(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
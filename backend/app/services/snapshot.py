@@ -0,0 +1,71 @@
+from typing import Any, Dict, NamedTuple, Optional
+from app.core.config import settings
+from app.core.exceptions import FaceNotFoundException
+from app.models.records import DrowsinessRecord, FrameMetrics, TrackedFaceMetrics
+
+
+class FrameSnapshot(NamedTuple):
+    """Everything the API reads about one processed frame, published as a unit.
+
+    The frame loop builds a new snapshot per frame and publishes it by
+    replacing a single attribute, so readers always see one consistent frame
+    without locking. Snapshots and the records inside them are never mutated
+    after publishing; copy before changing anything.
+    """
+    seq: int
+    timestamp: Optional[float]
+    metrics: FrameMetrics                # primary face
+    drowsiness: DrowsinessRecord         # primary face
+    faces: Dict[int, TrackedFaceMetrics] # per tracked face, keyed by face id
+    alerts: Dict[str, bool]              # alert flags raised as of this frame
+    session: Dict[str, Any]              # monitoring aggregates as of this frame
+    analysis: Dict[str, Dict[str, Any]] = {}  # cadence and age of each analysis stage
+    capture_seq: int = 0                 # capture sequence id of the frame (X-Frame-Seq)
+
+
+class SnapshotReader:
+    """Read methods served from ``self.snapshot`` alone.
+
+    Shared by the engine and by workers that mirror its snapshots (see
+    app.services.engine_channel), so both answer from the same code.
+    """
+    snapshot: FrameSnapshot
+
+    def frame_headers(self) -> Dict[str, str]:
+        """X-Frame-Seq and X-Capture-Ts of the frame the current metrics come from."""
+        snapshot = self.snapshot
+        if snapshot.timestamp is None:
+            return {}
+        return {"X-Frame-Seq": str(snapshot.capture_seq), "X-Capture-Ts": f"{snapshot.timestamp:.6f}"}
+
+    def get_latest_data(self) -> Dict[str, Any]:
+        """Get latest processed data."""
+        return self.snapshot.metrics.as_dict()
+
+    def get_faces(self) -> Dict[int, TrackedFaceMetrics]:
+        """Get latest metrics of every tracked face, keyed by face id."""
+        return self.snapshot.faces
+
+    def get_face(self, face_id: int) -> TrackedFaceMetrics:
+        """Get latest metrics of one tracked face."""
+        face = self.snapshot.faces.get(face_id)
+        if face is None:
+            raise FaceNotFoundException(face_id)
+        return face
+
+    def get_face_drowsiness(self, face_id: int) -> DrowsinessRecord:
+        """Get detailed drowsiness status of one tracked face."""
+        face = self.get_face(face_id)
+        return DrowsinessRecord(
+            ear=face.ear,
+            mar=face.mar,
+            yaw=face.yaw,
+            eye_counter=face.eye_counter,
+            yawn_counter=face.yawn_counter,
+            drowsiness_alert=face.eye_counter >= settings.EAR_CONSEC_FRAMES,
+            yawn_alert=face.yawn_counter >= settings.YAWN_CONSEC_FRAMES
+        )
+
+    def get_drowsiness_status(self) -> Dict[str, Any]:
+        """Get detailed drowsiness status."""
+        return self.snapshot.drowsiness.as_dict()
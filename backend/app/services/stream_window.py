@@ -1,23 +1,28 @@
 import subprocess
+import threading
+from typing import Dict, Generator, Optional
+
 import numpy as np
-import cv2
 from mss import mss
-from fastapi import FastAPI
-from fastapi.responses import StreamingResponse
-import time
-import io
 
-# Replace this with your window name
-WINDOW_TITLE = "python main.py"
+from app.core.config import settings
+from app.services.frame_broadcast import FrameBroadcaster, mjpeg_part
+
 
-def get_window_geometry(title: str):
+def get_window_geometry(title: str) -> Optional[Dict[str, int]]:
+    """Look up the on-screen region of the first window whose name matches title."""
     try:
-        cmd = f"xdotool search --name \"{title}\""
-        window_id = subprocess.check_output(cmd, shell=True).decode().strip().split('\n')[0]
+        window_ids = subprocess.run(
+            ["xdotool", "search", "--name", title],
+            capture_output=True, check=True, timeout=2,
+        ).stdout.decode().split()
+        if not window_ids:
+            return None
 
-        geometry = subprocess.check_output(
-            ["xwininfo", "-id", window_id]
-        ).decode()
+        geometry = subprocess.run(
+            ["xwininfo", "-id", window_ids[0]],
+            capture_output=True, check=True, timeout=2,
+        ).stdout.decode()
 
         x = int(geometry.split("Absolute upper-left X:")[1].splitlines()[0].strip())
         y = int(geometry.split("Absolute upper-left Y:")[1].splitlines()[0].strip())
@@ -29,19 +34,105 @@ def get_window_geometry(title: str):
         print("Error finding window:", e)
         return None
 
-def stream_window():
-    region = get_window_geometry(WINDOW_TITLE)
-    if not region:
-        yield b''
-        return
-
-    with mss() as sct:
-        while True:
-            img = np.array(sct.grab(region))
-            _, jpeg = cv2.imencode('.jpg', img)
-            frame = jpeg.tobytes()
-            yield (
-                b'--frame\r\n'
-                b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n'
-            )
-            time.sleep(0.03)  # ~30 FPS
\ No newline at end of file
+
+def count_changed_tiles(current: np.ndarray, previous: Optional[np.ndarray], tile_size: int) -> int:
+    """Count tile_size x tile_size tiles that differ between two frames."""
+    if previous is None or previous.shape != current.shape:
+        h, w = current.shape[:2]
+        return -(-h // tile_size) * -(-w // tile_size)
+    diff = np.not_equal(current, previous)
+    if diff.ndim == 3:
+        diff = diff.any(axis=2)
+    rows = np.arange(0, diff.shape[0], tile_size)
+    cols = np.arange(0, diff.shape[1], tile_size)
+    tiles = np.logical_or.reduceat(np.logical_or.reduceat(diff, rows, axis=0), cols, axis=1)
+    return int(np.count_nonzero(tiles))
+
+
+class WindowStreamer:
+    """Shared screen-region grabber behind /video/stream_window.
+
+    One grab loop serves every viewer and only runs while someone is watching.
+    Frames whose tiles are all unchanged are not published, so they are never
+    re-encoded or re-sent, and the grab rate backs off towards
+    WINDOW_STREAM_IDLE_FPS while the window stays still.
+    """
+
+    def __init__(self, title: str = settings.WINDOW_TITLE):
+        self.title = title
+        self.region: Optional[Dict[str, int]] = None
+        self.changed_tiles = 0
+        self._sct = None
+        self._previous: Optional[np.ndarray] = None
+        self._interval = 1.0 / settings.WINDOW_STREAM_FPS
+        self._geometry_lock = threading.Lock()
+        self.broadcaster = FrameBroadcaster(
+            self._grab,
+            self._next_interval,
+            name="window-stream",
+            on_start=self._open,
+            on_stop=self._close,
+        )
+
+    def get_region(self, refresh: bool = False) -> Optional[Dict[str, int]]:
+        """Return the cached window geometry, looking it up only when asked or unknown."""
+        with self._geometry_lock:
+            if refresh or self.region is None:
+                self.region = get_window_geometry(self.title)
+            return self.region
+
+    def _open(self):
+        # mss keeps per-thread display handles, so it is created on the grab thread.
+        self._sct = mss()
+        self._previous = None
+        self._interval = 1.0 / settings.WINDOW_STREAM_FPS
+
+    def _close(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+        self._previous = None
+
+    def _grab(self) -> Optional[np.ndarray]:
+        region = self.get_region()
+        if region is None:
+            raise RuntimeError(f"window '{self.title}' not found")
+        try:
+            img = np.array(self._sct.grab(region))
+        except Exception:
+            # The window moved, resized or closed: look it up once more.
+            region = self.get_region(refresh=True)
+            if region is None:
+                raise
+            img = np.array(self._sct.grab(region))
+
+        self.changed_tiles = count_changed_tiles(img, self._previous, settings.WINDOW_TILE_SIZE)
+        if not self.changed_tiles:
+            return None
+        self._previous = img
+        return img
+
+    def _next_interval(self) -> float:
+        active = 1.0 / settings.WINDOW_STREAM_FPS
+        idle = 1.0 / settings.WINDOW_STREAM_IDLE_FPS
+        if self.changed_tiles:
+            self._interval = active
+        else:
+            self._interval = min(idle, self._interval * 1.5)
+        return self._interval
+
+    def stream(self) -> Generator[bytes, None, None]:
+        """Yield MJPEG parts for one viewer of the shared grab loop."""
+        if not self.get_region():
+            yield b''
+            return
+
+        for frame in self.broadcaster.subscribe().frames():
+            yield mjpeg_part(frame.jpeg())
+
+
+window_streamer = WindowStreamer()
+
+
+def stream_window() -> Generator[bytes, None, None]:
+    return window_streamer.stream()
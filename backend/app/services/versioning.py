@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import uuid
+from typing import Any, Dict, Optional, Tuple
+from app.utils.lock_stats import TimedLock
+
+# Versions restart at 0 with every process; ETags and clients tell boots apart by this
+BOOT_ID = uuid.uuid4().hex[:8]
+
+
+class VersionedValue:
+    """Latest published value plus a version number that increases on every change.
+
+    Publishing a value equal to the current one keeps the version, so pollers
+    can tell "nothing changed" apart from "a new frame with the same numbers".
+    ``touch`` bumps the version of state that is rendered on demand instead.
+
+    The (version, value) pair is swapped in as one tuple, so readers never
+    take a lock; the condition is only touched when someone is long-polling.
+    ``epoch`` names the run of versions: the boot of the process publishing
+    them, mirrored from the owner in other workers. A long poll ends early
+    when it changes, since its version belonged to the previous run.
+
+    Threads long-poll with ``wait_for``, coroutines with ``wait_for_async``,
+    which waits on the event loop instead of holding a threadpool worker.
+    """
+
+    def __init__(self, value: Any = None, name: str = "versioned-value"):
+        self._current: Tuple[int, Any] = (0, value)
+        self.epoch = BOOT_ID
+        self._write_lock = TimedLock(name)
+        self._cond = threading.Condition()
+        self._waiters = 0
+        # One event per event loop with coroutines waiting, replaced after every wake
+        self._loop_events: Dict[asyncio.AbstractEventLoop, asyncio.Event] = {}
+
+    @property
+    def version(self) -> int:
+        return self._current[0]
+
+    def get(self) -> Tuple[int, Any]:
+        """Return (version, value) as one consistent pair."""
+        return self._current
+
+    def publish(self, value: Any) -> int:
+        """Store value, bumping the version only if it differs from the current one."""
+        with self._write_lock:
+            version, current = self._current
+            if version and value == current:
+                return version
+            version += 1
+            self._current = (version, value)
+        self._wake()
+        return version
+
+    def touch(self) -> int:
+        """Bump the version without changing the value."""
+        with self._write_lock:
+            version, value = self._current
+            version += 1
+            self._current = (version, value)
+        self._wake()
+        return version
+
+    def mirror(self, version: int, value: Any, epoch: Optional[str] = None):
+        """Take another process's (version, value) as this one's, so both serve the same ETags."""
+        epoch = epoch or self.epoch
+        with self._write_lock:
+            if version == self._current[0] and epoch == self.epoch:
+                return
+            self._current = (version, value)
+            self.epoch = epoch
+        self._wake()
+
+    def _wake(self):
+        if self._waiters:
+            with self._cond:
+                self._cond.notify_all()
+        if self._loop_events:
+            with self._cond:
+                events, self._loop_events = self._loop_events, {}
+            for loop, event in events.items():
+                try:
+                    loop.call_soon_threadsafe(event.set)
+                except RuntimeError:
+                    pass  # loop closed
+
+    def wait_for(self, version: int, timeout: Optional[float] = None) -> Tuple[int, Any]:
+        """Block until the version reaches ``version`` or timeout expires."""
+        epoch = self.epoch
+        with self._cond:
+            # Registering before checking means a concurrent publish sees us and notifies.
+            self._waiters += 1
+            try:
+                self._cond.wait_for(lambda: self._current[0] >= version or self.epoch != epoch, timeout)
+            finally:
+                self._waiters -= 1
+        return self._current
+
+    async def wait_for_async(self, version: int, timeout: Optional[float] = None) -> Tuple[int, Any]:
+        """``wait_for`` for coroutines: waits on the running event loop, without a thread."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        epoch = self.epoch
+        while self._current[0] < version and self.epoch == epoch:
+            with self._cond:
+                event = self._loop_events.get(loop)
+                if event is None:
+                    event = self._loop_events[loop] = asyncio.Event()
+            # Registered before checking, so a concurrent publish sets the event
+            if self._current[0] >= version or self.epoch != epoch:
+                break
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return self._current
@@ -1,97 +1,487 @@
-import time
 import cv2
-import threading
-from typing import Generator, Dict, Any, Optional
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Generator, Dict, Any, Iterator, Optional
 from app.core.config import settings
-from app.core.exceptions import CameraNotAvailableException
+from app.core.exceptions import (
+    CameraNotAvailableException,
+    FaceNotFoundException,
+    HistoryNotEnabledException,
+    MonitoringNotActiveException,
+    NoFrameAvailableException,
+)
 from app.services.face_detection import FaceDetectionService
-from app.services.drowsiness_detection import DrowsinessDetectionService
+from app.services.drowsiness_detection import DISTANCE_METHODS, DrowsinessDetectionService
 from app.services.monitoring import MonitoringService
+from app.services.history import MetricsHistory, history_tiers
 from app.services.alert_service import AlertService
+from app.services.alert_dispatcher import AlertDispatcher, create_alert_sinks
+from app.services.frame_broadcast import FrameBroadcaster, SharedFrame, Subscription, mjpeg_part
+from app.services.binary_feed import BinaryFeed
+from app.services.recording import RecordingSink
+from app.services.frame_sources import FrameSource, create_frame_source
+from app.services.capture_supervisor import CaptureSupervisor
+from app.services.frame_pipeline import FramePipeline
+from app.services.analysis_scheduler import AnalysisScheduler
+from app.services.quality_tiers import LatencyBudgetController
+from app.services.latency_trace import FrameStamp, LatencyTracer
+from app.utils.buffer_pool import frame_pool
+from app.services.quality_ladder import FixedRendition, PROFILES
+from app.models.feed_format import FLAG_BLINK, FLAG_DROWSY, FLAG_FACE, FLAG_MONITORING, FLAG_YAWN
+from app.models.records import (
+    POSTURE_HEALTHY_RANGES,
+    DrowsinessRecord,
+    FrameMetrics,
+    TrackedFaceMetrics
+)
+from app.services.snapshot import FrameSnapshot, SnapshotReader
+from app.services.versioning import VersionedValue
+
+def rounded(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value else None
 
-class VideoStreamService:
-    """Service for video streaming and processing."""
+class VideoStreamService(SnapshotReader):
+    """Service for video streaming and processing.
+
+    The frame loop publishes one immutable FrameSnapshot per frame into
+    ``self.snapshot``; every read method works from that reference, so API
+    reads never take a lock the frame loop needs.
+    """
     
-    def __init__(self):
-        self.cap = None
+    def __init__(self, source: Optional[FrameSource] = None):
+        # Built from the CAMERA_* settings on first use unless one is given
+        self.source = source
+        self.capture: Optional[CaptureSupervisor] = None
+        self._last_tick: Optional[float] = None
+        self._capture_seq = 0
+        # Held by a headless monitoring session to keep the frame loop running
+        self._session_keepalive: Optional[Subscription] = None
+        # Age of frames at read, analysis, encode and socket write, from capture
+        self.latency = LatencyTracer()
+        if settings.DISTANCE_METHOD not in DISTANCE_METHODS:
+            raise ValueError(f"Unknown DISTANCE_METHOD '{settings.DISTANCE_METHOD}'; "
+                             f"expected one of {list(DISTANCE_METHODS)}")
+        self.distance_method = settings.DISTANCE_METHOD
         self.face_detection_service = FaceDetectionService()
-        self.drowsiness_service = DrowsinessDetectionService()
+        self.drowsiness_service = DrowsinessDetectionService(self.face_detection_service)
         self.monitoring_service = MonitoringService()
-        self.alert_service = AlertService()  # You can adjust n_seconds as needed
-        self.latest_data: Dict[str, Any] = {
-            "distance": None, "pitch": None, "brightness": None,
-            "ear": None, "mar": None, "yaw": None, "posture_angles": None
-        }
-        self.lock = threading.Lock()
-        self.camera_initialized = False  # For lazy initialization
+        # Outbound notifications of raised alerts; started by the app when sinks are configured
+        self.alert_dispatcher = AlertDispatcher(
+            create_alert_sinks(),
+            queue_size=settings.ALERT_QUEUE_SIZE,
+            batch_size=settings.ALERT_BATCH_SIZE,
+            batch_delay=settings.ALERT_BATCH_DELAY_MS / 1000,
+            dedup_seconds=settings.ALERT_DEDUP_SEC,
+            rate_per_min=settings.ALERT_RATE_PER_MIN,
+            retry_initial=settings.ALERT_RETRY_INITIAL_SEC,
+            retry_max=settings.ALERT_RETRY_MAX_SEC,
+            max_attempts=settings.ALERT_MAX_ATTEMPTS,
+        )
+        # Sessions kept in sqlite and compacted as they age; started by the app
+        self.history = MetricsHistory(
+            settings.HISTORY_DB_PATH,
+            settings.CAMERA_ID,
+            lambda: self.monitoring_service.session_view,
+            history_tiers(),
+            interval=settings.HISTORY_COMPACT_INTERVAL_SEC,
+        ) if settings.HISTORY_DB_PATH else None
+        self.alert_service = AlertService(on_raise=self._alert_raised)  # You can adjust n_seconds as needed
+        self.face_monitors: Dict[int, MonitoringService] = {}
+        # Stopped sessions of retired faces, oldest first, for their reports
+        self.finished_face_monitors: "OrderedDict[int, MonitoringService]" = OrderedDict()
+        # Slow-changing analyses run every Nth frame; the face mesh runs on every frame
+        self.analysis = AnalysisScheduler({
+            "mesh": 1,
+            "detection": settings.ANALYSIS_DETECTION_EVERY,
+            "brightness": settings.ANALYSIS_BRIGHTNESS_EVERY,
+            "posture": settings.ANALYSIS_POSTURE_EVERY,
+        })
+        # Trades model quality for speed when frames take longer than the target rate allows
+        self.quality = LatencyBudgetController(
+            settings.ANALYSIS_TARGET_FPS or settings.VIDEO_FPS,
+            best=settings.ANALYSIS_TIER,
+            adaptive=settings.ANALYSIS_ADAPTIVE,
+        )
+        self._frame_seq = 0
+        self.snapshot = FrameSnapshot(
+            seq=0, timestamp=None, metrics=FrameMetrics(), drowsiness=DrowsinessRecord(),
+            faces={}, alerts=self.alert_service.get_alerts(),
+            session=self.monitoring_service.session_view,
+        )
+        # Versioned copies of what the read endpoints serve
+        self.metrics_state = VersionedValue(name="metrics-state")
+        self.drowsiness_state = VersionedValue(name="drowsiness-state")
+        self.status_state = VersionedValue(name="status-state")
+        # Bumped whenever any of the above is published; workers mirroring the engine follow it
+        self.state_changes = VersionedValue(name="engine-state")
+        # Serves the engine to the other workers when this process owns it (set by the app)
+        self.engine_server = None
+        self.broadcaster = FrameBroadcaster(
+            self._next_frame,
+            lambda: 1.0 / settings.VIDEO_FPS,
+            name="video-stream",
+            on_start=self._on_loop_start,
+            on_stop=self._on_loop_stop,
+        )
+        # With FRAME_PIPELINE on, the frame loop only captures and converts;
+        # inference and render/encode run on their own threads behind it
+        self.pipeline = FramePipeline(
+            [("inference", self._inference_stage), ("render", self._render_stage)],
+            queue_size=settings.FRAME_PIPELINE_QUEUE,
+            name="video-pipeline",
+            discard=self._release_item,
+        )
+        self.binary_feed = BinaryFeed(
+            settings.CAMERA_ID,
+            settings.BINARY_FEED_BATCH_SIZE,
+            settings.BINARY_FEED_MAX_DELAY_MS / 1000,
+        )
+        self.recorder = RecordingSink(
+            self.broadcaster,
+            settings.RECORDING_DIR,
+            fps=settings.VIDEO_FPS,
+            segment_seconds=settings.RECORDING_SEGMENT_SEC,
+            segment_bytes=settings.RECORDING_SEGMENT_MB * 1024 * 1024,
+            queue_size=settings.RECORDING_QUEUE_SIZE,
+            codec=settings.RECORDING_CODEC,
+        )
+        self._publish_state()
     
     def _initialize_camera(self):
-        """Initialize camera capture."""
-        if self.camera_initialized:
-            return
-        self.cap = cv2.VideoCapture(settings.CAMERA_INDEX)
-        # self.cap = cv2.VideoCapture("http://172.16.3.222:4747/video")
-        if not self.cap.isOpened():
-            raise CameraNotAvailableException()
-        self.camera_initialized = True
+        """Open the frame source (lazily, on first use)."""
+        if self.source is None:
+            self.source = create_frame_source(
+                settings.CAMERA_SOURCE,
+                uri=settings.CAMERA_URI,
+                device_index=settings.CAMERA_INDEX,
+                fps=settings.VIDEO_FPS,
+                loop=settings.CAMERA_LOOP,
+                realtime=settings.CAMERA_REALTIME,
+                prefetch=settings.CAMERA_PREFETCH,
+                passthrough=settings.CAMERA_PASSTHROUGH,
+                decode_scale=settings.CAMERA_DECODE_SCALE,
+            )
+        if self.capture is None:
+            self.capture = CaptureSupervisor(
+                self.source,
+                lambda: 1.0 / settings.VIDEO_FPS,
+                stall_factor=settings.CAMERA_STALL_FACTOR,
+                backoff_initial=settings.CAMERA_RECONNECT_INITIAL_SEC,
+                backoff_max=settings.CAMERA_RECONNECT_MAX_SEC,
+            )
+        if not self.source.is_opened and not self.capture.is_down:
+            self.capture.open()
     
-    def close_camera(self):
-        """Close the camera resource."""
-        if self.cap is not None:
-            self.cap.release()
-            self.cap = None
-            self.camera_initialized = False
+    def close_camera(self) -> Dict[str, str]:
+        """Close the camera resource.
+
+        Closing ends every subscription, a headless session's keepalive too, so
+        a running monitoring session (and its recording) is stopped first
+        rather than left active with nothing to record.
+        """
+        session_stopped = self.monitoring_service.is_active
+        if session_stopped:
+            self.stop_monitoring()
+        self.broadcaster.stop()
+        if self.capture is not None:
+            self.capture.close()
+        if session_stopped:
+            return {"message": "Camera closed; monitoring session stopped.", "status": "closed"}
+        return {"message": "Camera closed.", "status": "closed"}
     
-    def generate_frames(self, local: bool = False) -> Generator[bytes, None, None]:
-        """Generate video frames with computer vision processing."""
+    def generate_frames(self, local: bool = False, rendition=None) -> Generator[bytes, None, None]:
+        """Generate video frames with computer vision processing.
+
+        All viewers share one capture/processing loop; ``rendition`` picks the
+        JPEG size and quality this viewer receives (full quality by default).
+        """
         self._initialize_camera()
-        frame_interval = 1.0 / settings.VIDEO_FPS
-        
-        while True:
-            if self.cap is None or not self.cap.isOpened():
-                # print("Camera is not initialized or already closed.")
-                break
-            start_time = time.time()
-            ret, frame = self.cap.read()
-            
-            if not ret:
-                break
-            
-            # Process frame
-            processed_data = self._process_frame(frame)
-            
-            # Update monitoring if active
-            if self.monitoring_service.is_active:
-                self.monitoring_service.update_metrics(
-                    processed_data["distance"],
-                    processed_data["pitch"], 
-                    processed_data["brightness"],
-                    processed_data["drowsiness_detected"],
-                    processed_data["yawn_detected"],
-                    processed_data["blink_detected"],
-                )
-            
+        rendition = rendition or FixedRendition(PROFILES["full"])
+        subscription = self.broadcaster.subscribe(passthrough=rendition.passthrough)
+
+        for frame in subscription.frames():
             # Handle local display or streaming
             if local:
-                cv2.imshow("Camera Feed", frame)
+                cv2.imshow("Camera Feed", frame.image)
                 if cv2.waitKey(1) & 0xFF == ord('q'):
                     break
             else:
-                _, buffer = cv2.imencode(".jpg", frame)
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + 
-                       buffer.tobytes() + b'\r\n')
-            
-            # FPS limiting
-            elapsed = time.time() - start_time
-            sleep_time = frame_interval - elapsed
-            if sleep_time > 0 and not local:
-                time.sleep(sleep_time)
+                width, quality = rendition.select(subscription)
+                jpeg = frame.jpeg(width, quality)
+                self.latency.record("encode", frame.origin)
+                yield mjpeg_part(jpeg, frame.seq, frame.timestamp)
+                # Resumed once the server has handed the part to the connection
+                self.latency.record("write", frame.origin)
+
+    def get_snapshot(self) -> SharedFrame:
+        """The last published frame, without touching the camera or the models.
+
+        There is none once the frame loop has stopped, so a closed camera's
+        last picture is not served as current. Its JPEG encodings are cached
+        on the frame, so each rendition is encoded once per frame however
+        many snapshots and viewers ask for it.
+        """
+        frame = self.broadcaster.latest
+        if frame is None:
+            raise NoFrameAvailableException()
+        return frame
+
+    def feed_chunks(self) -> Iterator[bytes]:
+        """Yield binary metrics feed chunks (see app.models.feed_format) until the camera stops.
+
+        Holds an image-less frame subscription as well, so the shared capture
+        loop keeps running for feed readers even when nobody watches the video.
+        """
+        self._initialize_camera()
+        chunks = self.binary_feed.subscribe()
+        frames = self.broadcaster.subscribe(images=False)
+        try:
+            while not frames.closed:
+                chunk = chunks.get(timeout=1.0)
+                if chunk is not None:
+                    yield chunk
+        finally:
+            frames.cancel()
+            chunks.cancel()
+
+    def _on_loop_start(self):
+        if settings.FRAME_PIPELINE:
+            self.pipeline.start()
+
+    def _on_loop_stop(self):
+        self.pipeline.stop()
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        """Capture, process and publish one frame for the shared stream loop.
+
+        Each captured frame gets the next capture sequence id, which it keeps
+        through analysis and encode. In pipelined mode the frame is handed to
+        the pipeline after colour conversion and the render stage publishes
+        it. While nobody takes images (headless monitoring, feed readers)
+        frames are only analysed: no overlays are drawn and nothing is
+        published or encoded. Always returns None: nothing is left for the
+        loop to publish.
+
+        The captured image is leased from frame_pool: publishing hands it to
+        the published frame, and a frame that is not published is released.
+        """
+        if self.capture is None:
+            raise CameraNotAvailableException()
+        captured = self.capture.read()
+        now = time.time()
+        elapsed, self._last_tick = now - (self._last_tick or now), now
+        if captured is None:
+            if self.capture.ended:
+                raise CameraNotAvailableException()
+            # Camera down: viewers and the session stay attached while it reconnects
+            self._record_camera_down(elapsed)
+            return None
+        frame, captured_at = captured.image, captured.timestamp
+        self._capture_seq += 1
+        stamp = FrameStamp(self._capture_seq, captured_at, min(captured_at, now))
+        self.latency.record("read", stamp.origin, now)
+        if captured.jpeg is not None:
+            # Raw viewers get the camera's own bytes now instead of after processing
+            self.broadcaster.publish_passthrough(captured.jpeg, captured_at, stamp.seq, stamp.origin)
+
+        if self.pipeline.is_running:
+            rgb = self._analysis_input(frame)
+            # Waiting here while the pipeline is full paces capture to its slowest stage
+            item = (frame, rgb, captured.scale, stamp, captured.jpeg is not None)
+            if not self.pipeline.submit(item, timeout=settings.CAMERA_STALL_FACTOR / settings.VIDEO_FPS):
+                self._release_item(item)
+            return None
+
+        # Process frame
+        rendering = self.is_rendering
+        processed_data = self._process_frame(frame, captured.scale, draw=rendering)
+        self._record_frame(processed_data, stamp)
+        if rendering:
+            self.broadcaster.publish(frame, captured_at, seq=stamp.seq, origin=stamp.origin)
+        else:
+            frame_pool.release(frame)
+        return None
+
+    @property
+    def is_rendering(self) -> bool:
+        """Whether any subscriber takes images; if not, frames are only analysed."""
+        return self.broadcaster.image_subscriber_count > 0
+
+    def _inference_stage(self, item):
+        frame, rgb, scale, stamp, passthrough_sent = item
+        try:
+            data = self._process_frame(frame, scale, rgb=rgb, draw=False)
+        finally:
+            frame_pool.release(rgb)
+        return frame, data, stamp, passthrough_sent
+
+    def _render_stage(self, item):
+        frame, data, stamp, passthrough_sent = item
+        if not self.is_rendering:
+            frame_pool.release(frame)
+            self._record_frame(data, stamp)
+            return
+        self._draw_overlays(frame, data)
+        self._record_frame(data, stamp)
+        # Encode the renditions viewers took from the last frame before they ask
+        previous = self.broadcaster.latest
+        self.broadcaster.publish(
+            frame, stamp.captured_at, skip_passthrough=passthrough_sent,
+            encode=previous.encodings if previous is not None else (),
+            seq=stamp.seq, origin=stamp.origin,
+        )
+
+    def _draw_overlays(self, frame: np.ndarray, data: Dict[str, Any]):
+        """Draw the analysis results at the detail of the tier the frame was analysed at."""
+        if data["overlay"] == "none":
+            return
+        self.face_detection_service.draw_detections(frame, data["detections"])
+        self.drowsiness_service.draw_faces(frame, data["faces"], table=data["overlay"] == "full")
+
+    def _analysis_input(self, frame: np.ndarray) -> np.ndarray:
+        """The RGB image the models run on, downscaled by the current tier's input scale.
+
+        Detections and landmarks come back relative to the image, so results
+        map onto the full-size frame unchanged. The image is leased from
+        frame_pool; the caller releases it.
+        """
+        scale = self.quality.tier.input_scale
+        if scale < 1:
+            h, w = frame.shape[:2]
+            size = (max(int(w * scale), 1), max(int(h * scale), 1))
+            resized = cv2.resize(frame, size, dst=frame_pool.get((size[1], size[0], 3)),
+                                 interpolation=cv2.INTER_AREA)
+            rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=frame_pool.get_like(resized))
+            frame_pool.release(resized)
+            return rgb
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame_pool.get_like(frame))
+
+    @staticmethod
+    def _release_item(item):
+        """Release the pooled images of a pipeline item that will not be published."""
+        for part in item:
+            frame_pool.release(part)
+
+    def _record_frame(self, processed_data: Dict[str, Any], stamp: FrameStamp):
+        """Feed one analysed frame to monitoring, the snapshot and the binary feed."""
+        # Update monitoring if active
+        if self.monitoring_service.is_active:
+            self.monitoring_service.update_metrics(
+                processed_data["distance"],
+                processed_data["pitch"], 
+                processed_data["brightness"],
+                processed_data["drowsiness_detected"],
+                processed_data["yawn_detected"],
+                processed_data["blink_detected"],
+                processed_data["ear"],
+            )
+            self._update_face_monitors(processed_data["faces"], self.drowsiness_service.take_retired())
+        else:
+            self.drowsiness_service.take_retired()
+
+        self._publish_snapshot(processed_data, stamp)
+        self._publish_feed(processed_data, stamp.captured_at)
+        self.latency.record("analysis", stamp.origin)
+
+    def _publish_feed(self, data: Dict[str, Any], captured_at: float):
+        """Append this frame's unrounded primary-face metrics to the binary feed."""
+        if not self.binary_feed.subscriber_count:
+            return
+        flags = (
+            (FLAG_FACE if data["pitch"] is not None else 0) |
+            (FLAG_DROWSY if data["drowsiness_detected"] else 0) |
+            (FLAG_YAWN if data["yawn_detected"] else 0) |
+            (FLAG_BLINK if data["blink_detected"] else 0) |
+            (FLAG_MONITORING if self.monitoring_service.is_active else 0)
+        )
+        self.binary_feed.publish(
+            captured_at, flags, data["distance"], data["pitch"], data["yaw"],
+            data["ear"], data["mar"], data["brightness"], data["posture"],
+        )
+
+    def _record_camera_down(self, elapsed: float):
+        if self.monitoring_service.is_active:
+            self.monitoring_service.record_camera_down(elapsed)
+            for monitor in self.face_monitors.values():
+                monitor.record_camera_down(elapsed)
+
+    def _alert_raised(self, alert: str, raised_at: float):
+        self.alert_dispatcher.notify(
+            alert, raised_at,
+            camera_id=settings.CAMERA_ID,
+            monitoring_active=self.monitoring_service.is_active,
+        )
+
+    def get_camera_status(self) -> Dict[str, Any]:
+        """Capture health: up/down, outage and reconnect counts and durations."""
+        if self.capture is None:
+            return {"state": "closed"}
+        return self.capture.stats()
+
+    def get_analysis_status(self) -> Dict[str, Any]:
+        """Cadence, run counts and age of each analysis, and the current quality tier."""
+        snapshot = self.snapshot
+        return {
+            "seq": snapshot.seq,
+            "timestamp": snapshot.timestamp,
+            "stages": snapshot.analysis,
+            "distance_method": self.distance_method,
+            "quality": self.quality.stats(),
+        }
+
+    def _update_face_monitors(self, faces, retired):
+        """Feed each tracked face's metrics into its own monitoring session.
+
+        Sessions of ``retired`` faces are stopped and kept, up to
+        FACE_REPORTS_KEPT of them, for their reports.
+        """
+        for face_id in retired:
+            monitor = self.face_monitors.pop(face_id, None)
+            if monitor is None:
+                continue
+            monitor.stop_monitoring()
+            self.finished_face_monitors[face_id] = monitor
+            while len(self.finished_face_monitors) > settings.FACE_REPORTS_KEPT:
+                self.finished_face_monitors.popitem(last=False)
+        seen = set()
+        for face in faces:
+            monitor = self.face_monitors.get(face["face_id"])
+            if monitor is None:
+                monitor = MonitoringService()
+                monitor.start_monitoring()
+                self.face_monitors[face["face_id"]] = monitor
+            monitor.update_metrics(
+                face["distance"], face["pitch"], face["brightness"],
+                face["drowsiness_detected"], face["yawn_detected"], face["blink_detected"],
+                face["ear"],
+            )
+            seen.add(face["face_id"])
+        # Faces briefly out of the frame, not yet retired, accumulate face-missing time
+        for face_id, monitor in list(self.face_monitors.items()):
+            if face_id not in seen:
+                monitor.update_metrics(None, None, None, False, False, False)
     
-    def _process_frame(self, frame) -> Dict[str, Any]:
-        """Process a single frame with all computer vision algorithms."""
-        h, w = frame.shape[:2]
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    def _process_frame(self, frame, scale: int = 1, rgb: Optional[np.ndarray] = None,
+                       draw: bool = True) -> Dict[str, Any]:
+        """Process a single frame with all computer vision algorithms.
+
+        ``scale`` > 1 means the frame was decoded at reduced size. With
+        ``draw`` off the overlays are left to ``_draw_overlays``. Analyses run
+        through ``self.analysis``, so some values come from an earlier frame;
+        ``data["analysis"]`` tells how old each is. Models and input size follow
+        the tier ``self.quality`` picks from measured processing time; measuring
+        distance from the iris keeps the refined mesh at every tier. Without
+        ``rgb`` the analysis input is made, and released, here.
+        """
+        started = time.perf_counter()
+        tier = self.quality.tier
+        iris = self.distance_method == "iris"
+        self.face_detection_service.set_model(tier.detector_model)
+        self.drowsiness_service.set_refine_landmarks(tier.refine_landmarks or iris)
+        own_rgb = rgb is None
+        if own_rgb:
+            rgb = self._analysis_input(frame)
         
         # Initialize return data
         data = {
@@ -100,100 +490,224 @@ class VideoStreamService:
             "drowsiness_detected": False, "yawn_detected": False, "blink_detected": False
         }
         
-        # Face detection and distance measurement
-        distance, brightness = self.face_detection_service.detect_face_and_measure_distance(rgb, frame)
-        data["distance"] = distance
-        data["brightness"] = brightness
+        # Face detection and distance measurement, and face brightness, at their own cadence
+        analysis = self.analysis
+        analysis.tick()
+        detections = []
+        if not iris:
+            detections = analysis.run(
+                "detection", self.face_detection_service.detect_faces, rgb, frame, scale,
+                draw=False, brightness=False,
+            )
+            # A face appearing or leaving gets its brightness measured straight away
+            levels = analysis.run(
+                "brightness", self.face_detection_service.measure_brightness, frame, detections,
+                inputs=len(detections),
+            )
+            detections = [dict(face, brightness=level) for face, level in zip(detections, levels)]
+            if detections:
+                data["distance"] = detections[0]["distance"]
+                data["brightness"] = detections[0]["brightness"]
         
-        # Drowsiness detection and posture analysis
-        pf_result = self.drowsiness_service.process_frame(rgb, frame)
-        # Handle both 6, 7, or 8 return values for backward compatibility
-        if len(pf_result) == 8:
-            pitch, ear, mar, yaw, drowsiness, yawn, blink_detected, posture_angles = pf_result
-        elif len(pf_result) == 7:
-            pitch, ear, mar, yaw, drowsiness, yawn, blink_detected = pf_result
-            posture_angles = None
-        elif len(pf_result) == 6:
-            pitch, ear, mar, yaw, drowsiness, yawn = pf_result
-            blink_detected = False
-            posture_angles = None
-        else:
-            # Unexpected output, set all to None/False
-            pitch = ear = mar = yaw = drowsiness = yawn = None
-            blink_detected = False
-            posture_angles = None
-        data.update({
-            "pitch": pitch, "ear": ear, "mar": mar, "yaw": yaw,
-            "drowsiness_detected": drowsiness, "yawn_detected": yawn, "blink_detected": blink_detected
-        })
-        
-        # Update shared data
-        with self.lock:
-            self.latest_data.update({
-                "distance": round(distance, 2) if distance else None,
-                "pitch": round(pitch, 2) if pitch else None,
-                "brightness": round(brightness, 2) if brightness else None,
-                "ear": round(ear, 2) if ear else None,
-                "mar": round(mar, 2) if mar else None,
-                "yaw": round(yaw, 2) if yaw else None,
-                "posture_angles": posture_angles if posture_angles else None
-            })
+        # Drowsiness detection (every frame: blinks need it) and posture analysis for every face
+        faces = analysis.run(
+            "mesh", self.drowsiness_service.process_faces, rgb, frame, detections,
+            draw=False, scheduler=analysis, distance=self.distance_method, scale=scale,
+        )
+        if own_rgb:
+            frame_pool.release(rgb)
+        if iris:
+            # Without the detector, brightness is measured over the mesh's face box
+            levels = analysis.run(
+                "brightness", self.face_detection_service.measure_brightness, frame, faces,
+                inputs=len(faces),
+            )
+            for face, level in zip(faces, levels):
+                face["brightness"] = level
+            # Boxes and distances for the overlay, as the detector would have drawn them
+            detections = [
+                {"bbox": face["bbox"], "distance": face["distance"], "brightness": face["brightness"]}
+                for face in faces if face["distance"] is not None
+            ]
+        primary = next((face for face in faces if face["primary"]), None)
+        posture = None
+        if primary is not None:
+            data.update({key: primary[key] for key in (
+                "pitch", "ear", "mar", "yaw",
+                "drowsiness_detected", "yawn_detected", "blink_detected"
+            )})
+            if primary["distance"] is not None:
+                data["distance"] = primary["distance"]
+                data["brightness"] = primary["brightness"]
+            posture = primary["posture"]
+        data["detections"] = detections
+        data["faces"] = faces
+        data["posture"] = posture
+        data["overlay"] = tier.overlay
+        if draw:
+            self._draw_overlays(frame, data)
+
         # Alert logic
-        posture_thresholds = {
-            "Degree of Anteversion of Cervical Spine (y1)": (25, 34),
-            "T1 Slope (y2)": (30, 50),
-            "Upper Thoracic Kyphosis Angle (y3)": (140, 158),
-            "Middle and Lower Thoracic Kyphosis Angle (y4)": (154, 155.5),
-            "T8-T12-L3 Angle (new)": (175, 180.3),
-            "Lumbar Lordosis Angle (y5)": (170, 174),
-        }
         self.alert_service.update(
-            posture_angles=posture_angles,
-            distance=distance,
-            yawn=bool(yawn),
-            drowsy=bool(drowsiness),
-            blink=bool(blink_detected),
-            posture_thresholds=posture_thresholds,
+            posture_angles=posture,
+            distance=data["distance"],
+            yawn=bool(data["yawn_detected"]),
+            drowsy=bool(data["drowsiness_detected"]),
+            blink=bool(data["blink_detected"]),
+            posture_thresholds=POSTURE_HEALTHY_RANGES,
             distance_threshold=settings.GOOD_DISTANCE_MIN,  # Too close if less than min
             yawn_threshold=3,  # Example: 3 yawns in n seconds
             blink_threshold=3  # Example: at least 3 blinks in n seconds
         )
+        # Taken now: in pipelined mode the next frame's inference runs before this one is published
+        data["counters"] = self.drowsiness_service.get_counters()
+        data["alerts"] = self.alert_service.snapshot.alerts
+        data["analysis"] = analysis.stats()
+        self.quality.observe(time.perf_counter() - started)
         
         return data
     
-    def get_latest_data(self) -> Dict[str, Any]:
-        """Get latest processed data."""
-        with self.lock:
-            return self.latest_data.copy()
-    
-    def get_drowsiness_status(self) -> Dict[str, Any]:
-        """Get detailed drowsiness status."""
-        eye_counter, yawn_counter = self.drowsiness_service.get_counters()
-        
-        with self.lock:
-            return {
-                "ear": self.latest_data["ear"],
-                "mar": self.latest_data["mar"],
-                "yaw": self.latest_data["yaw"],
-                "eye_counter": eye_counter,
-                "yawn_counter": yawn_counter,
-                "drowsiness_alert": eye_counter >= settings.EAR_CONSEC_FRAMES,
-                "yawn_alert": yawn_counter >= settings.YAWN_CONSEC_FRAMES
-            }
-    
+    def _publish_snapshot(self, data: Dict[str, Any], stamp: FrameStamp):
+        """Build this frame's snapshot and swap it in for readers."""
+        eye_counter, yawn_counter, _ = data["counters"]
+        self._frame_seq += 1
+        self.snapshot = FrameSnapshot(
+            seq=self._frame_seq,
+            timestamp=stamp.captured_at,
+            metrics=FrameMetrics(
+                distance=rounded(data["distance"]),
+                pitch=rounded(data["pitch"]),
+                brightness=rounded(data["brightness"]),
+                ear=rounded(data["ear"]),
+                mar=rounded(data["mar"]),
+                yaw=rounded(data["yaw"]),
+                posture=data["posture"],
+            ),
+            drowsiness=DrowsinessRecord(
+                ear=rounded(data["ear"]),
+                mar=rounded(data["mar"]),
+                yaw=rounded(data["yaw"]),
+                eye_counter=eye_counter,
+                yawn_counter=yawn_counter,
+                drowsiness_alert=eye_counter >= settings.EAR_CONSEC_FRAMES,
+                yawn_alert=yawn_counter >= settings.YAWN_CONSEC_FRAMES
+            ),
+            faces={face["face_id"]: self._summarize_face(face) for face in data["faces"]},
+            alerts=data["alerts"],
+            session=self.monitoring_service.session_view,
+            analysis=data["analysis"],
+            capture_seq=stamp.seq,
+        )
+        self._publish_state()
+
+    def get_latency_stats(self) -> Dict[str, Any]:
+        """Latency percentiles from capture to read, analysis, encode and socket write."""
+        return self.latency.stats()
+
+    def reset_latency_stats(self):
+        self.latency.reset()
+
+    def _publish_state(self):
+        """Publish the read endpoints' payloads; versions only move when they change."""
+        snapshot = self.snapshot
+        self.metrics_state.publish(snapshot.metrics)
+        self.drowsiness_state.publish(snapshot.drowsiness)
+        self.status_state.publish({
+            "monitoring_active": self.monitoring_service.is_active,
+            "current_metrics": snapshot.metrics
+        })
+        self.state_changes.touch()
+
+    @property
+    def report_state(self) -> VersionedValue:
+        """Version of the monitoring session data the report is built from."""
+        return self.monitoring_service.report_state
+
+    def get_face_report(self, face_id: int, start: Optional[float] = None,
+                        end: Optional[float] = None) -> Dict[str, Any]:
+        """Generate the monitoring report of one tracked face, optionally of a time range."""
+        monitor = self.face_monitors.get(face_id) or self.finished_face_monitors.get(face_id)
+        if monitor is None:
+            raise FaceNotFoundException(face_id)
+        return monitor.generate_report(start, end)
+
+    @staticmethod
+    def _summarize_face(face: Dict[str, Any]) -> TrackedFaceMetrics:
+        return TrackedFaceMetrics(
+            face_id=face["face_id"],
+            primary=face["primary"],
+            eye_counter=face["eye_counter"],
+            yawn_counter=face["yawn_counter"],
+            blink_count=face["blink_count"],
+            distance=rounded(face["distance"]),
+            pitch=rounded(face["pitch"]),
+            brightness=rounded(face["brightness"]),
+            ear=rounded(face["ear"]),
+            mar=rounded(face["mar"]),
+            yaw=rounded(face["yaw"]),
+            posture=face["posture"],
+        )
+
     def start_monitoring(self) -> Dict[str, str]:
-        """Start monitoring session."""
+        """Start monitoring session.
+
+        With MONITORING_HEADLESS the session keeps the frame loop running
+        by itself, so it records whether or not anyone watches the video.
+        """
+        if settings.MONITORING_HEADLESS and not self.monitoring_service.is_active:
+            # Fails before a session exists when the camera can't be opened
+            self._initialize_camera()
         # Reset drowsiness counters
         self.drowsiness_service.reset_counters()
-        return self.monitoring_service.start_monitoring()
+        result = self.monitoring_service.start_monitoring()
+        if result["status"] == "started":
+            self.face_monitors = {}
+            self.finished_face_monitors = OrderedDict()
+            if settings.MONITORING_HEADLESS:
+                self._session_keepalive = self.broadcaster.subscribe(images=False)
+        self._publish_state()
+        return result
     
     def stop_monitoring(self) -> Dict[str, str]:
-        """Stop monitoring session."""
-        return self.monitoring_service.stop_monitoring()
+        """Stop monitoring session, and its recording if one is running."""
+        keepalive, self._session_keepalive = self._session_keepalive, None
+        if keepalive is not None:
+            keepalive.cancel()
+        self.recorder.stop()
+        for monitor in list(self.face_monitors.values()):
+            monitor.stop_monitoring()
+        result = self.monitoring_service.stop_monitoring()
+        self._publish_state()
+        return result
     
-    def get_report(self) -> Dict[str, Any]:
-        """Generate monitoring report."""
-        return self.monitoring_service.generate_report()
+    def start_recording(self) -> Dict[str, str]:
+        """Record the annotated stream of the current monitoring session."""
+        if not self.monitoring_service.is_active:
+            raise MonitoringNotActiveException()
+        self._initialize_camera()
+        started = self.monitoring_service.session_view["start_time"]
+        return self.recorder.start(time.strftime("session-%Y%m%d-%H%M%S", time.localtime(started)))
+
+    def stop_recording(self) -> Dict[str, str]:
+        """Stop recording and finalize the current segment."""
+        return self.recorder.stop()
+
+    def get_recording_status(self) -> Dict[str, Any]:
+        return self.recorder.status()
+
+    def get_report(self, start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, Any]:
+        """Generate monitoring report, of the whole session or of unix times [start, end)."""
+        return self.monitoring_service.generate_report(start, end)
+
+    def get_history(self, start: float, end: float, resolution: Optional[float] = None) -> Dict[str, Any]:
+        """Report of [start, end) from the stored history, optionally per ``resolution`` seconds."""
+        if self.history is None:
+            raise HistoryNotEnabledException()
+        return self.history.query(start, end, resolution)
+
+    def export_sketches(self) -> Dict[str, Any]:
+        """The session's metric histograms in mergeable form."""
+        return self.monitoring_service.export_sketches()
     
     def cleanup(self):
         """Cleanup resources."""
@@ -201,4 +715,30 @@ class VideoStreamService:
         cv2.destroyAllWindows()
 
     def get_and_reset_alerts(self) -> Dict[str, bool]:
-        return self.alert_service.get_and_reset_alerts()
\ No newline at end of file
+        return self.alert_service.get_and_reset_alerts()
+
+    def get_alerts(self) -> Dict[str, bool]:
+        return self.alert_service.get_alerts()
+
+    def get_notification_stats(self) -> Dict[str, Any]:
+        return self.alert_dispatcher.stats()
+
+    def get_engine_stats(self) -> Dict[str, Any]:
+        """Frame loop, camera, analysis and delivery counters for /health/stats."""
+        return {
+            "frames_processed": self.snapshot.seq,
+            "target_fps": settings.VIDEO_FPS,
+            "stream_subscribers": self.broadcaster.image_subscriber_count,
+            "frame_loop": ("idle" if not self.broadcaster.is_running
+                           else "rendering" if self.is_rendering else "metrics_only"),
+            "feed_subscribers": self.binary_feed.subscriber_count,
+            "monitoring_active": self.monitoring_service.is_active,
+            "camera": self.get_camera_status(),
+            "pipeline": self.pipeline.stats() if self.pipeline.is_running else None,
+            "analysis_quality": self.quality.stats(),
+            "latency": self.get_latency_stats(),
+            "frame_buffers": frame_pool.stats(),
+            "alert_queue": self.alert_dispatcher.stats()["queued"],
+            "history": self.history.stats() if self.history is not None else None,
+            "engine": self.engine_server.stats() if self.engine_server is not None else {"role": "single"},
+        }
\ No newline at end of file
@@ -0,0 +1,89 @@
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+
+class BufferPool:
+    """Reusable numpy arrays, kept per shape and dtype.
+
+    ``get`` leases an array to the caller, who owns it until handing it to
+    ``release``; only released arrays are handed out again. Ownership can be
+    passed on: a published frame owns its image and releases it once the last
+    subscriber is done with the frame (see SharedFrame). Releasing an array
+    the pool did not lease, or one already released, does nothing, so arrays
+    that may or may not be pooled can be released alike; an array that is
+    never released is merely not reused.
+
+    Up to ``max_per_shape`` arrays are pooled per shape, leased or not;
+    beyond that, and for ``max_per_shape`` 0, ``get`` allocates an array that
+    is not pooled. Contents of a leased array are undefined.
+    """
+
+    def __init__(self, name: str, max_per_shape: int):
+        self.name = name
+        self.max_per_shape = max_per_shape
+        self._free: Dict[Tuple[Tuple[int, ...], str], List[np.ndarray]] = {}
+        # id -> (key, array) of every pooled array out on lease
+        self._leased: Dict[int, Tuple[Tuple[Tuple[int, ...], str], np.ndarray]] = {}
+        self._pooled: Dict[Tuple[Tuple[int, ...], str], int] = {}
+        self._lock = threading.Lock()
+        self.allocated = 0
+        self.reused = 0
+
+    def get(self, shape: Sequence[int], dtype: Any = np.uint8) -> np.ndarray:
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                buffer = free.pop()
+                self.reused += 1
+            else:
+                buffer = np.empty(key[0], dtype)
+                self.allocated += 1
+                if self._pooled.get(key, 0) >= self.max_per_shape:
+                    return buffer
+                self._pooled[key] = self._pooled.get(key, 0) + 1
+            self._leased[id(buffer)] = (key, buffer)
+            return buffer
+
+    def get_like(self, array: np.ndarray) -> np.ndarray:
+        return self.get(array.shape, array.dtype)
+
+    def release(self, buffer: Any):
+        """Give a leased array back for reuse; anything else is ignored."""
+        if buffer is None:
+            return
+        with self._lock:
+            leased = self._leased.get(id(buffer))
+            # The id of a leased array cannot be reused while the pool holds it
+            if leased is None or leased[1] is not buffer:
+                return
+            del self._leased[id(buffer)]
+            self._free.setdefault(leased[0], []).append(buffer)
+
+    def clear(self):
+        """Forget every pooled array; leased ones are no longer taken back."""
+        with self._lock:
+            self._free = {}
+            self._leased = {}
+            self._pooled = {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            leased = [buffer for _, buffer in self._leased.values()]
+            free = [buffer for pooled in self._free.values() for buffer in pooled]
+            return {
+                "shapes": len(self._pooled),
+                "buffers": len(leased) + len(free),
+                "in_use": len(leased),
+                "bytes": sum(buffer.nbytes for buffer in leased + free),
+                "allocated": self.allocated,
+                "reused": self.reused,
+            }
+
+
+# Frame-sized images: captures, colour conversions, overlays and resized renditions
+frame_pool = BufferPool("frames", settings.FRAME_POOL_SIZE)
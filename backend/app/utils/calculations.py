@@ -27,4 +27,51 @@ def landmarks_to_3d(landmarks, idx: int, w: int, h: int) -> np.ndarray:
 
 def get_face_width_pixels(bbox, image_width: int) -> float:
     """Calculate face width in pixels from bounding box."""
-    return bbox.width * image_width
\ No newline at end of file
+    return bbox.width * image_width
+
+def batch_aspect_ratio(points: np.ndarray, indices: List[int]) -> np.ndarray:
+    """Aspect ratio for every face in a (faces, landmarks, 2) array at once."""
+    p = points[:, indices].astype(float)
+    top = (np.linalg.norm(p[:, 1] - p[:, 5], axis=1) +
+           np.linalg.norm(p[:, 2] - p[:, 4], axis=1))
+    bottom = 2 * np.linalg.norm(p[:, 0] - p[:, 3], axis=1)
+    return np.divide(top, bottom, out=np.zeros_like(top), where=bottom != 0)
+
+def batch_pitch(points_3d: np.ndarray, left_eye: int, right_eye: int, chin: int) -> np.ndarray:
+    """Head pitch in degrees for every face in a (faces, landmarks, 3) array."""
+    left = points_3d[:, left_eye]
+    right = points_3d[:, right_eye]
+    eye_mid = (left + right) / 2
+    normal = np.cross(right - left, points_3d[:, chin] - eye_mid)
+    norms = np.linalg.norm(normal, axis=1)
+    # Dot product with the ground plane normal (0, -1, 0)
+    dot = -normal[:, 1] / np.where(norms == 0, 1, norms)
+    return np.degrees(np.arccos(np.clip(dot, -1.0, 1.0))) - 90
+
+def batch_yaw(points_3d: np.ndarray, left_eye: int, right_eye: int) -> np.ndarray:
+    """Head yaw in degrees for every face in a (faces, landmarks, 3) array."""
+    eye_vector = points_3d[:, right_eye] - points_3d[:, left_eye]
+    return np.degrees(np.arctan2(eye_vector[:, 2], eye_vector[:, 0]))
+
+def batch_iris_diameter(points: np.ndarray, iris_edges: List[Tuple[int, int]]) -> np.ndarray:
+    """Mean iris diameter in pixels for every face in a (faces, landmarks, 2+) array.
+
+    ``iris_edges`` are (edge, opposite edge) landmark pairs, one per iris. NaN
+    for meshes without iris landmarks (FaceMesh without refine_landmarks).
+    """
+    if points.shape[1] <= max(max(pair) for pair in iris_edges):
+        return np.full(points.shape[0], np.nan)
+    diameters = [np.linalg.norm(points[:, a, :2] - points[:, b, :2], axis=1) for a, b in iris_edges]
+    return np.mean(diameters, axis=0)
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise intersection-over-union of (x1, y1, x2, y2) boxes."""
+    a = np.asarray(boxes_a, dtype=float).reshape(-1, 4)[:, None, :]
+    b = np.asarray(boxes_b, dtype=float).reshape(-1, 4)[None, :, :]
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
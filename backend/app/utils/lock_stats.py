@@ -0,0 +1,68 @@
+import threading
+import time
+import weakref
+from typing import Dict
+
+_locks: "weakref.WeakSet[TimedLock]" = weakref.WeakSet()
+
+
+class TimedLock:
+    """A threading.Lock that records how long it is waited for and held.
+
+    Usable directly, as a context manager, or as the lock of a
+    threading.Condition. Locks sharing a name are reported together.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._acquired_at = 0.0
+        self.acquisitions = 0
+        self.wait_time = 0.0
+        self.hold_time = 0.0
+        self.max_hold = 0.0
+        _locks.add(self)
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            self._acquired_at = time.perf_counter()
+            self.acquisitions += 1
+            self.wait_time += self._acquired_at - start
+        return acquired
+
+    def release(self):
+        held = time.perf_counter() - self._acquired_at
+        self.hold_time += held
+        if held > self.max_hold:
+            self.max_hold = held
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def lock_stats() -> Dict[str, Dict[str, float]]:
+    """Acquisition counts and wait/hold times (ms) per lock name."""
+    stats: Dict[str, Dict[str, float]] = {}
+    for lock in list(_locks):
+        entry = stats.setdefault(lock.name, {
+            "acquisitions": 0, "wait_ms": 0.0, "hold_ms": 0.0, "max_hold_ms": 0.0
+        })
+        entry["acquisitions"] += lock.acquisitions
+        entry["wait_ms"] += lock.wait_time * 1000
+        entry["hold_ms"] += lock.hold_time * 1000
+        entry["max_hold_ms"] = max(entry["max_hold_ms"], lock.max_hold * 1000)
+    for entry in stats.values():
+        entry["wait_ms"] = round(entry["wait_ms"], 3)
+        entry["hold_ms"] = round(entry["hold_ms"], 3)
+        entry["max_hold_ms"] = round(entry["max_hold_ms"], 3)
+    return stats
@@ -0,0 +1,28 @@
+import os
+import resource
+import threading
+import time
+from typing import Dict
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_bytes() -> int:
+    """Current resident set size; falls back to the peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        # ru_maxrss is KiB on Linux but bytes on macOS
+        return usage.ru_maxrss if os.uname().sysname == "Darwin" else usage.ru_maxrss * 1024
+
+
+def process_stats() -> Dict[str, float]:
+    """CPU time, memory and thread count of this process."""
+    return {
+        "cpu_seconds": round(time.process_time(), 3),
+        "rss_bytes": _rss_bytes(),
+        "threads": threading.active_count(),
+        "monotonic": round(time.monotonic(), 3),
+    }
@@ -0,0 +1,137 @@
+import math
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+class Histogram:
+    """Streaming histogram with fixed-width bins over [low, high).
+
+    Memory is constant however many values are added, two histograms with
+    the same layout merge exactly by adding counts (so sessions and cameras
+    combine into fleet statistics), and quantiles are accurate to within one
+    bin width. Values outside the range are counted in an underflow or
+    overflow bin and reported as the observed min or max.
+    """
+
+    def __init__(self, low: float, high: float, bin_width: float):
+        if high <= low or bin_width <= 0:
+            raise ValueError("Histogram needs low < high and a positive bin width")
+        self.low = low
+        self.high = high
+        self.bin_width = bin_width
+        self.bins = int(math.ceil((high - low) / bin_width))
+        # [underflow, bins..., overflow]
+        self.counts = np.zeros(self.bins + 2, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def layout(self) -> tuple:
+        return (self.low, self.high, self.bin_width)
+
+    def add(self, value: float):
+        if value < self.low:
+            index = 0
+        elif value >= self.high:
+            index = self.bins + 1
+        else:
+            index = int((value - self.low) / self.bin_width) + 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        """Add ``other``'s counts into this histogram; layouts must match."""
+        if other.layout != self.layout:
+            raise ValueError(f"Cannot merge histogram {other.layout} into {self.layout}")
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value below which a fraction ``q`` of the values lie, interpolated within its bin."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = np.cumsum(self.counts)
+        index = int(np.searchsorted(cumulative, rank, side="left"))
+        index = min(index, len(cumulative) - 1)
+        if index == 0:
+            return self.min
+        if index == self.bins + 1:
+            return self.max
+        below = cumulative[index - 1]
+        in_bin = self.counts[index]
+        fraction = (rank - below) / in_bin if in_bin else 0.0
+        value = self.low + (index - 1 + fraction) * self.bin_width
+        return min(max(value, self.min), self.max)
+
+    def buckets(self, edges: Sequence[float]) -> List[Dict[str, Any]]:
+        """Counts between consecutive ``edges``, with the range ends as the outer bounds.
+
+        Edges are rounded to bin boundaries; values outside the histogram's
+        range land in the first and last bucket.
+        """
+        bounds = [self.low] + [e for e in edges if self.low < e < self.high] + [self.high]
+        cumulative = np.concatenate([[0], np.cumsum(self.counts)])
+        buckets = []
+        for lo, hi in zip(bounds, bounds[1:]):
+            start = 0 if lo == self.low else self._bin_edge(lo)
+            end = len(self.counts) if hi == self.high else self._bin_edge(hi)
+            buckets.append({"lo": lo, "hi": hi, "count": int(cumulative[end] - cumulative[start])})
+        return buckets
+
+    def _bin_edge(self, value: float) -> int:
+        return int(round((value - self.low) / self.bin_width)) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain, JSON-ready form; only non-empty bins are listed, as [index, count]."""
+        nonzero = np.flatnonzero(self.counts)
+        return {
+            "low": self.low,
+            "high": self.high,
+            "bin_width": self.bin_width,
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "bins": [[int(i), int(self.counts[i])] for i in nonzero],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Histogram":
+        histogram = cls(data["low"], data["high"], data["bin_width"])
+        for index, count in data["bins"]:
+            if not 0 <= index < len(histogram.counts):
+                raise ValueError(f"Histogram bin {index} is outside {histogram.layout}")
+            histogram.counts[index] = count
+        histogram.count = int(histogram.counts.sum())
+        histogram.total = float(data.get("sum", 0.0))
+        if histogram.count:
+            histogram.min = data["min"]
+            histogram.max = data["max"]
+        return histogram
+
+
+def merge_histograms(histograms: Iterable[Histogram]) -> Optional[Histogram]:
+    """One histogram holding all of ``histograms``; None when there are none."""
+    merged = None
+    for histogram in histograms:
+        if merged is None:
+            merged = Histogram(*histogram.layout)
+        merged.merge(histogram)
+    return merged
@@ -0,0 +1,149 @@
+import math
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class RangeMax:
+    """Append-only sequence answering the max over any index range in O(log n).
+
+    Level k holds the max of each aligned block of 2**k values, so the
+    levels take about twice the memory of the values themselves and a range
+    is covered by at most two blocks per level. Appending is amortised O(1).
+    """
+
+    def __init__(self):
+        self._levels: List[array] = [array("d")]
+
+    def __len__(self) -> int:
+        return len(self._levels[0])
+
+    def __getitem__(self, index: int) -> float:
+        return self._levels[0][index]
+
+    def append(self, value: float):
+        levels = self._levels
+        levels[0].append(value)
+        k = 0
+        # Each completed pair of blocks completes one block a level up
+        while len(levels[k]) % 2 == 0:
+            if len(levels) == k + 1:
+                levels.append(array("d"))
+            levels[k + 1].append(max(levels[k][-2], levels[k][-1]))
+            k += 1
+
+    def max(self, lo: int, hi: int) -> float:
+        """Max of values [lo, hi); -inf for an empty range."""
+        result = -math.inf
+        k = 0
+        while lo < hi:
+            level = self._levels[k]
+            if lo & 1:
+                result = max(result, level[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                result = max(result, level[hi])
+            lo >>= 1
+            hi >>= 1
+            k += 1
+        return result
+
+
+class SessionTimeline:
+    """Running totals of a session sampled at every bucket boundary, plus per-bucket peaks.
+
+    ``record`` takes the session's running totals after each frame. When a
+    bucket closes, the totals as of its end are appended, so the stored
+    series is itself the prefix sum of the per-bucket increments: any field
+    summed over a time range is the difference of two entries, O(1) however
+    long the session. Peaks (maxima, which do not subtract) go into a
+    RangeMax per field, O(log n). The bucket still open is answered from
+    the latest totals, so live ranges are exact to the last frame. Buckets
+    are aligned to multiples of ``resolution`` since the epoch, so those of
+    different sessions line up; the first one starts before the session.
+
+    Appends happen on the frame loop and queries on API threads without a
+    lock: entries are only ever appended, so a query reads a stable prefix,
+    at worst one bucket behind the totals it pairs it with.
+    """
+
+    def __init__(self, start: float, fields: Iterable[str], peaks: Iterable[str] = (),
+                 resolution: float = 1.0):
+        self.start = start
+        self.resolution = resolution
+        self.origin = math.floor(start / resolution) * resolution  # start of bucket 0
+        self.fields = tuple(fields)
+        self.peaks = tuple(peaks)
+        # _prefix[field][i]: total before bucket i; entry 0 is the session start
+        self._prefix: Dict[str, array] = {field: array("d", [0.0]) for field in self.fields}
+        self._totals: Dict[str, float] = dict.fromkeys(self.fields, 0.0)
+        self._peak_series: Dict[str, RangeMax] = {peak: RangeMax() for peak in self.peaks}
+        self._open_peaks: Dict[str, float] = dict.fromkeys(self.peaks, -math.inf)
+        self.closed = 0  # buckets whose end totals are stored
+
+    def bucket(self, t: float) -> int:
+        return int((t - self.origin) // self.resolution)
+
+    def record(self, t: float, totals: Dict[str, float], peaks: Optional[Dict[str, Optional[float]]] = None):
+        """Take the running totals as of time ``t``, and this frame's peak values."""
+        bucket = self.bucket(t)
+        while self.closed < bucket:
+            for field in self.fields:
+                self._prefix[field].append(self._totals[field])
+            for peak in self.peaks:
+                self._peak_series[peak].append(self._open_peaks[peak])
+            self._open_peaks = dict.fromkeys(self.peaks, -math.inf)
+            self.closed += 1
+        self._totals = {field: totals[field] for field in self.fields}
+        if peaks:
+            open_peaks = self._open_peaks
+            for peak, value in peaks.items():
+                if value is not None and value > open_peaks[peak]:
+                    open_peaks[peak] = value
+
+    def bounds(self, start: float, end: float) -> Tuple[int, int]:
+        """Bucket boundaries [lo, hi) of the buckets overlapping [start, end), within those recorded."""
+        last = self.closed + 1
+        lo = min(max(self.bucket(start), 0), last)
+        hi = min(max(math.ceil((end - self.origin) / self.resolution), 0), last)
+        return lo, hi
+
+    def totals(self, lo: int, hi: int) -> Dict[str, float]:
+        """Every field summed over buckets [lo, hi), as returned by ``bounds``."""
+        closed, current = self.closed, self._totals
+        prefix = self._prefix
+
+        def at(field: str, boundary: int) -> float:
+            # Boundaries up to ``closed`` are stored; past it is the open bucket's end
+            return prefix[field][boundary] if boundary <= closed else current[field]
+
+        return {field: at(field, hi) - at(field, lo) for field in self.fields}
+
+    def peak(self, name: str, lo: int, hi: int) -> Optional[float]:
+        """Max of a peak field over buckets [lo, hi); None if nothing was recorded there."""
+        closed, open_peaks = self.closed, self._open_peaks
+        value = self._peak_series[name].max(lo, min(hi, closed))
+        if hi > closed:
+            value = max(value, open_peaks[name])
+        return _finite(value)
+
+    def buckets(self, first: int, include_open: bool = False) -> Iterator[Tuple[float, Dict[str, float], Dict[str, Optional[float]]]]:
+        """Start time, field increments and peaks of each closed bucket from ``first`` on.
+
+        With ``include_open`` the open bucket follows, as it stands: only for a
+        timeline that gets no more records.
+        """
+        closed, current, open_peaks = self.closed, self._totals, self._open_peaks
+        prefix = self._prefix
+        for i in range(first, closed):
+            yield (self.origin + i * self.resolution,
+                   {field: prefix[field][i + 1] - prefix[field][i] for field in self.fields},
+                   {peak: _finite(self._peak_series[peak][i]) for peak in self.peaks})
+        if include_open:
+            yield (self.origin + closed * self.resolution,
+                   {field: current[field] - prefix[field][closed] for field in self.fields},
+                   {peak: _finite(open_peaks[peak]) for peak in self.peaks})
+
+
+def _finite(value: float) -> Optional[float]:
+    return value if value > -math.inf else None
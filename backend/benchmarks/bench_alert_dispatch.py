@@ -0,0 +1,108 @@
+"""Check that alert notification never slows the caller, whatever the sinks do.
+
+Starts local stand-ins for every sink kind: a webhook that answers after
+--webhook-delay seconds (or a dead URL with --dead-webhook), a Unix socket
+listener and a JSONL file. It then raises --alerts distinct alerts at --rate
+per second through AlertDispatcher.notify, as the frame loop would, and
+prints the notify() call time percentiles next to each sink's delivery
+stats as JSON.
+
+    python -m benchmarks.bench_alert_dispatch --alerts 500 --rate 100
+    python -m benchmarks.bench_alert_dispatch --dead-webhook --max-attempts 3
+"""
+import argparse
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from app.services.alert_dispatcher import AlertDispatcher, JsonlFileSink, UnixSocketSink, WebhookSink
+
+
+def slow_webhook(delay: float) -> str:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/alerts"
+
+
+def socket_listener(path: str):
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+
+    def serve():
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=lambda: all(iter(lambda: conn.recv(65536), b"")), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=100.0, help="alerts raised per second")
+    parser.add_argument("--webhook-delay", type=float, default=2.0)
+    parser.add_argument("--dead-webhook", action="store_true", help="point the webhook at a closed port")
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--rate-per-min", type=int, default=600)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--settle", type=float, default=5.0, help="seconds to let sinks drain afterwards")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="alert-dispatch-")
+    socket_path = os.path.join(workdir, "alerts.sock")
+    socket_listener(socket_path)
+    url = "http://127.0.0.1:9/alerts" if args.dead_webhook else slow_webhook(args.webhook_delay)
+    dispatcher = AlertDispatcher(
+        [WebhookSink(url, timeout=5.0), UnixSocketSink(socket_path), JsonlFileSink(os.path.join(workdir, "alerts.jsonl"))],
+        batch_size=args.batch_size,
+        batch_delay=0.2,
+        dedup_seconds=0,
+        rate_per_min=args.rate_per_min,
+        retry_initial=0.2,
+        max_attempts=args.max_attempts,
+    )
+    dispatcher.start()
+
+    calls = []
+    interval = 1.0 / args.rate
+    for i in range(args.alerts):
+        started = time.perf_counter()
+        dispatcher.notify(f"alert-{i}", time.time(), camera_id=0)
+        calls.append(time.perf_counter() - started)
+        time.sleep(interval)
+    time.sleep(args.settle)
+    stats = dispatcher.stats()
+    dispatcher.stop(timeout=1.0)
+
+    us = np.array(calls) * 1e6
+    print(json.dumps({
+        "alerts": args.alerts,
+        "webhook": "dead" if args.dead_webhook else f"{args.webhook_delay}s per request",
+        "notify_us": {
+            "p50": round(float(np.percentile(us, 50)), 1),
+            "p99": round(float(np.percentile(us, 99)), 1),
+            "max": round(float(us.max()), 1),
+        },
+        "dispatcher": stats,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
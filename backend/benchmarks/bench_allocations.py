@@ -0,0 +1,118 @@
+"""Measure Python-side memory allocated per frame on the processing path, with tracemalloc.
+
+Drives the frame loop's own step (capture, colour conversion, analysis,
+overlays, publish and one JPEG encode) on the main thread and records, for
+every frame after warm-up, how far traced memory peaked above where the
+frame started, less the JPEG it produced (that is the output viewers get).
+With the frame buffer pool that transient stays far below the size of one
+frame; without it, each frame allocates several frame-sized arrays.
+
+Fails (exit status 1, with the reasons under "failures") when the median
+transient exceeds --max-bytes, or, with the pool on, when any measured
+frame had to allocate a new pooled array or leases pile up: every buffer
+the frame path takes must come back through frame_pool.release. That way
+it gates changes to the frame path.
+
+tracemalloc sees numpy and OpenCV arrays, not MediaPipe's native buffers.
+
+    python -m benchmarks.bench_allocations --width 1920 --height 1080
+    python -m benchmarks.bench_allocations --source file --uri clip.mp4 --no-pool
+"""
+import argparse
+import json
+import sys
+import tracemalloc
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.frame_broadcast import Subscription
+from app.services.frame_sources import create_frame_source
+from app.services.video_stream import VideoStreamService
+from app.utils.buffer_pool import frame_pool
+
+
+def step(service: VideoStreamService, encode: bool) -> int:
+    """Run one frame through the loop; returns the size of the JPEG it produced."""
+    # Only the sequence id: holding the previous frame would keep its JPEG alive
+    previous = service.broadcaster.latest.seq if service.broadcaster.latest is not None else None
+    service._next_frame()
+    frame = service.broadcaster.latest
+    if frame is None or frame.seq == previous:
+        return 0
+    return len(frame.jpeg()) if encode else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="synthetic", choices=["synthetic", "file", "images"])
+    parser.add_argument("--uri", default="", help="video file or image directory")
+    parser.add_argument("--width", type=int, default=1920, help="synthetic frame width")
+    parser.add_argument("--height", type=int, default=1080, help="synthetic frame height")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--no-encode", action="store_true", help="leave JPEG encoding out of the step")
+    parser.add_argument("--no-pool", action="store_true", help="allocate every buffer, for comparison")
+    parser.add_argument("--max-bytes", type=int, default=256 * 1024,
+                        help="fail when the median per-frame transient exceeds this")
+    args = parser.parse_args()
+
+    if args.no_pool:
+        frame_pool.max_per_shape = 0
+    service = VideoStreamService(create_frame_source(
+        args.source, uri=args.uri, fps=settings.VIDEO_FPS, realtime=False,
+        width=args.width, height=args.height,
+    ))
+    service._initialize_camera()
+    # A viewer that never pulls, so frames are drawn and published as they are for viewers;
+    # added directly, since subscribing would start the broadcaster's own loop
+    service.broadcaster._subscribers += (Subscription(service.broadcaster, maxsize=1),)
+    for _ in range(args.warmup):
+        step(service, not args.no_encode)
+
+    allocated_before = frame_pool.allocated
+    in_use_before = frame_pool.stats()["in_use"]
+    tracemalloc.start()
+    transient, retained = [], []
+    for _ in range(args.frames):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        encoded = step(service, not args.no_encode)
+        after, peak = tracemalloc.get_traced_memory()
+        transient.append(peak - before - encoded)
+        retained.append(after - before)
+    tracemalloc.stop()
+    frame_bytes = service.broadcaster.latest.image.nbytes
+    pool_allocations = frame_pool.allocated - allocated_before
+    in_use = frame_pool.stats()["in_use"]
+    service.close_camera()
+
+    median = int(np.median(transient))
+    failures = []
+    if median > args.max_bytes:
+        failures.append(f"median per-frame transient {median} B exceeds {args.max_bytes} B")
+    if not args.no_pool:
+        if pool_allocations:
+            failures.append(f"{pool_allocations} arrays allocated after warm-up; a buffer is not released")
+        if in_use > in_use_before:
+            failures.append(f"{in_use - in_use_before} more buffers leased than after warm-up")
+    result = {
+        "source": args.source,
+        "pool": not args.no_pool,
+        "encode": not args.no_encode,
+        "frame_bytes": frame_bytes,
+        "transient_bytes_median": median,
+        "transient_bytes_max": int(max(transient)),
+        "transient_frames_median": round(median / frame_bytes, 3),
+        "retained_bytes_median": int(np.median(retained)),
+        "pool_allocations": pool_allocations,
+        "pool_stats": frame_pool.stats(),
+        "max_bytes": args.max_bytes,
+        "failures": failures,
+    }
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Compare per-frame analysis time with every analysis on every frame against the cadences.
+
+Runs the same frames through the analysis step (no capture pacing, no
+encoding) twice: once with every ANALYSIS_* cadence at 1, once with the
+configured or given cadences. Prints the mean and p95 milliseconds per frame
+of each and, for the scheduled run, every stage's runs and mean run time as
+JSON. The difference is the per-frame headroom the cadences free up.
+
+    python -m benchmarks.bench_analysis_cadence --source images --uri ./faces
+    python -m benchmarks.bench_analysis_cadence --source file --uri clip.mp4 --detection-every 10
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.frame_sources import create_frame_source
+from app.services.video_stream import VideoStreamService
+
+
+def run(args, detection: int, brightness: int, posture: int):
+    settings.ANALYSIS_DETECTION_EVERY = detection
+    settings.ANALYSIS_BRIGHTNESS_EVERY = brightness
+    settings.ANALYSIS_POSTURE_EVERY = posture
+    source = create_frame_source(
+        args.source, uri=args.uri, fps=settings.VIDEO_FPS, realtime=False,
+        width=args.width, height=args.height,
+    )
+    service = VideoStreamService(source)
+    source.open()
+    times = []
+    for i in range(args.warmup + args.frames):
+        captured = source.read()
+        if captured is None:
+            break
+        started = time.perf_counter()
+        service._process_frame(captured.image, captured.scale, draw=False)
+        if i >= args.warmup:
+            times.append(time.perf_counter() - started)
+    source.close()
+    ms = np.array(times) * 1000
+    return {
+        "mean_ms": round(float(ms.mean()), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "stages": service.analysis.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="synthetic", choices=["synthetic", "file", "images"])
+    parser.add_argument("--uri", default="", help="video file or image directory")
+    parser.add_argument("--width", type=int, default=1280, help="synthetic frame width")
+    parser.add_argument("--height", type=int, default=720, help="synthetic frame height")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--detection-every", type=int, default=settings.ANALYSIS_DETECTION_EVERY)
+    parser.add_argument("--brightness-every", type=int, default=settings.ANALYSIS_BRIGHTNESS_EVERY)
+    parser.add_argument("--posture-every", type=int, default=settings.ANALYSIS_POSTURE_EVERY)
+    args = parser.parse_args()
+
+    every_frame = run(args, 1, 1, 1)
+    scheduled = run(args, args.detection_every, args.brightness_every, args.posture_every)
+    print(json.dumps({
+        "source": args.source,
+        "uri": args.uri or None,
+        "every_frame_ms": every_frame["mean_ms"],
+        "every_frame_p95_ms": every_frame["p95_ms"],
+        "scheduled_ms": scheduled["mean_ms"],
+        "scheduled_p95_ms": scheduled["p95_ms"],
+        "headroom_ms": round(every_frame["mean_ms"] - scheduled["mean_ms"], 2),
+        "stages": scheduled["stages"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
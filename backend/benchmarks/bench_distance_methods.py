@@ -0,0 +1,157 @@
+"""Compare distance from the face detector with distance from the iris landmarks.
+
+Runs every frame of a recording or image directory through both methods:
+the face detector plus face mesh (DISTANCE_METHOD=detector) and the
+iris-refined face mesh alone with brightness over the mesh's face box
+(DISTANCE_METHOD=iris). Every analysis runs on every frame, without the
+ANALYSIS_* cadences. Prints as JSON:
+
+- CPU and wall milliseconds per frame of each method, and of the detector alone
+- how many frames each method produced a distance for
+- how far the two distances and brightnesses are apart where both have one
+- frame-to-frame jitter of each distance (noise on a still subject)
+- with --true-distance (a recording made at a measured distance), each
+  method's error, and the IRIS_DIAMETER_CM that would remove the iris bias
+
+    python -m benchmarks.bench_distance_methods --source file --uri session.mp4
+    python -m benchmarks.bench_distance_methods --source images --uri ./faces --true-distance 60
+"""
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.drowsiness_detection import DrowsinessDetectionService
+from app.services.face_detection import FaceDetectionService
+from app.services.frame_sources import create_frame_source
+
+
+def timed(fn, *args, **kwargs):
+    cpu, wall = time.process_time(), time.perf_counter()
+    value = fn(*args, **kwargs)
+    return value, time.process_time() - cpu, time.perf_counter() - wall
+
+
+def primary(faces):
+    return next((face for face in faces if face["primary"]), None)
+
+
+def summary(values):
+    values = np.asarray(values, dtype=float) * 1000
+    if not len(values):
+        return None
+    return {"mean_ms": round(float(values.mean()), 2), "p95_ms": round(float(np.percentile(values, 95)), 2)}
+
+
+def rounded(value, digits=2):
+    return round(float(value), digits) if value is not None and np.isfinite(value) else None
+
+
+def jitter(series):
+    """Median absolute change between consecutive frames that both have a distance."""
+    steps = [abs(b - a) for a, b in zip(series, series[1:]) if a is not None and b is not None]
+    return rounded(np.median(steps)) if steps else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="file", choices=["file", "images"])
+    parser.add_argument("--uri", required=True, help="video file or image directory")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--loop", action="store_true", help="replay the source until --frames")
+    parser.add_argument("--plain-mesh", action="store_true",
+                        help="run the detector method with the unrefined mesh, as the balanced tier does")
+    parser.add_argument("--true-distance", type=float, default=None, help="cm, if the recording was made at one")
+    args = parser.parse_args()
+
+    source = create_frame_source(args.source, uri=args.uri, fps=settings.VIDEO_FPS,
+                                 loop=args.loop, realtime=False)
+    detector = FaceDetectionService()
+    # Separate mesh services: each keeps its own tracking state
+    detector_mesh = DrowsinessDetectionService(detector)
+    detector_mesh.set_refine_landmarks(not args.plain_mesh)
+    iris_mesh = DrowsinessDetectionService(detector)
+    iris_mesh.set_refine_landmarks(True)
+
+    cpu = {"detector": [], "iris": [], "detector_only": []}
+    wall = {"detector": [], "iris": []}
+    distances = {"detector": [], "iris": []}
+    brightness = {"detector": [], "iris": []}
+    source.open()
+    for i in range(args.warmup + args.frames):
+        captured = source.read()
+        if captured is None:
+            break
+        frame, scale = captured.image, captured.scale
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        detections, detect_cpu, detect_wall = timed(detector.detect_faces, rgb, frame, scale, draw=False)
+        faces, mesh_cpu, mesh_wall = timed(detector_mesh.process_faces, rgb, frame, detections, draw=False)
+        face_a = primary(faces)
+
+        faces, iris_cpu, iris_wall = timed(iris_mesh.process_faces, rgb, frame, draw=False,
+                                           distance="iris", scale=scale)
+        levels, level_cpu, level_wall = timed(detector.measure_brightness, frame, faces)
+        for face, level in zip(faces, levels):
+            face["brightness"] = level
+        face_b = primary(faces)
+
+        if i < args.warmup:
+            continue
+        cpu["detector"].append(detect_cpu + mesh_cpu)
+        cpu["detector_only"].append(detect_cpu)
+        cpu["iris"].append(iris_cpu + level_cpu)
+        wall["detector"].append(detect_wall + mesh_wall)
+        wall["iris"].append(iris_wall + level_wall)
+        for name, face in (("detector", face_a), ("iris", face_b)):
+            distances[name].append(face["distance"] if face else None)
+            brightness[name].append(face["brightness"] if face else None)
+    source.close()
+
+    frames = len(cpu["iris"])
+    both = [(a, b) for a, b in zip(distances["detector"], distances["iris"]) if a is not None and b is not None]
+    pairs = np.array(both, dtype=float).reshape(-1, 2)
+    diff = np.abs(pairs[:, 1] - pairs[:, 0])
+    lit = [(a, b) for a, b in zip(brightness["detector"], brightness["iris"]) if a is not None and b is not None]
+    lit = np.array(lit, dtype=float).reshape(-1, 2)
+
+    report = {
+        "source": args.source,
+        "uri": args.uri,
+        "frames": frames,
+        "cpu": {name: summary(values) for name, values in cpu.items()},
+        "wall": {name: summary(values) for name, values in wall.items()},
+        "coverage": {name: sum(d is not None for d in values) for name, values in distances.items()},
+        "agreement": {
+            "frames": len(pairs),
+            "mean_abs_diff_cm": rounded(diff.mean()) if len(diff) else None,
+            "p90_abs_diff_cm": rounded(np.percentile(diff, 90)) if len(diff) else None,
+            "median_ratio": rounded(np.median(pairs[:, 1] / pairs[:, 0]), 3) if len(pairs) else None,
+            "correlation": rounded(np.corrcoef(pairs.T)[0, 1], 3) if len(pairs) > 2 else None,
+            "brightness_mean_abs_diff": rounded(np.abs(lit[:, 1] - lit[:, 0]).mean()) if len(lit) else None,
+        },
+        "jitter_cm": {name: jitter(values) for name, values in distances.items()},
+    }
+    if args.true_distance:
+        errors = {}
+        for name, values in distances.items():
+            measured = np.array([d for d in values if d is not None], dtype=float)
+            errors[name] = {
+                "mean_abs_error_cm": rounded(np.abs(measured - args.true_distance).mean()) if len(measured) else None,
+                "bias_cm": rounded(measured.mean() - args.true_distance) if len(measured) else None,
+            }
+        iris = np.array([d for d in distances["iris"] if d is not None], dtype=float)
+        if len(iris):
+            # Distance is proportional to the assumed iris diameter
+            errors["calibrated_iris_diameter_cm"] = rounded(
+                settings.IRIS_DIAMETER_CM * args.true_distance / np.median(iris), 3)
+        report["error"] = errors
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Storage and query cost of the monitoring history with and without rollup tiers.
+
+Fills a fresh sqlite file with --days of per-second rows ending now (as
+MetricsHistory writes them from a running session), then:
+
+- times reports over the last hour, day and the whole span read from the
+  per-second rows alone
+- compacts into per-minute and per-hour rollups and expires per-second rows
+  older than --second-retention-days, as the background job does
+- times the same reports again, now answered from the coarsest fitting tier
+
+and prints rows per tier, file size and query milliseconds as JSON.
+
+    python -m benchmarks.bench_history --days 7
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from app.services.history import MetricsHistory
+from app.services.monitoring import TIMELINE_FIELDS, TIMELINE_PEAKS
+
+DAY = 86400
+
+
+def synthetic_buckets(start: int, seconds: int, fps: int = 15):
+    """Per-second sums and maxima of a session watching a face most of the time."""
+    rng = random.Random(0)
+    for t in range(start, start + seconds):
+        seen = fps if rng.random() > 0.05 else 0
+        sums = dict.fromkeys(TIMELINE_FIELDS, 0.0)
+        sums.update(total_duration=1.0, total_frames=fps, frames_with_face=seen,
+                    distance_sum=seen * rng.uniform(40, 80), pitch_sum=seen * rng.uniform(0, 20),
+                    brightness_sum=seen * rng.uniform(80, 200), good_distance_time=seen / fps,
+                    face_missing_time=(fps - seen) / fps, blinks=float(rng.random() < 0.3))
+        peaks = dict.fromkeys(TIMELINE_PEAKS)
+        if seen:
+            peaks["max_brightness"] = rng.uniform(150, 220)
+        yield t, sums, peaks
+
+
+def no_session():
+    # Nothing is recording; only the rows loaded here are compacted
+    return {}
+
+
+def time_queries(history: MetricsHistory, ranges, repeat: int):
+    results = {}
+    for name, (start, end) in ranges.items():
+        started = time.perf_counter()
+        for _ in range(repeat):
+            report = history.query(start, end)
+        results[name] = {"ms": round((time.perf_counter() - started) / repeat * 1000, 2),
+                         "tier": report.get("tier"), "blinks": report.get("report", {}).get("blinks")}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--second-retention-days", type=float, default=2)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "history.db")
+    now = int(time.time()) // 3600 * 3600  # whole hours, so every tier fits the ranges
+    seconds = int(args.days * DAY)
+    start = now - seconds
+
+    raw = MetricsHistory(path, 0, no_session, [("second", 1.0, 0)])
+    conn = raw._connect()
+    started = time.perf_counter()
+    with conn:
+        raw._insert(conn, synthetic_buckets(start, seconds))
+    load_sec = time.perf_counter() - started
+    ranges = {"last_hour": (now - 3600, now), "last_day": (now - DAY, now), "all": (start, now)}
+    before = time_queries(raw, ranges, args.repeat)
+    size_before = os.path.getsize(path)
+
+    tiered = MetricsHistory(path, 0, no_session, [
+        ("second", 1.0, args.second_retention_days * DAY), ("minute", 60.0, 0), ("hour", 3600.0, 0),
+    ])
+    started = time.perf_counter()
+    tiered.compact(conn)
+    compact_sec = time.perf_counter() - started
+    conn.execute("VACUUM")
+    rows = dict(conn.execute("SELECT tier, COUNT(*) FROM rollups GROUP BY tier").fetchall())
+    conn.close()
+
+    print(json.dumps({
+        "days": args.days,
+        "load_sec": round(load_sec, 2),
+        "first_compaction_sec": round(compact_sec, 2),
+        "rows_per_tier": {f"{int(tier)}s": count for tier, count in sorted(rows.items())},
+        "file_mb": {"raw": round(size_before / 1e6, 1), "tiered": round(os.path.getsize(path) / 1e6, 1)},
+        "query_raw": before,
+        "query_tiered": time_queries(tiered, ranges, args.repeat),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Measure frame-loop time and lock hold times while API readers poll hard.
+
+Runs the real processing chain on a synthetic camera while reader threads
+call the same service methods the read endpoints use, then prints per-frame
+timings and the instrumented lock statistics as JSON.
+
+    python -m benchmarks.bench_lock_contention --frames 300 --pollers 16
+"""
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+
+from app.services.frame_sources import SyntheticSource
+from app.services.video_stream import VideoStreamService
+from app.utils.lock_stats import lock_stats
+
+
+def poll(service: VideoStreamService, stop: threading.Event, counter: list, interval: float):
+    while not stop.wait(interval):
+        service.get_latest_data()
+        service.get_drowsiness_status()
+        service.get_faces()
+        service.get_report()
+        service.alert_service.get_alerts()
+        service.metrics_state.get()
+        counter[0] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--pollers", type=int, default=16)
+    parser.add_argument("--poll-interval", type=float, default=0.001,
+                        help="seconds between one poller's read rounds")
+    args = parser.parse_args()
+
+    service = VideoStreamService(SyntheticSource(realtime=False))
+    service._initialize_camera()
+    service.start_monitoring()
+
+    stop = threading.Event()
+    counters = [[0] for _ in range(args.pollers)]
+    threads = [
+        threading.Thread(target=poll, args=(service, stop, counter, args.poll_interval), daemon=True)
+        for counter in counters
+    ]
+    for thread in threads:
+        thread.start()
+
+    frame_times = []
+    for _ in range(args.frames):
+        start = time.perf_counter()
+        service._next_frame()
+        frame_times.append(time.perf_counter() - start)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    frame_ms = np.array(frame_times) * 1000
+    print(json.dumps({
+        "frames": args.frames,
+        "pollers": args.pollers,
+        "reads": sum(c[0] for c in counters),
+        "frame_ms": {
+            "mean": round(float(frame_ms.mean()), 3),
+            "p50": round(float(np.percentile(frame_ms, 50)), 3),
+            "p99": round(float(np.percentile(frame_ms, 99)), 3),
+        },
+        "locks": lock_stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
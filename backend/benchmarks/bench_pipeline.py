@@ -0,0 +1,79 @@
+"""Compare the serial frame loop with the stage-parallel pipeline on one camera.
+
+Runs the same source unpaced (as fast as the loop can take frames) first
+serially, then with FRAME_PIPELINE on, while one viewer pulls every frame as
+full-quality JPEG. Prints frames per second of each mode and, for the
+pipeline, each stage's queue wait and work time per frame as JSON.
+
+    python -m benchmarks.bench_pipeline --source images --uri ./faces --seconds 20
+    python -m benchmarks.bench_pipeline --source file --uri clip_1080p.mp4
+"""
+import argparse
+import json
+import threading
+import time
+
+from app.core.config import settings
+from app.services.frame_sources import create_frame_source
+from app.services.video_stream import VideoStreamService
+
+
+def run(args, pipelined: bool):
+    settings.FRAME_PIPELINE = pipelined
+    service = VideoStreamService(create_frame_source(
+        args.source, uri=args.uri, fps=args.fps, realtime=False,
+        width=args.width, height=args.height,
+    ))
+    service._initialize_camera()
+    subscription = service.broadcaster.subscribe(maxsize=4)
+    counted = [0]
+    measuring = threading.Event()
+
+    def view():
+        for frame in subscription.frames():
+            frame.jpeg()
+            if measuring.is_set():
+                counted[0] += 1
+
+    viewer = threading.Thread(target=view, daemon=True)
+    viewer.start()
+    time.sleep(args.warmup)
+    measuring.set()
+    started = time.monotonic()
+    time.sleep(args.seconds)
+    elapsed = time.monotonic() - started
+    result = {"fps": round(counted[0] / elapsed, 2)}
+    if pipelined:
+        result["pipeline"] = service.pipeline.stats()
+    service.close_camera()
+    viewer.join(5)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="synthetic", choices=["synthetic", "file", "images"])
+    parser.add_argument("--uri", default="", help="video file or image directory")
+    parser.add_argument("--width", type=int, default=1920, help="synthetic frame width")
+    parser.add_argument("--height", type=int, default=1080, help="synthetic frame height")
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--fps", type=float, default=1000.0,
+                        help="loop rate cap; the default leaves it unpaced")
+    args = parser.parse_args()
+
+    settings.VIDEO_FPS = args.fps
+    serial = run(args, pipelined=False)
+    pipelined = run(args, pipelined=True)
+    print(json.dumps({
+        "source": args.source,
+        "uri": args.uri or None,
+        "serial_fps": serial["fps"],
+        "pipelined_fps": pipelined["fps"],
+        "speedup": round(pipelined["fps"] / serial["fps"], 2) if serial["fps"] else None,
+        "pipeline": pipelined["pipeline"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
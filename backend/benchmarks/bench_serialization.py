@@ -0,0 +1,110 @@
+"""Compare per-response serialization cost of the dict + Pydantic path and the record path.
+
+The old path builds a dict per frame and validates it through the response
+model on every request; the new path writes slotted records straight to
+JSON bytes. Prints microseconds and peak allocated bytes per response as JSON.
+
+    python -m benchmarks.bench_serialization --repeat 20000
+"""
+import argparse
+import json
+import timeit
+import tracemalloc
+
+from app.models.records import (
+    POSTURE_ANGLE_NAMES,
+    DrowsinessRecord,
+    FrameMetrics,
+    TrackedFaceMetrics,
+    json_bytes,
+    posture_array
+)
+from app.models.schemas import DrowsinessStatus, FaceMetrics, SessionReport, TrackedFace
+
+POSTURE = (29.41, 41.02, 149.87, 154.73, 177.6, 172.05)
+
+METRICS = dict(distance=58.21, pitch=-2.47, brightness=131.9, ear=0.321, mar=0.112, yaw=0.043)
+DROWSINESS = dict(ear=0.321, mar=0.112, yaw=0.043, eye_counter=0, yawn_counter=0,
+                  drowsiness_alert=False, yawn_alert=False)
+FACE = dict(face_id=1, primary=True, eye_counter=0, yawn_counter=0, blink_count=12)
+REPORT = {
+    "start_time": "2025-01-01 09:00:00", "stop_time": None, "session_duration_min": 42.5,
+    "time_face_visible_min": 40.1, "avg_distance_cm": 57.3, "time_good_distance_min": 35.2,
+    "avg_pitch_deg": -3.1, "bad_posture_time_min": 4.2, "bad_posture_events": 7,
+    "bad_posture_events_per_hour": 9.88, "max_good_posture_streak_sec": 612.4,
+    "avg_brightness": 128.4, "max_brightness": 201.0, "high_brightness_time_min": 0.5,
+    "high_brightness_events": 1, "face_missing_time_min": 2.4, "drowsiness_time_min": 0.3,
+    "drowsiness_events": 2, "drowsiness_events_per_hour": 2.82, "yawns_detected": 3,
+    "yawns_per_hour": 4.24, "session_score": 81.5, "blinks": 640, "long_blink_gaps": 2,
+    "longest_no_blink_sec": 14.2,
+}
+
+
+def old_paths():
+    metrics = dict(METRICS, posture_angles=dict(zip(POSTURE_ANGLE_NAMES, POSTURE)))
+    return {
+        "metrics": lambda: FaceMetrics(**metrics).model_dump_json().encode(),
+        "drowsiness": lambda: DrowsinessStatus(**DROWSINESS).model_dump_json().encode(),
+        "face": lambda: TrackedFace(**metrics, **FACE).model_dump_json().encode(),
+        "report": lambda: SessionReport(**REPORT).model_dump_json().encode(),
+    }
+
+
+def new_paths():
+    metrics = FrameMetrics(posture=posture_array(POSTURE), **METRICS)
+    drowsiness = DrowsinessRecord(**DROWSINESS)
+    face = TrackedFaceMetrics(posture=posture_array(POSTURE), **METRICS, **FACE)
+    return {
+        "metrics": metrics.to_json_bytes,
+        "drowsiness": drowsiness.to_json_bytes,
+        "face": face.to_json_bytes,
+        "report": lambda: json_bytes(REPORT),
+    }
+
+
+def allocations(fn, repeat: int) -> float:
+    """Average peak bytes allocated while producing one response."""
+    fn()
+    total = 0
+    tracemalloc.start()
+    try:
+        for _ in range(repeat):
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn()
+            total += tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return total / repeat
+
+
+def measure(paths, repeat: int):
+    results = {}
+    for name, fn in paths.items():
+        seconds = min(timeit.repeat(fn, number=repeat, repeat=5))
+        results[name] = {
+            "us_per_response": round(seconds / repeat * 1e6, 3),
+            "peak_alloc_bytes": round(allocations(fn, min(repeat, 2000))),
+            "bytes": len(fn()),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    old, new = old_paths(), new_paths()
+    for name in old:
+        assert json.loads(old[name]()) == json.loads(new[name]()), name
+
+    print(json.dumps({
+        "repeat": args.repeat,
+        "before": measure(old, args.repeat),
+        "after": measure(new, args.repeat),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
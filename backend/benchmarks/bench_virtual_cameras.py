@@ -0,0 +1,65 @@
+"""Run N virtual cameras through the full processing pipeline to find capacity.
+
+Each camera is its own VideoStreamService with its own frame source and
+frame loop, as if N cameras were attached. Prints achieved frames per second
+per camera and overall as JSON.
+
+    python -m benchmarks.bench_virtual_cameras --cameras 4 --seconds 20
+    python -m benchmarks.bench_virtual_cameras --cameras 8 --source file --uri clip.mp4
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.frame_sources import create_frame_source
+from app.services.video_stream import VideoStreamService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--source", default="synthetic", choices=["synthetic", "file", "images"])
+    parser.add_argument("--uri", default="", help="video file or image directory")
+    parser.add_argument("--fps", type=float, default=settings.VIDEO_FPS,
+                        help="target frame rate of every camera")
+    args = parser.parse_args()
+
+    settings.VIDEO_FPS = args.fps
+    services = [
+        VideoStreamService(create_frame_source(args.source, uri=args.uri, fps=args.fps))
+        for _ in range(args.cameras)
+    ]
+    subscriptions = []
+    for service in services:
+        service._initialize_camera()
+        subscriptions.append(service.broadcaster.subscribe(maxsize=1))
+
+    # Keep every subscription drained so no camera's loop is reaped as idle.
+    deadline = time.monotonic() + args.seconds
+    while time.monotonic() < deadline:
+        for subscription in subscriptions:
+            subscription.get(0)
+        time.sleep(0.01)
+
+    frames = [s.delivered + s.dropped + s.backlog for s in subscriptions]
+    for service in services:
+        service.close_camera()
+
+    fps = np.array(frames) / args.seconds
+    print(json.dumps({
+        "cameras": args.cameras,
+        "source": args.source,
+        "target_fps": args.fps,
+        "seconds": args.seconds,
+        "fps_per_camera": [round(float(f), 2) for f in fps],
+        "min_fps": round(float(fps.min()), 2),
+        "total_fps": round(float(fps.sum()), 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""End-to-end load test: MJPEG viewers, metric pollers and monitoring cycles against the API.
+
+Starts the app in-process on a synthetic or file camera (or targets --url),
+runs one stage per entry of --ramp with that many stream viewers plus the
+configured pollers and monitoring cycles, and writes per-stage request
+latency percentiles, delivered FPS per viewer, analysis FPS and server
+CPU/RSS as JSON. The first stage whose analysis FPS falls below
+--collapse-ratio of the target FPS is reported as the collapse point.
+In-process runs share the process with the load generator, so their CPU
+figures include the clients; use --url for a clean server measurement.
+
+    python -m benchmarks.loadtest --ramp 1,2,4,8 --pollers 8 --output load.json
+    python -m benchmarks.loadtest --source file --uri clip.mp4 --ramp 4,16
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --ramp 2
+"""
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+BOUNDARY = b"--frame\r\n"
+
+
+class Recorder:
+    """Latencies and errors per endpoint for one stage."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, method: str, path: str) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path)
+        except httpx.HTTPError:
+            self.errors[f"{method} {path}"] += 1
+            return None
+        self.latencies[f"{method} {path}"].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[f"{method} {path}"] += 1
+        return response
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            ms = np.array(self.latencies.get(name, [])) * 1000
+            result[name] = {
+                "count": int(ms.size),
+                "errors": self.errors.get(name, 0),
+                "p50_ms": round(float(np.percentile(ms, 50)), 2) if ms.size else None,
+                "p90_ms": round(float(np.percentile(ms, 90)), 2) if ms.size else None,
+                "p99_ms": round(float(np.percentile(ms, 99)), 2) if ms.size else None,
+                "max_ms": round(float(ms.max()), 2) if ms.size else None,
+            }
+        return result
+
+
+async def viewer(client: httpx.AsyncClient, path: str, stop: asyncio.Event, frames: List[int], index: int):
+    """Read an MJPEG stream, counting delivered frames by their part boundaries."""
+    try:
+        async with client.stream("GET", path, timeout=None) as response:
+            tail = b""
+            async for data in response.aiter_raw():
+                chunk = tail + data
+                frames[index] += chunk.count(BOUNDARY)
+                tail = chunk[-(len(BOUNDARY) - 1):]
+                if stop.is_set():
+                    return
+    except httpx.HTTPError:
+        pass
+
+
+async def poller(client: httpx.AsyncClient, recorder: Recorder, stop: asyncio.Event, interval: float):
+    paths = ("/video/metrics", "/video/drowsiness", "/monitoring/status", "/alerts/status")
+    while not stop.is_set():
+        for path in paths:
+            await recorder.request(client, "GET", path)
+        await asyncio.sleep(interval)
+
+
+async def monitoring_cycle(client: httpx.AsyncClient, recorder: Recorder, stop: asyncio.Event, session: float):
+    while not stop.is_set():
+        await recorder.request(client, "POST", "/monitoring/start")
+        await asyncio.sleep(session)
+        await recorder.request(client, "GET", "/monitoring/report")
+        await recorder.request(client, "POST", "/monitoring/stop")
+
+
+async def run_stage(base_url: str, viewers: int, args) -> Dict:
+    recorder = Recorder()
+    stop = asyncio.Event()
+    frames = [0] * viewers
+    limits = httpx.Limits(max_connections=viewers + args.pollers + args.cycles + 4)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        started = time.monotonic()
+        tasks = [
+            asyncio.create_task(viewer(client, f"/video/stream?profile={args.profile}", stop, frames, i))
+            for i in range(viewers)
+        ]
+        tasks += [asyncio.create_task(poller(client, recorder, stop, args.poll_interval))
+                  for _ in range(args.pollers)]
+        tasks += [asyncio.create_task(monitoring_cycle(client, recorder, stop, args.session_seconds))
+                  for _ in range(args.cycles)]
+        # Leave the stream loop time to start before counting
+        await asyncio.sleep(args.warmup)
+        frames[:] = [0] * viewers
+        counted_from = time.monotonic()
+        before = (await client.get("/health/stats")).json()
+        await asyncio.sleep(args.stage_seconds)
+        after = (await client.get("/health/stats")).json()
+        elapsed = time.monotonic() - counted_from
+        viewer_frames = list(frames)
+        stop.set()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await client.post("/monitoring/stop")
+
+    server_elapsed = after["monotonic"] - before["monotonic"]
+    viewer_fps = [round(n / elapsed, 2) for n in viewer_frames]
+    return {
+        "viewers": viewers,
+        "pollers": args.pollers,
+        "cycles": args.cycles,
+        "seconds": round(elapsed, 2),
+        "analysis_fps": round((after["frames_processed"] - before["frames_processed"]) / server_elapsed, 2),
+        "viewer_fps": viewer_fps,
+        "min_viewer_fps": min(viewer_fps) if viewer_fps else None,
+        "server": {
+            "cpu_percent": round((after["cpu_seconds"] - before["cpu_seconds"]) / server_elapsed * 100, 1),
+            "rss_mb": round(after["rss_bytes"] / 2 ** 20, 1),
+            "threads": after["threads"],
+        },
+        "latency": recorder.summary(),
+        "wall_time_s": round(time.monotonic() - started, 2),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_in_process(args) -> str:
+    """Serve the app from this process on a free port, on the chosen camera source."""
+    import uvicorn
+    from app.core.config import settings
+
+    settings.CAMERA_SOURCE = args.source
+    settings.CAMERA_URI = args.uri
+    from app.main import app
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="loadtest-server", daemon=True).start()
+    deadline = time.monotonic() + 60
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Server did not start")
+        time.sleep(0.1)
+    return f"http://127.0.0.1:{port}"
+
+
+async def run(args) -> Dict:
+    base_url = args.url or start_in_process(args)
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        target_fps = (await client.get("/health/stats")).json().get("target_fps") or args.target_fps
+    stages = []
+    for viewers in args.ramp:
+        stage = await run_stage(base_url, viewers, args)
+        stages.append(stage)
+        print(f"viewers={viewers}: analysis {stage['analysis_fps']} fps, "
+              f"min viewer {stage['min_viewer_fps']} fps, cpu {stage['server']['cpu_percent']}%")
+    collapse = next(
+        (s["viewers"] for s in stages if s["analysis_fps"] < args.collapse_ratio * target_fps), None
+    )
+    return {
+        "config": {
+            "url": args.url, "source": None if args.url else args.source, "uri": args.uri or None,
+            "profile": args.profile, "ramp": args.ramp, "pollers": args.pollers,
+            "poll_interval": args.poll_interval, "cycles": args.cycles,
+            "stage_seconds": args.stage_seconds, "target_fps": target_fps,
+            "collapse_ratio": args.collapse_ratio,
+        },
+        "stages": stages,
+        "collapse_at_viewers": collapse,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="test a running server instead of starting one in-process")
+    parser.add_argument("--source", default="synthetic", choices=["synthetic", "file", "images"])
+    parser.add_argument("--uri", default="", help="video file or image directory for --source")
+    parser.add_argument("--ramp", default="1,2,4,8", help="stream viewers per stage, comma separated")
+    parser.add_argument("--profile", default="sd", help="stream profile viewers request")
+    parser.add_argument("--pollers", type=int, default=4)
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    parser.add_argument("--cycles", type=int, default=1, help="concurrent monitoring start/report/stop loops")
+    parser.add_argument("--session-seconds", type=float, default=2.0)
+    parser.add_argument("--stage-seconds", type=float, default=15.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--target-fps", type=float, default=15.0,
+                        help="analysis FPS expected when the server does not report one")
+    parser.add_argument("--collapse-ratio", type=float, default=0.8)
+    parser.add_argument("--output", help="write the JSON results here as well as to stdout")
+    args = parser.parse_args()
+    args.ramp = [int(n) for n in args.ramp.split(",")]
+
+    results = asyncio.run(run(args))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()